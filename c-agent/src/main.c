@@ -272,28 +272,34 @@ static json_t *detect_encoders(const char *ffmpeg_path) {
     json_t *arr = json_array();
     if (!out) return arr;
     char *line = out;
+    int listing = 0;
     while (*line) {
         char *nl = strchr(line, '\n');
         if (nl) *nl = '\0';
-        // motif simple: colonnes où le 2e champ est le code encoder
-        // on accepte alnum,_,-
+        // 2e champ des lignes après le séparateur ------ (la légende " V..... = Video" le précède)
         const char *p = line;
-        // sauter préfixe indicateurs
-        while (*p && (*p == ' ' || *p == '\t' || *p == '.' || (*p >= 'A' && *p <= 'Z'))) p++;
-        // lire mot
-        char name[128]; size_t ni = 0;
-        while (*p && *p != ' ' && *p != '\t' && ni + 1 < sizeof(name)) {
-            char c = *p;
-            if ((c >= '0' && c <= '9') || (c >= 'a' && c <= 'z') || (c >= 'A' && c <= 'Z') || c == '_' || c == '-') {
-                name[ni++] = c;
-            } else {
-                break;
+        while (*p == ' ' || *p == '\t') p++;
+        if (!listing) {
+            listing = (*p == '-');
+        } else {
+            // sauter les indicateurs (V....D) puis lire le nom
+            while (*p && *p != ' ' && *p != '\t') p++;
+            while (*p == ' ' || *p == '\t') p++;
+            char name[128]; size_t ni = 0;
+            while (*p && *p != ' ' && *p != '\t' && *p != '\r' && ni + 1 < sizeof(name)) {
+                char c = *p;
+                if ((c >= '0' && c <= '9') || (c >= 'a' && c <= 'z') || (c >= 'A' && c <= 'Z') || c == '_' || c == '-') {
+                    name[ni++] = c;
+                } else {
+                    ni = 0;
+                    break;
+                }
+                p++;
+            }
+            name[ni] = '\0';
+            if (ni > 0) {
+                json_array_append_new(arr, json_string(name));
             }
-            p++;
-        }
-        name[ni] = '\0';
-        if (ni > 0) {
-            json_array_append_new(arr, json_string(name));
         }
         if (!nl) break; else line = nl + 1;
     }
@@ -0,0 +1,213 @@
+import os
+import time
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+#this part do that
+#réglage automatique des créneaux par agent et par famille d'encodeurs, d'après le débit mesuré
+
+logger = logging.getLogger("gui_py")
+
+
+def family_of(requires: Iterable[str]) -> str:
+    """Famille d'un job: ses encodeurs requis (hors jetons de capacité @...), "copy" si aucun."""
+    return "+".join(sorted(r for r in requires if not r.startswith("@"))) or "copy"
+
+
+def load_signals(payload: Dict[str, Any]) -> Dict[str, float]:
+    #heartbeat -> cpuUtil (0..1), load1, cpus, memFree (0..1); champs absents ignorés
+    out: Dict[str, float] = {}
+    for key in ("cpuUtil", "load1", "cpus", "memFree"):
+        try:
+            if payload.get(key) is not None:
+                out[key] = float(payload[key])
+        except (TypeError, ValueError):
+            pass
+    try:
+        if "memFree" not in out and payload.get("memTotal"):
+            # anciens agents: seulement memUsed/memTotal (le champ "cpu" n'a pas la même unité selon l'agent)
+            out["memFree"] = max(0.0, 1 - float(payload.get("memUsed") or 0) / float(payload["memTotal"]))
+    except (TypeError, ValueError):
+        pass
+    return out
+
+
+class FamilyTune:
+    __slots__ = ("limit", "running", "units", "done", "busy", "samples", "since", "last_rate", "step", "holds")
+
+    def __init__(self, limit: int, now: float):
+        self.limit = limit
+        self.running = 0
+        self.units = 0.0
+        self.done = 0
+        self.busy = 0
+        self.samples = 0
+        self.since = now
+        self.last_rate: Optional[float] = None
+        self.step = 1
+        self.holds = 0
+
+    def reset(self, now: float) -> None:
+        self.units = 0.0
+        self.done = 0
+        self.busy = 0
+        self.samples = 0
+        self.since = now
+
+
+class AgentTune:
+    __slots__ = ("declared", "ceiling", "families", "jobs", "load")
+
+    def __init__(self, declared: int, ceiling: int):
+        self.declared = declared
+        self.ceiling = ceiling
+        self.families: Dict[str, FamilyTune] = {}
+        self.jobs: Dict[str, str] = {}
+        self.load: Dict[str, float] = {}
+
+
+class ConcurrencyTuner:
+    """Créneaux effectifs par (agent, famille d'encodeurs), ajustés par montée de colline.
+
+    À chaque intervalle où la famille a occupé tous ses créneaux, le débit
+    (secondes de média terminées par seconde, ou fichiers pour les images)
+    est comparé à celui de l'intervalle précédent: on continue dans la même
+    direction tant qu'il progresse de plus de `hysteresis`, sinon on revient
+    au réglage précédent et on s'y tient (nouvel essai tous les `reprobe`
+    intervalles). Une machine saturée (CPU, mémoire) n'est jamais poussée
+    plus haut: l'essai se fait alors avec un créneau de moins. Les agents
+    qui ne savent pas changer leur concurrence (`adjustable=False`) ne
+    peuvent que descendre sous la valeur annoncée.
+    """
+
+    def __init__(self):
+        self.enabled = os.environ.get("AGENT_AUTOTUNE", "1").lower() in ("1", "true", "yes")
+        self.interval = float(os.environ.get("AUTOTUNE_INTERVAL_SEC", "60"))
+        self.max_slots = int(os.environ.get("AUTOTUNE_MAX_SLOTS", "32"))
+        self.hysteresis = float(os.environ.get("AUTOTUNE_HYSTERESIS", "0.1"))
+        self.busy_ratio = 0.8
+        self.reprobe = 10
+        self.cpu_high = 0.95
+        self.mem_low = 0.08
+        self.agents: Dict[str, AgentTune] = {}
+
+    def add_agent(self, aid: str, declared: int, adjustable: bool = False, cpus: Optional[int] = None) -> None:
+        ceiling = declared
+        if self.enabled and adjustable:
+            ceiling = max(declared, min(self.max_slots, 2 * cpus if cpus else self.max_slots))
+        self.agents[aid] = AgentTune(declared, ceiling)
+
+    def drop_agent(self, aid: str) -> None:
+        self.agents.pop(aid, None)
+
+    def _family(self, at: AgentTune, family: str) -> FamilyTune:
+        f = at.families.get(family)
+        if f is None:
+            f = at.families[family] = FamilyTune(at.declared, time.monotonic())
+        return f
+
+    def started(self, aid: str, job_id: str, family: str) -> None:
+        at = self.agents.get(aid)
+        if at is None or job_id in at.jobs:
+            return
+        at.jobs[job_id] = family
+        self._family(at, family).running += 1
+
+    def finished(self, aid: str, job_id: str, units: float = 0.0) -> None:
+        at = self.agents.get(aid)
+        family = at.jobs.pop(job_id, None) if at else None
+        if family is None:
+            return
+        f = self._family(at, family)
+        f.running = max(0, f.running - 1)
+        if units > 0:
+            f.units += units
+            f.done += 1
+
+    def observe_load(self, aid: str, load: Dict[str, float]) -> None:
+        at = self.agents.get(aid)
+        if at is not None:
+            at.load = load
+
+    def full(self, aid: str, family: str, extra: int = 0) -> bool:
+        #famille à sa limite (+ baux préchargés): ses jobs attendent un autre agent ou un créneau
+        at = self.agents.get(aid)
+        if not self.enabled or at is None:
+            return False
+        f = at.families.get(family)
+        return f is not None and f.running >= f.limit + extra
+
+    def slots(self, aid: str, default: int) -> int:
+        #capacité totale de l'agent: au moins la concurrence annoncée, les familles lentes sont bornées par full()
+        at = self.agents.get(aid)
+        if not self.enabled or at is None:
+            return default
+        return max([at.declared] + [f.limit for f in at.families.values()])
+
+    def limits(self, aid: str) -> Dict[str, int]:
+        at = self.agents.get(aid)
+        return {name: f.limit for name, f in at.families.items()} if at else {}
+
+    def _hot(self, load: Dict[str, float]) -> bool:
+        util = load.get("cpuUtil")
+        if util is None and load.get("cpus") and load.get("load1") is not None:
+            util = load["load1"] / load["cpus"]
+        return (util is not None and util >= self.cpu_high) or load.get("memFree", 1.0) < self.mem_low
+
+    def tick(self) -> List[str]:
+        """Échantillonne l'occupation et réévalue les familles mûres; renvoie les agents dont les limites ont changé."""
+        if not self.enabled:
+            return []
+        now = time.monotonic()
+        changed: List[str] = []
+        for aid, at in self.agents.items():
+            moved = False
+            for name, f in at.families.items():
+                f.samples += 1
+                f.busy += f.running >= f.limit
+                if now - f.since < self.interval:
+                    continue
+                if f.done < min(f.limit, 4) and now - f.since < 10 * self.interval:
+                    # trop peu de jobs terminés pour une mesure fiable (encodages longs): fenêtre prolongée
+                    continue
+                new = self._evaluate(f, at, now)
+                if new != f.limit:
+                    logger.info("autotune agent=%s family=%s slots %s -> %s", aid, name, f.limit, new)
+                    f.limit = new
+                    moved = True
+            if moved:
+                changed.append(aid)
+        return changed
+
+    def _evaluate(self, f: FamilyTune, at: AgentTune, now: float) -> int:
+        rate = f.units / max(1e-6, now - f.since)
+        saturated = f.done > 0 and f.busy >= self.busy_ratio * max(1, f.samples)
+        f.reset(now)
+        hot = self._hot(at.load)
+        new = f.limit
+        if not saturated:
+            # débit limité par la demande, pas par la machine: rien à apprendre de cet intervalle
+            f.last_rate = None
+        elif f.step and f.last_rate is not None:
+            if rate > f.last_rate * (1 + self.hysteresis):
+                f.last_rate = rate
+                new = f.limit + f.step
+            else:
+                # pas de gain net: retour au réglage précédent, tenu jusqu'au prochain essai
+                new = f.limit - f.step
+                f.step, f.holds, f.last_rate = 0, 0, None
+        else:
+            f.holds += 1
+            if f.step or f.holds >= self.reprobe:
+                # essai: un créneau de plus, ou de moins si la machine est saturée
+                f.step, f.holds = (-1 if hot else 1), 0
+                new = f.limit + f.step
+            f.last_rate = rate
+        if hot and new > f.limit:
+            new = f.limit
+        if at.load.get("memFree", 1.0) < self.mem_low / 2:
+            new = min(new, f.limit - 1)
+        new = max(1, min(at.ceiling, new))
+        if new == f.limit:
+            f.step = 0
+        return new
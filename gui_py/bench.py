@@ -0,0 +1,404 @@
+#this part do that
+#micro-benchmarks des sous-systèmes du contrôleur (python bench.py <nom>)
+import os
+import sys
+import time
+import socket
+import random
+import tempfile
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from scheduler import JobScheduler
+
+BENCHES: Dict[str, Callable[[List[str]], None]] = {}
+
+
+def bench(name: str):
+    def deco(fn):
+        BENCHES[name] = fn
+        return fn
+    return deco
+
+
+def _report(label: str, n: int, seconds: float) -> None:
+    per = seconds / max(1, n) * 1e6
+    print(f"{label:<52} n={n:<6} total={seconds * 1000:9.1f} ms  per-op={per:8.2f} us")
+
+
+#coût de dispatch: scheduler à tas vs ancien tri de liste + pop(0)
+@bench("scheduler")
+def bench_scheduler(argv: List[str]) -> None:
+    encoders = ["libx264", "libx265", "libsvtav1", "aac", "flac", "libopus"]
+    agent = frozenset(["libx264", "aac", "flac", "libopus"])
+    pops = 2000
+    for n in (1_000, 10_000, 100_000, 200_000):
+        rnd = random.Random(n)
+        jobs = {f"j{i}": {"sizeBytes": rnd.randint(1, 1 << 32)} for i in range(n)}
+        reqs = {jid: (rnd.choice(encoders),) for jid in jobs}
+        for policy in ("largest", "fifo", "shortest"):
+            sched = JobScheduler(policy)
+            for jid, job in jobs.items():
+                sched.push(jid, job, reqs[jid])
+            t0 = time.perf_counter()
+            for _ in range(pops):
+                jid = sched.pop_for(agent)
+                # le job revient en file pour garder une taille constante
+                sched.push(jid, jobs[jid], reqs[jid])
+            _report(f"queue={n} heap pop_for+push policy={policy}", pops, time.perf_counter() - t0)
+        if n > 100_000:
+            continue
+        # ancien try_dispatch: tri complet + pop(0) à chaque complétion
+        legacy_pops = 20
+        pending = list(jobs.keys())
+        t0 = time.perf_counter()
+        for _ in range(legacy_pops):
+            pending.sort(key=lambda j: jobs[j]["sizeBytes"], reverse=True)
+            pending.append(pending.pop(0))
+        _report(f"queue={n} legacy sort+pop(0)", legacy_pops, time.perf_counter() - t0)
+
+
+#débit de /stream/input: ancien générateur 1 MiB vs FileRangeResponse
+@bench("stream")
+def bench_stream(argv: List[str]) -> None:
+    import asyncio
+    import uvicorn
+    from fastapi import FastAPI, Request
+    from fastapi.responses import StreamingResponse
+    from transfer import file_response
+
+    size_mb = int(argv[0]) if argv else 256
+    clients = int(argv[1]) if len(argv) > 1 else 8
+    fd, path = tempfile.mkstemp(prefix="bench-stream-")
+    with os.fdopen(fd, "wb") as f:
+        block = os.urandom(1024 * 1024)
+        for _ in range(size_mb):
+            f.write(block)
+    app = FastAPI()
+
+    @app.get("/legacy")
+    async def legacy():
+        def file_iter(chunk_size: int = 1024 * 1024):
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+        return StreamingResponse(file_iter(), headers={"Content-Length": str(os.path.getsize(path))})
+
+    @app.get("/ranged")
+    async def ranged(request: Request):
+        return file_response(path, request)
+
+    sock = socket.socket(); sock.bind(("127.0.0.1", 0)); port = sock.getsockname()[1]; sock.close()
+    server = uvicorn.Server(uvicorn.Config(app=app, host="127.0.0.1", port=port, log_level="warning"))
+    th = threading.Thread(target=lambda: asyncio.run(server.serve()), daemon=True); th.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    def pull(route: str) -> int:
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        conn.request("GET", route)
+        resp = conn.getresponse(); n = 0
+        while True:
+            chunk = resp.read(1024 * 1024)
+            if not chunk:
+                break
+            n += len(chunk)
+        conn.close()
+        return n
+
+    try:
+        for route in ("/legacy", "/ranged"):
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(clients) as pool:
+                total = sum(pool.map(pull, [route] * clients))
+            dt = time.perf_counter() - t0
+            print(f"{route:<10} clients={clients} {total / dt / 1e6:8.1f} MB/s  ({total >> 20} MiB in {dt:.2f}s)")
+    finally:
+        server.should_exit = True; th.join(timeout=5)
+        os.unlink(path)
+
+
+#lecture des sources en éventail: lectures libres vs file par disque (python bench.py reads [dossier] [clients])
+#à lancer sur le disque ou le NAS réel, caches vidés (echo 3 > /proc/sys/vm/drop_caches) avant chaque passe
+@bench("reads")
+def bench_reads(argv: List[str]) -> None:
+    import asyncio
+    import uvicorn
+    from fastapi import FastAPI, Request
+    from transfer import file_response
+    from io_scheduler import ReadScheduler
+
+    folder = argv[0] if argv else ""
+    clients = int(argv[1]) if len(argv) > 1 else 40
+    made: List[str] = []
+    if not folder:
+        folder = tempfile.mkdtemp(prefix="bench-reads-")
+        block = os.urandom(1024 * 1024)
+        for i in range(clients):
+            path = os.path.join(folder, f"src{i}.bin")
+            with open(path, "wb") as f:
+                for _ in range(32):
+                    f.write(block)
+            made.append(path)
+    files = sorted(os.path.join(folder, n) for n in os.listdir(folder) if os.path.isfile(os.path.join(folder, n)))[:clients]
+    reads = ReadScheduler()
+    app = FastAPI()
+
+    @app.get("/free/{i}")
+    async def free(i: int, request: Request):
+        return file_response(files[i], request)
+
+    @app.get("/queued/{i}")
+    async def queued(i: int, request: Request):
+        st = os.stat(files[i])
+        return file_response(files[i], request, st, await reads.stream(files[i], st, f"agent{i % 4}"))
+
+    sock = socket.socket(); sock.bind(("127.0.0.1", 0)); port = sock.getsockname()[1]; sock.close()
+    server = uvicorn.Server(uvicorn.Config(app=app, host="127.0.0.1", port=port, log_level="warning"))
+    th = threading.Thread(target=lambda: asyncio.run(server.serve()), daemon=True); th.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    def pull(route: str) -> int:
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        conn.request("GET", route)
+        resp = conn.getresponse(); n = 0
+        while True:
+            chunk = resp.read(1024 * 1024)
+            if not chunk:
+                break
+            n += len(chunk)
+        conn.close()
+        return n
+
+    try:
+        for route in ("free", "queued"):
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(len(files)) as pool:
+                total = sum(pool.map(pull, [f"/{route}/{i}" for i in range(len(files))]))
+            dt = time.perf_counter() - t0
+            print(f"{route:<8} files={len(files)} {total / dt / 1e6:8.1f} MB/s  ({total >> 20} MiB in {dt:.2f}s)")
+        for dev in reads.stats()["devices"]:
+            print(f"device {dev['path']} limit={dev['limit']} reads={dev['reads']} waitAvgMs={dev['waitAvgMs']} waitMaxMs={dev['waitMaxMs']}")
+    finally:
+        server.should_exit = True; th.join(timeout=5)
+        for path in made:
+            os.unlink(path)
+        if made:
+            os.rmdir(folder)
+
+
+#débit des transitions d'état journalisées (commits groupés vs un commit par transition)
+@bench("store")
+def bench_store(argv: List[str]) -> None:
+    import asyncio
+    import json
+    from store import JobStore
+
+    n = int(argv[0]) if argv else 100_000
+    tmp = tempfile.mkdtemp(prefix="bench-store-")
+    jobs = {f"j{i}": {"id": f"j{i}", "status": "pending", "sizeBytes": i, "sourcePath": f"/src/{i}.wav", "outputPath": f"/out/{i}.flac", "updatedAt": 0} for i in range(n)}
+
+    async def grouped() -> float:
+        store = JobStore(os.path.join(tmp, "grouped.sqlite"), flush_interval=0.01)
+        runner = asyncio.create_task(store.run(jobs))
+        t0 = time.perf_counter()
+        for status in ("assigned", "running", "uploaded"):
+            for i, (jid, job) in enumerate(jobs.items()):
+                job["status"] = status
+                store.mark(jid)
+                if i % 1000 == 0:
+                    await asyncio.sleep(0)
+        while store._dirty:
+            await asyncio.sleep(0.005)
+        await store.flush(jobs)
+        dt = time.perf_counter() - t0
+        runner.cancel()
+        store.close()
+        return dt
+
+    dt = asyncio.run(grouped())
+    print(f"grouped commits   transitions={3 * n:<8} {3 * n / dt:12.0f} transitions/s")
+    store = JobStore(os.path.join(tmp, "single.sqlite"))
+    m = min(n, 2000)
+    t0 = time.perf_counter()
+    for jid in list(jobs)[:m]:
+        store.write([(jid, "running", 0, json.dumps(jobs[jid]))])
+    dt = time.perf_counter() - t0
+    print(f"commit per update transitions={m:<8} {m / dt:12.0f} transitions/s")
+    store.close()
+
+
+#latence de dispatch avec des agents lents: envoi en ligne vs file d'envoi par agent
+@bench("dispatch")
+def bench_dispatch(argv: List[str]) -> None:
+    import asyncio
+    from outbox import Outbox
+
+    agents = int(argv[0]) if argv else 300
+    latency = float(argv[1]) / 1000 if len(argv) > 1 else 0.005
+
+    class SlowSocket:
+        async def send_json(self, msg):
+            await asyncio.sleep(latency)
+
+        async def close(self, code: int = 1000):
+            pass
+
+    async def run() -> None:
+        socks = [SlowSocket() for _ in range(agents)]
+        t0 = time.perf_counter()
+        for ws in socks:
+            await ws.send_json({"type": "lease"})
+        _report(f"agents={agents} inline await send_json ({latency * 1000:.0f} ms rtt)", agents, time.perf_counter() - t0)
+        boxes = [Outbox(ws) for ws in socks]
+        for box in boxes:
+            box.start()
+        t0 = time.perf_counter()
+        for box in boxes:
+            box.send({"type": "lease"})
+        _report(f"agents={agents} outbox.send", agents, time.perf_counter() - t0)
+        while any(box.sent == 0 for box in boxes):
+            await asyncio.sleep(0.001)
+        for box in boxes:
+            box.close()
+
+    asyncio.run(run())
+
+
+#mémoire des jobs: un dict par job vs JobRecord à __slots__
+@bench("records")
+def bench_records(argv: List[str]) -> None:
+    import tracemalloc
+    from records import JobRecord
+
+    n = int(argv[0]) if argv else 200_000
+    options = {"crf": 23, "preset": "medium"}
+
+    def entry(i: int) -> Dict:
+        return {"id": f"{i:032x}", "status": "pending", "sourcePath": f"/src/d{i % 100}/{i}.mov", "relativePath": f"d{i % 100}/{i}.mov",
+                "outputPath": f"/out/d{i % 100}/{i}.mp4", "mediaType": "video", "codec": "h264", "options": options, "fingerprint": "f" * 40,
+                "sizeBytes": i * 1000, "sourceMtime": i, "inputToken": "t" * 32, "outputToken": "u" * 32, "createdAt": i, "updatedAt": i,
+                "nodeId": None, "durationSec": 60.0, "width": 1920, "height": 1080, "vcodec": "h264", "fps": 30.0, "estCost": 12.5}
+
+    for label, make in (("dict", entry), ("JobRecord", lambda i: JobRecord(entry(i)))):
+        tracemalloc.start()
+        jobs = [make(i) for i in range(n)]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        t0 = time.perf_counter()
+        for j in jobs:
+            j.get("status"); j["sizeBytes"]; j.get("resultKey")
+        dt = time.perf_counter() - t0
+        print(f"{label:<10} jobs={n:<8} {size / n:8.0f} B/job  {size / 1e6:8.1f} MB  get x3 {dt / n * 1e9:6.0f} ns/job")
+        del jobs
+
+
+#coût des métriques sur le chemin chaud (par opération) et d'un scrape complet
+@bench("metrics")
+def bench_metrics(argv: List[str]) -> None:
+    from metrics import Registry, Timer
+
+    n = int(argv[0]) if argv else 1_000_000
+    reg = Registry("bench_")
+    counter = reg.counter("ops_total", "ops")
+    labelled = reg.counter("typed_total", "ops", ("type",))
+    hist = reg.histogram("op_seconds", "ops")
+    child = labelled.labels("progress")
+    cases = (("counter.inc", lambda: counter.inc()),
+             ("labels(x).inc", lambda: labelled.labels("progress").inc()),
+             ("child.inc", lambda: child.inc()),
+             ("histogram.observe", lambda: hist.observe(0.003)))
+    for label, op in cases:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            op()
+        print(f"{label:<18} {(time.perf_counter() - t0) / n * 1e9:8.0f} ns/op")
+    t0 = time.perf_counter()
+    for _ in range(n):
+        with Timer(hist):
+            pass
+    print(f"{'with Timer(hist)':<18} {(time.perf_counter() - t0) / n * 1e9:8.0f} ns/op")
+    for i in range(50):
+        labelled.labels(f"type{i}").inc()
+    for i in range(20):
+        reg.histogram(f"h{i}_seconds", "h").observe(i / 100)
+    t0 = time.perf_counter()
+    for _ in range(100):
+        text = reg.prometheus()
+    print(f"{'prometheus()':<18} {(time.perf_counter() - t0) / 100 * 1e6:8.0f} us/scrape ({len(text.splitlines())} lines)")
+
+
+#coût d'un appel de journal côté appelant: RotatingFileHandler direct vs file + thread d'écriture
+#(python bench.py logging [appels] [ms de blocage disque toutes les 1000 écritures], rotation/NAS lent simulé)
+@bench("logging")
+def bench_logging(argv: List[str]) -> None:
+    import shutil
+    import logging
+    from logging.handlers import RotatingFileHandler
+    from logpipe import setup_logging
+
+    n = int(argv[0]) if argv else 50_000
+    stall = float(argv[1]) / 1000 if len(argv) > 1 else 0.02
+    tmp = tempfile.mkdtemp(prefix="bench-log-")
+    payload = {"jobId": "j" * 32, "encoders": ["libx264", "libx265", "aac"] * 10}
+
+    class SlowDisk(RotatingFileHandler):
+        writes = 0
+
+        def emit(self, record):
+            super().emit(record)
+            self.writes += 1
+            if stall and self.writes % 1000 == 0:
+                time.sleep(stall)
+
+    fmt = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
+    direct = logging.getLogger("bench.direct")
+    direct.propagate = False
+    direct.setLevel(logging.DEBUG)
+    fh = SlowDisk(os.path.join(tmp, "direct.log"), maxBytes=5_000_000, backupCount=3)
+    fh.setFormatter(fmt)
+    direct.addHandler(fh)
+    piped = logging.getLogger("bench.pipe")
+    piped.propagate = False
+    pipe = setup_logging(piped, os.path.join(tmp, "pipe.log"), level="INFO")
+    slow = SlowDisk(os.path.join(tmp, "pipe-slow.log"), maxBytes=5_000_000, backupCount=3)
+    slow.setFormatter(fmt)
+    pipe.listener.handlers = (slow,)
+    pipe.limiter.rate = 0
+    cases = (("direct info", lambda i: direct.info("upload completed job=%s", i)),
+             ("direct debug f-str", lambda i: direct.debug(f"/api/pair {payload}")),
+             ("queued info", lambda i: piped.info("upload completed job=%s", i)),
+             ("queued debug (off)", lambda i: piped.debug("/api/pair %s", payload)))
+    for label, op in cases:
+        t0 = time.perf_counter()
+        worst = 0.0
+        for i in range(n):
+            t1 = time.perf_counter()
+            op(i)
+            worst = max(worst, time.perf_counter() - t1)
+        dt = time.perf_counter() - t0
+        print(f"{label:<20} {dt / n * 1e6:8.2f} us/call  worst {worst * 1e3:7.2f} ms")
+    pipe.stop()
+    fh.close()
+    slow.close()
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main(argv: List[str]) -> None:
+    names = argv[1:2] or sorted(BENCHES)
+    for name in names:
+        if name not in BENCHES:
+            print(f"unknown bench {name}; available: {', '.join(sorted(BENCHES))}")
+            sys.exit(2)
+        print(f"== {name}")
+        BENCHES[name](argv[2:])
+
+
+if __name__ == "__main__":
+    main(sys.argv)
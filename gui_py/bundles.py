@@ -0,0 +1,157 @@
+import os
+import asyncio
+import tarfile
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+#this part do that
+#lots d'images: regroupement des petits fichiers et transfert en un seul flux tar dans chaque sens
+
+IMAGE_BATCH_FILES = int(os.environ.get("IMAGE_BATCH_FILES", "64"))
+IMAGE_BATCH_BYTES = int(os.environ.get("IMAGE_BATCH_BYTES", str(64 << 20)))
+#au-delà, l'image reste un job à part (transfert reprenable, pas de mise en mémoire)
+IMAGE_BATCH_MAX_FILE = int(os.environ.get("IMAGE_BATCH_MAX_FILE", str(16 << 20)))
+TAR_BLOCK = 512
+READ_CHUNK = 1 << 20
+
+
+def group_bundles(jobs: Iterable[Dict[str, Any]], key, max_files: int = IMAGE_BATCH_FILES,
+                  max_bytes: int = IMAGE_BATCH_BYTES) -> List[List[Dict[str, Any]]]:
+    """Lots de jobs de même clé (mêmes arguments ffmpeg), bornés en nombre et en octets."""
+    open_groups: Dict[Any, List[Dict[str, Any]]] = {}
+    sizes: Dict[Any, int] = {}
+    out: List[List[Dict[str, Any]]] = []
+    for job in jobs:
+        k = key(job)
+        size = int(job.get("sizeBytes") or 0)
+        group = open_groups.get(k)
+        if group and (len(group) >= max_files or sizes[k] + size > max_bytes):
+            out.append(group)
+            group = None
+        if group is None:
+            group = open_groups[k] = []
+            sizes[k] = 0
+        group.append(job)
+        sizes[k] += size
+    out.extend(g for g in open_groups.values() if g)
+    return out
+
+
+def member_name(index: int, path: str) -> str:
+    #noms neutres dans l'archive: pas de chemins source, pas de collisions
+    return f"{index:06d}{os.path.splitext(path)[1].lower()}"
+
+
+def member_index(name: str) -> Optional[int]:
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return int(stem) if stem.isdigit() else None
+
+
+def write_file(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def tar_header(name: str, size: int, mtime: int = 0) -> bytes:
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = mtime
+    info.mode = 0o644
+    return info.tobuf(format=tarfile.USTAR_FORMAT)
+
+
+def tar_length(sizes: Iterable[int]) -> int:
+    return sum(TAR_BLOCK + -(-s // TAR_BLOCK) * TAR_BLOCK for s in sizes) + 2 * TAR_BLOCK
+
+
+def _read(f, n: int) -> bytes:
+    return f.read(n)
+
+
+async def tar_stream(members: List[Tuple[str, str, int]]) -> AsyncIterator[bytes]:
+    """Archive tar (name, chemin, taille) produite au fil de la lecture; longueur = tar_length des tailles."""
+    for name, path, size in members:
+        yield tar_header(name, size)
+        sent = 0
+        try:
+            f = await asyncio.to_thread(open, path, "rb")
+        except OSError:
+            f = None
+        try:
+            while f is not None and sent < size:
+                chunk = await asyncio.to_thread(_read, f, min(READ_CHUNK, size - sent))
+                if not chunk:
+                    break
+                sent += len(chunk)
+                yield chunk
+        finally:
+            if f is not None:
+                f.close()
+        # fichier raccourci entre-temps: zéros pour garder l'archive lisible (la sortie échouera)
+        yield b"\0" * ((size - sent) + (-size) % TAR_BLOCK)
+    yield b"\0" * (2 * TAR_BLOCK)
+
+
+class TarSplitter:
+    """Découpe incrémentale d'un flux tar en (nom, contenu) sans tout garder en mémoire.
+
+    feed() renvoie les membres réguliers complets reçus jusque-là; les entrées
+    pax/GNU et les répertoires sont sautés. `max_member` borne la taille d'un
+    membre (les lots ne contiennent que de petits fichiers).
+    """
+
+    def __init__(self, max_member: int = 4 * IMAGE_BATCH_MAX_FILE):
+        self.max_member = max_member
+        self.buf = bytearray()
+        self.name: Optional[str] = None
+        self.keep = False
+        self.remaining = 0
+        self.pad = 0
+        self.data = bytearray()
+        self.done = False
+
+    def feed(self, chunk: bytes) -> List[Tuple[str, bytes]]:
+        self.buf += chunk
+        out: List[Tuple[str, bytes]] = []
+        while not self.done:
+            if self.remaining:
+                n = min(self.remaining, len(self.buf))
+                if not n:
+                    break
+                if self.keep:
+                    self.data += self.buf[:n]
+                del self.buf[:n]
+                self.remaining -= n
+                if not self.remaining:
+                    self._finish(out)
+                continue
+            if self.pad:
+                n = min(self.pad, len(self.buf))
+                del self.buf[:n]
+                self.pad -= n
+                if self.pad:
+                    break
+                continue
+            if len(self.buf) < TAR_BLOCK:
+                break
+            block = bytes(self.buf[:TAR_BLOCK])
+            del self.buf[:TAR_BLOCK]
+            if block.count(0) == TAR_BLOCK:
+                self.done = True
+                break
+            info = tarfile.TarInfo.frombuf(block, "utf-8", "surrogateescape")
+            if info.size > self.max_member:
+                raise ValueError(f"bundle member too large: {info.name}")
+            self.name = info.name
+            self.keep = info.isreg()
+            self.remaining = info.size
+            self.pad = (-info.size) % TAR_BLOCK
+            if not self.remaining:
+                self._finish(out)
+        return out
+
+    def _finish(self, out: List[Tuple[str, bytes]]) -> None:
+        if self.keep and self.name is not None:
+            out.append((self.name, bytes(self.data)))
+        self.data = bytearray()
+        self.name = None
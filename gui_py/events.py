@@ -0,0 +1,63 @@
+import json
+import asyncio
+from typing import Any, Dict, Optional, Set, Tuple
+
+#this part do that
+#bus d'événements delta pour les clients push (SSE /api/events)
+
+MAX_PENDING = 5000
+
+
+class Subscriber:
+    """Deltas en attente pour un client, fusionnés par (type, id).
+
+    Un même objet modifié plusieurs fois avant l'envoi n'est transmis qu'une
+    fois avec son dernier état. Si le client prend trop de retard
+    (plus de MAX_PENDING objets distincts), les deltas sont abandonnés et un
+    unique événement `resync` demande au client de recharger un instantané.
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING):
+        self.pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.max_pending = max_pending
+        self.overflow = False
+        self.wake = asyncio.Event()
+
+    def push(self, kind: str, key: str, data: Dict[str, Any]) -> None:
+        if self.overflow:
+            return
+        if len(self.pending) >= self.max_pending and (kind, key) not in self.pending:
+            self.pending.clear()
+            self.overflow = True
+        else:
+            self.pending[(kind, key)] = data
+        self.wake.set()
+
+    async def next_batch(self) -> Tuple[bool, Dict[Tuple[str, str], Dict[str, Any]]]:
+        await self.wake.wait()
+        self.wake.clear()
+        overflow, self.overflow = self.overflow, False
+        batch, self.pending = self.pending, {}
+        return overflow, batch
+
+
+class EventBus:
+    def __init__(self):
+        self.subscribers: Set[Subscriber] = set()
+
+    def publish(self, kind: str, key: str, data: Dict[str, Any]) -> None:
+        for sub in self.subscribers:
+            sub.push(kind, key, data)
+
+    def subscribe(self) -> Subscriber:
+        sub = Subscriber()
+        self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        self.subscribers.discard(sub)
+
+
+def sse(kind: str, data: Any, event_id: Optional[int] = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {kind}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
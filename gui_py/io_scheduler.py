@@ -0,0 +1,227 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from progress import RateWindow
+
+logger = logging.getLogger("gui_py")
+
+#this part do that
+#lectures des sources servies aux agents: nombre de lectures simultanées borné par disque, gros blocs séquentiels, partage équitable entre agents
+
+IO_READS_PER_DEVICE = int(os.environ.get("IO_READS_PER_DEVICE", "2"))
+IO_READ_AHEAD = int(os.environ.get("IO_READ_AHEAD_MB", "8")) << 20
+#limites propres à certains disques: "/mnt/nas=4;/srv/ssd=16" (0 = sans limite)
+IO_DEVICE_READS = os.environ.get("IO_DEVICE_READS", "")
+_FADVISE = hasattr(os, "posix_fadvise")
+
+
+def parse_device_reads(raw: str) -> List[Tuple[str, int]]:
+    out: List[Tuple[str, int]] = []
+    for item in raw.split(";"):
+        path, sep, n = item.strip().rpartition("=")
+        if not sep or not path:
+            continue
+        try:
+            out.append((path, max(0, int(n))))
+        except ValueError:
+            logger.warning("invalid IO_DEVICE_READS entry %r", item)
+    return out
+
+
+def mount_point(path: str) -> str:
+    #répertoire le plus haut sur le même périphérique que `path` (nom affiché dans /api/io)
+    try:
+        dev = os.stat(path).st_dev
+        cur = os.path.dirname(os.path.abspath(path))
+        while True:
+            parent = os.path.dirname(cur)
+            if parent == cur or os.stat(parent).st_dev != dev:
+                return cur
+            cur = parent
+    except OSError:
+        return os.path.dirname(path)
+
+
+def advise(fd: int, offset: int, length: int, sequential: bool = False) -> None:
+    #indications au noyau: lecture séquentielle (fenêtre de read-ahead élargie) puis préchargement de la suite
+    if not _FADVISE:
+        return
+    try:
+        if sequential:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        if length > 0:
+            os.posix_fadvise(fd, offset, length, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+
+
+class DeviceQueue:
+    """Créneaux de lecture d'un périphérique, attribués par équité entre clients.
+
+    Un créneau couvre une lecture (un bloc de read-ahead), pas tout un
+    transfert: un agent qui consomme lentement son entrée ne bloque pas le
+    disque. En attente, le créneau libéré va au client qui a reçu le moins
+    d'octets sur ce disque (file équitable à temps virtuel), quel que soit
+    son nombre de flux ouverts.
+    """
+
+    def __init__(self, dev: int, name: str, limit: int, window: int = 30):
+        self.dev = dev
+        self.name = name
+        self.limit = limit
+        self.active = 0
+        self.waiters: Dict[str, Deque[asyncio.Future]] = {}
+        self.served: Dict[str, float] = {}
+        self.vclock = 0.0
+        self.reads = 0
+        self.total_bytes = 0
+        self.wait_max = 0.0
+        self.bytes = RateWindow(window)
+        self.waits = RateWindow(window)
+        self.grants = RateWindow(window)
+        self.clients: Dict[str, RateWindow] = {}
+        self.window = window
+
+    def queued(self) -> int:
+        return sum(1 for q in self.waiters.values() for f in q if not f.done())
+
+    async def acquire(self, client: str) -> float:
+        if self.limit <= 0 or (self.active < self.limit and not self.queued()):
+            self.active += 1
+            self._granted(0.0)
+            return 0.0
+        fut = asyncio.get_running_loop().create_future()
+        self.waiters.setdefault(client, deque()).append(fut)
+        t0 = time.monotonic()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            # créneau déjà attribué au moment de l'annulation: rendu aussitôt
+            if fut.done() and not fut.cancelled():
+                self.release(client, 0)
+            raise
+        waited = time.monotonic() - t0
+        self._granted(waited)
+        return waited
+
+    def _granted(self, waited: float) -> None:
+        self.grants.add(1)
+        self.waits.add(waited * 1000)
+        self.wait_max = max(self.wait_max, waited)
+
+    def release(self, client: str, nbytes: int) -> None:
+        self.active -= 1
+        self.served[client] = max(self.served.get(client, 0.0), self.vclock) + nbytes
+        if nbytes:
+            self.reads += 1
+            self.total_bytes += nbytes
+            self.bytes.add(nbytes)
+            rate = self.clients.get(client)
+            if rate is None:
+                rate = self.clients[client] = RateWindow(self.window)
+            rate.add(nbytes)
+        self._grant_next()
+
+    def _grant_next(self) -> None:
+        while self.limit <= 0 or self.active < self.limit:
+            best: Optional[str] = None
+            best_tag = 0.0
+            for client, q in list(self.waiters.items()):
+                while q and q[0].done():
+                    q.popleft()
+                if not q:
+                    del self.waiters[client]
+                    continue
+                tag = max(self.served.get(client, 0.0), self.vclock)
+                if best is None or tag < best_tag:
+                    best, best_tag = client, tag
+            if best is None:
+                if not self.active:
+                    # disque au repos: l'historique d'équité repart de zéro
+                    self.served.clear()
+                    self.vclock = 0.0
+                return
+            self.vclock = best_tag
+            self.active += 1
+            self.waiters[best].popleft().set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        grants = self.grants.rate() * self.grants.seconds
+        return {"device": self.dev, "path": self.name, "limit": self.limit, "active": self.active, "queued": self.queued(),
+                "bytesPerSec": round(self.bytes.rate()), "reads": self.reads, "totalBytes": self.total_bytes,
+                "waitAvgMs": round(self.waits.rate() * self.waits.seconds / grants, 1) if grants else 0.0,
+                "waitMaxMs": round(self.wait_max * 1000, 1),
+                "clients": {c: round(r.rate()) for c, r in self.clients.items() if r.rate() > 0}}
+
+
+class ReadStream:
+    """Lectures d'un transfert (une réponse /stream/input) passant par la file de son disque."""
+
+    def __init__(self, device: DeviceQueue, client: str, chunk: int):
+        self.device = device
+        self.client = client
+        self.chunk = chunk
+        self.advised = False
+
+    @asynccontextmanager
+    async def slot(self, nbytes: int) -> AsyncIterator[None]:
+        await self.device.acquire(self.client)
+        try:
+            yield
+        finally:
+            self.device.release(self.client, nbytes)
+
+    async def read(self, fd: int, size: int, offset: int) -> bytes:
+        async with self.slot(size):
+            data = await asyncio.to_thread(_read_ahead, fd, size, offset, self.chunk, not self.advised)
+        self.advised = True
+        return data
+
+
+def _read_ahead(fd: int, size: int, offset: int, ahead: int, first: bool) -> bytes:
+    if first:
+        advise(fd, 0, 0, sequential=True)
+    data = os.pread(fd, size, offset)
+    # la suite est demandée au noyau pendant l'envoi de ce bloc
+    advise(fd, offset + len(data), ahead)
+    return data
+
+
+class ReadScheduler:
+    """Une DeviceQueue par périphérique (st_dev) des sources; limite par défaut ou IO_DEVICE_READS."""
+
+    def __init__(self, per_device: int = IO_READS_PER_DEVICE, read_ahead: int = IO_READ_AHEAD, overrides: str = IO_DEVICE_READS):
+        self.per_device = per_device
+        self.read_ahead = max(1 << 20, read_ahead)
+        self.overrides = parse_device_reads(overrides)
+        self.devices: Dict[int, DeviceQueue] = {}
+
+    def _describe(self, path: str, dev: int) -> Tuple[str, int]:
+        limit = self.per_device
+        for prefix, n in self.overrides:
+            try:
+                if os.stat(prefix).st_dev == dev:
+                    limit = n
+                    break
+            except OSError:
+                continue
+        return mount_point(path), limit
+
+    async def stream(self, path: str, st: os.stat_result, client: str) -> ReadStream:
+        q = self.devices.get(st.st_dev)
+        if q is None:
+            # première source de ce disque: nom et limite résolus hors de la boucle (accès disque)
+            name, limit = await asyncio.to_thread(self._describe, path, st.st_dev)
+            q = self.devices.get(st.st_dev)
+            if q is None:
+                q = self.devices[st.st_dev] = DeviceQueue(st.st_dev, name, limit)
+                logger.info("io device %s (%s) reads=%s", st.st_dev, name, limit or "unlimited")
+        return ReadStream(q, client, self.read_ahead)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"perDevice": self.per_device, "readAheadBytes": self.read_ahead, "devices": [q.stats() for q in self.devices.values()]}
@@ -0,0 +1,64 @@
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+#this part do that
+#listes de jobs filtrées/triées/paginées avec index d'ordre mis en cache
+
+SORT_KEYS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "createdAt": lambda j: j.get("createdAt") or 0,
+    "updatedAt": lambda j: j.get("updatedAt") or 0,
+    "sizeBytes": lambda j: j.get("sizeBytes") or 0,
+    "status": lambda j: j.get("status") or "",
+    "path": lambda j: j.get("relativePath") or j.get("sourcePath") or "",
+    "nodeId": lambda j: j.get("nodeId") or "",
+}
+
+
+class JobQuery:
+    """Pagination sur un dict de jobs potentiellement très grand.
+
+    Trier 500k jobs à chaque page coûterait O(n log n) par défilement; la
+    liste ordonnée des ids est donc gardée par (filtres, tri) et n'est
+    reconstruite que si les jobs ont changé (génération) ET que l'index a
+    plus de `max_age` secondes. Les lignes renvoyées sont toujours lues en
+    direct; seul l'ordre/l'appartenance peut avoir jusqu'à `max_age` de retard.
+    """
+
+    def __init__(self, jobs: Dict[str, Dict[str, Any]], max_age: float = 2.0, max_entries: int = 8):
+        self.jobs = jobs
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.generation = 0
+        self._cache: Dict[Tuple, Tuple[float, int, List[str]]] = {}
+
+    def touch(self) -> None:
+        self.generation += 1
+
+    def _ids(self, status: Optional[str], agent: Optional[str], sort: str, desc: bool) -> List[str]:
+        key = (status, agent, sort, desc)
+        now = time.monotonic()
+        hit = self._cache.get(key)
+        if hit and (hit[1] == self.generation or now - hit[0] < self.max_age):
+            return hit[2]
+        statuses = set(status.split(",")) if status else None
+        ids = [jid for jid, j in self.jobs.items()
+               if (statuses is None or j.get("status") in statuses) and (agent is None or j.get("nodeId") == agent)]
+        if sort != "createdAt" or desc:
+            keyfn = SORT_KEYS.get(sort, SORT_KEYS["createdAt"])
+            ids.sort(key=lambda jid: keyfn(self.jobs.get(jid) or {}), reverse=desc)
+        if len(self._cache) >= self.max_entries and key not in self._cache:
+            self._cache.pop(min(self._cache, key=lambda k: self._cache[k][0]))
+        self._cache[key] = (now, self.generation, ids)
+        return ids
+
+    def page(self, offset: int = 0, limit: int = 200, status: Optional[str] = None, agent: Optional[str] = None,
+             sort: str = "createdAt", desc: bool = False, row: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None) -> Dict[str, Any]:
+        ids = self._ids(status or None, agent or None, sort if sort in SORT_KEYS else "createdAt", desc)
+        offset = max(0, offset)
+        limit = max(0, min(limit, 5000))
+        out: List[Dict[str, Any]] = []
+        for jid in ids[offset:offset + limit]:
+            job = self.jobs.get(jid)
+            if job is not None:
+                out.append(row(job) if row else job)
+        return {"total": len(ids), "offset": offset, "jobs": out}
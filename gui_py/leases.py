@@ -0,0 +1,75 @@
+import os
+import heapq
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+#this part do that
+#gestion des baux: expiration des agents, reprise des jobs orphelins, exécution spéculative
+
+
+class LeaseManager:
+    """Politique de reprise des jobs perdus et choix des traînards à dupliquer.
+
+    L'état des jobs reste dans JOBS; cette classe ne garde que la file des
+    jobs en attente de nouvel essai (tas trié par instant de disponibilité)
+    et les paramètres de la politique.
+    """
+
+    def __init__(self):
+        self.heartbeat_timeout = float(os.environ.get("AGENT_HEARTBEAT_TIMEOUT_SEC", "35"))
+        self.max_attempts = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+        self.backoff_base = float(os.environ.get("JOB_RETRY_BACKOFF_SEC", "5"))
+        self.backoff_max = float(os.environ.get("JOB_RETRY_BACKOFF_MAX_SEC", "300"))
+        self.speculative = os.environ.get("SPECULATIVE_EXECUTION", "").lower() in ("1", "true", "yes")
+        self.spec_min_elapsed = float(os.environ.get("SPECULATIVE_MIN_ELAPSED_SEC", "60"))
+        self._delayed: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._delayed)
+
+    def backoff(self, attempts: int) -> float:
+        return min(self.backoff_max, self.backoff_base * (2 ** max(0, attempts - 1)))
+
+    def exhausted(self, attempts: int) -> bool:
+        return attempts >= self.max_attempts
+
+    def delay(self, job_id: str, seconds: float) -> None:
+        heapq.heappush(self._delayed, (time.monotonic() + seconds, job_id))
+
+    def due(self) -> List[str]:
+        now = time.monotonic()
+        out: List[str] = []
+        while self._delayed and self._delayed[0][0] <= now:
+            out.append(heapq.heappop(self._delayed)[1])
+        return out
+
+    def stale_agents(self, agents: Dict[str, Dict[str, Any]], now_ms: int) -> List[str]:
+        limit = self.heartbeat_timeout * 1000
+        return [aid for aid, rec in agents.items() if now_ms - int(rec.get("info", {}).get("lastHeartbeat") or 0) > limit]
+
+    def stragglers(self, running: Iterable[Dict[str, Any]], progress: Dict[str, Optional[Dict[str, Any]]], limit: int) -> List[Dict[str, Any]]:
+        """Jobs en cours sans copie spéculative, du plus lent au moins lent.
+
+        Le temps restant estimé (ETA) sert de clé quand il est connu; sinon
+        l'ancienneté du dernier message de progression puis la durée écoulée.
+        """
+        if limit <= 0:
+            return []
+        scored: List[Tuple[float, str, Dict[str, Any]]] = []
+        now = time.time() * 1000
+        for job in running:
+            if job.get("specNodeId"):
+                continue
+            started = job.get("leasedAt") or job.get("updatedAt") or now
+            elapsed = (now - started) / 1000
+            if elapsed < self.spec_min_elapsed:
+                continue
+            p = progress.get(job["id"])
+            if p and p.get("etaSec") is not None:
+                score = float(p["etaSec"])
+            elif p:
+                score = float(p.get("idleSec") or 0) + elapsed
+            else:
+                score = elapsed
+            scored.append((-score, job["id"], job))
+        return [j for _, _, j in heapq.nsmallest(limit, scored)]
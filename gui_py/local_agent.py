@@ -0,0 +1,230 @@
+import os
+import re
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger("gui_py")
+
+#this part do that
+#exécuteur local: pool de processus ffmpeg sur la machine du contrôleur, vu comme un agent de plus
+
+FFMPEG_PATH = os.environ.get("FFMPEG_PATH", "ffmpeg")
+HEARTBEAT_SEC = float(os.environ.get("LOCAL_HEARTBEAT_SEC", "10"))
+
+_ENCODER_NAME = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+
+def local_part_path(output_path: str, spec: bool = False) -> str:
+    #même extension que la sortie: ffmpeg choisit le muxer d'après le nom
+    root, ext = os.path.splitext(output_path)
+    return root + (".local-spec-part" if spec else ".local-part") + ext
+
+
+def host_load() -> Dict[str, Any]:
+    #charge de la machine du contrôleur (signaux de l'autotune); load1 absent sous Windows, memFree hors Linux
+    out: Dict[str, Any] = {"cpus": os.cpu_count() or 1}
+    try:
+        out["load1"] = os.getloadavg()[0]
+    except (AttributeError, OSError):
+        pass
+    try:
+        with open("/proc/meminfo") as f:
+            mem = dict(line.split(":", 1) for line in f if ":" in line)
+        out["memFree"] = int(mem["MemAvailable"].split()[0]) / int(mem["MemTotal"].split()[0])
+    except (OSError, KeyError, ValueError, ZeroDivisionError):
+        pass
+    return out
+
+
+async def detect_encoders(ffmpeg_path: str = FFMPEG_PATH) -> Optional[List[str]]:
+    """Encodeurs de `ffmpeg -encoders`; None si ffmpeg est introuvable."""
+    try:
+        proc = await asyncio.create_subprocess_exec(ffmpeg_path, "-hide_banner", "-encoders",
+                                                    stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+    except (FileNotFoundError, PermissionError):
+        return None
+    out, _ = await proc.communicate()
+    return parse_encoders(out.decode(errors="replace"))
+
+
+def parse_encoders(text: str) -> List[str]:
+    """Noms d'encodeurs d'une sortie `ffmpeg -encoders` (2e colonne des lignes après le séparateur ------).
+
+    Les lignes de légende qui précèdent le séparateur (" V..... = Video") ne sont pas des encodeurs.
+    """
+    encoders: List[str] = []
+    listing = False
+    for line in text.splitlines():
+        fields = line.split()
+        if not listing:
+            listing = bool(fields) and set(fields[0]) == {"-"}
+            continue
+        if len(fields) >= 2 and _ENCODER_NAME.match(fields[1]):
+            encoders.append(fields[1])
+    return encoders
+
+
+class LocalExecutor:
+    """Côté « socket » d'un agent interne au contrôleur.
+
+    Reçoit les mêmes messages qu'un agent distant (lease, leases, cancel)
+    via une Outbox, lit sourcePath et écrit à côté de outputPath sans passer
+    par HTTP, et renvoie heartbeat/lease-accepted/progress/output-ready/
+    complete par `report(type, payload)`: le contrôleur applique la même
+    machine d'états que pour un agent distant.
+    """
+
+    def __init__(self, agent_id: str, report: Callable[[str, Dict[str, Any]], Awaitable[None]],
+                 ffmpeg_path: str = FFMPEG_PATH, heartbeat_sec: float = HEARTBEAT_SEC):
+        self.agent_id = agent_id
+        self.report = report
+        self.ffmpeg_path = ffmpeg_path
+        self.heartbeat_sec = heartbeat_sec
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.procs: Dict[str, asyncio.subprocess.Process] = {}
+        self.cancelled: set = set()
+        self.closed = False
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._heartbeat = asyncio.create_task(self._beat())
+
+    async def send_json(self, msg: Dict[str, Any]) -> None:
+        mtype = msg.get("type")
+        payload = msg.get("payload") or {}
+        if mtype == "lease":
+            self._spawn(payload)
+        elif mtype == "leases":
+            for p in payload.get("jobs") or []:
+                self._spawn(p)
+        elif mtype == "cancel":
+            jid = payload.get("jobId")
+            if jid not in self.tasks:
+                return
+            self.cancelled.add(jid)
+            proc = self.procs.get(jid)
+            if proc and proc.returncode is None:
+                proc.kill()
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed = True
+        if self._heartbeat:
+            self._heartbeat.cancel()
+        for proc in list(self.procs.values()):
+            if proc.returncode is None:
+                proc.kill()
+        for task in list(self.tasks.values()):
+            task.cancel()
+
+    def _spawn(self, p: Dict[str, Any]) -> None:
+        if self.closed or not p.get("jobId") or p["jobId"] in self.tasks:
+            return
+        task = asyncio.create_task(self._run(p))
+        self.tasks[p["jobId"]] = task
+        task.add_done_callback(lambda _t, jid=p["jobId"]: self.tasks.pop(jid, None))
+
+    async def _beat(self) -> None:
+        while True:
+            try:
+                await self.report("heartbeat", {"id": self.agent_id, "activeJobs": len(self.tasks), **host_load()})
+            except Exception as e:
+                logger.debug("local heartbeat failed %s", e)
+            await asyncio.sleep(self.heartbeat_sec)
+
+    async def _run(self, p: Dict[str, Any]) -> None:
+        jid = p["jobId"]
+        spec = bool(p.get("spec"))
+        bundle = p.get("bundle")
+        outputs = bundle if bundle is not None else p.get("outputs") or [p]
+        parts = [o["partPath"] for o in outputs]
+        success = False
+        try:
+            await self.report("lease-accepted", {"jobId": jid})
+            for part in parts:
+                await asyncio.to_thread(os.makedirs, os.path.dirname(part) or ".", exist_ok=True)
+            if bundle is not None:
+                ready = await self._bundle(jid, p)
+            else:
+                args = ["-i", p["inputPath"], *(p.get("ffmpegArgs") or [])]
+                if p.get("outputs"):
+                    for o in outputs:
+                        args += [*(o.get("ffmpegArgs") or []), o["partPath"]]
+                else:
+                    args.append(p["partPath"])
+                rc = await self._ffmpeg(jid, args)
+                ready = [i if p.get("outputs") else None for i in range(len(parts))] if rc == 0 else []
+            if jid in self.cancelled:
+                return
+            for index in ready:
+                await self.report("output-ready", {"jobId": jid, "rendition": index, "spec": spec})
+            # lot: les fichiers absents sont marqués en échec un par un par le contrôleur
+            success = bool(ready) or bundle == []
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("local job failed job=%s %s", jid, e)
+        finally:
+            self.procs.pop(jid, None)
+            for part in parts:
+                try:
+                    os.remove(part)
+                except OSError:
+                    pass
+            if not self.closed:
+                # toujours signalé, même annulé (copie perdante): le contrôleur libère le créneau et l'autotune
+                await self.report("complete", {"jobId": jid, "agentId": self.agent_id, "success": success and jid not in self.cancelled})
+            self.cancelled.discard(jid)
+
+    async def _ffmpeg(self, jid: str, args: List[str]) -> int:
+        if jid in self.cancelled:
+            return 130
+        logger.info("local ffmpeg start job=%s", jid)
+        proc = await asyncio.create_subprocess_exec(self.ffmpeg_path, *args, stdin=asyncio.subprocess.DEVNULL,
+                                                    stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        self.procs[jid] = proc
+        # stderr lu en parallèle (-loglevel error): évite qu'un tube plein bloque ffmpeg
+        err_task = asyncio.create_task(proc.stderr.read())
+        await self._progress(jid, proc.stdout)
+        rc = await proc.wait()
+        err = (await err_task).decode(errors="replace").strip()
+        if rc != 0 and jid not in self.cancelled:
+            logger.warning("local ffmpeg failed job=%s rc=%s %s", jid, rc, err[-500:])
+        return rc
+
+    async def _bundle(self, jid: str, p: Dict[str, Any]) -> List[int]:
+        #lot d'images: une seule invocation (N entrées, N sorties); en cas d'échec, fichier par fichier pour isoler le fautif
+        members = p["bundle"]
+        head = p.get("ffmpegArgs") or []
+        tail = p.get("outputArgs") or []
+        args = list(head)
+        for m in members:
+            args += ["-i", m["inputPath"]]
+        for i, m in enumerate(members):
+            args += ["-map", f"{i}:v:0", *tail, m["partPath"]]
+        if not members or await self._ffmpeg(jid, args) == 0:
+            return [m["index"] for m in members]
+        ready: List[int] = []
+        if len(members) == 1:
+            return ready
+        for m in members:
+            if jid in self.cancelled:
+                break
+            if await self._ffmpeg(jid, [*head, "-i", m["inputPath"], "-map", "0:v:0", *tail, m["partPath"]]) == 0:
+                ready.append(m["index"])
+        return ready
+
+    async def _progress(self, jid: str, stream: asyncio.StreamReader) -> None:
+        #-progress pipe:1: blocs clé=valeur terminés par progress=continue|end
+        block: Dict[str, str] = {"jobId": jid}
+        while True:
+            line = await stream.readline()
+            if not line:
+                break
+            key, _, value = line.decode(errors="replace").strip().partition("=")
+            if not key:
+                continue
+            block[key] = value
+            if key == "progress":
+                await self.report("progress", block)
+                block = {"jobId": jid}
@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Tuple
+
+#this part do that
+#journalisation sans blocage: la boucle d'événements met les enregistrements en file, un thread écrit le fichier
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+#"text" (défaut) ou "json" (un objet par ligne)
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+#par message (gabarit) et par niveau: débit soutenu et rafale tolérée avant échantillonnage (0 = illimité)
+LOG_RATE_PER_SEC = float(os.environ.get("LOG_RATE_PER_SEC", "20"))
+LOG_BURST = int(os.environ.get("LOG_BURST", "100"))
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(message)s%(suppressed)s"
+
+
+class RateLimitFilter(logging.Filter):
+    """Seau à jetons par (niveau, gabarit du message).
+
+    Un événement par message (upload terminé, erreur d'envoi à un agent
+    mort...) ne peut pas noyer le fichier: au-delà de la rafale, seuls
+    `rate` enregistrements par seconde passent; le suivant qui passe
+    indique combien ont été écartés. ERROR et au-delà passent toujours.
+    """
+
+    def __init__(self, rate: float = LOG_RATE_PER_SEC, burst: int = LOG_BURST):
+        super().__init__()
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.buckets: Dict[Tuple[int, Any], list] = {}
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.suppressed = ""
+        record.suppressed_count = 0
+        if self.rate <= 0 or record.levelno >= logging.ERROR:
+            return True
+        key = (record.levelno, record.msg)
+        now = time.monotonic()
+        b = self.buckets.get(key)
+        if b is None:
+            if len(self.buckets) > 4096:
+                # gabarits construits à la volée (f-strings): on repart de zéro plutôt que de grossir sans fin
+                self.buckets.clear()
+            b = self.buckets[key] = [float(self.burst), now, 0]
+        tokens = min(float(self.burst), b[0] + (now - b[1]) * self.rate)
+        b[1] = now
+        if tokens < 1:
+            b[0] = tokens
+            b[2] += 1
+            self.suppressed += 1
+            return False
+        b[0] = tokens - 1
+        if b[2]:
+            record.suppressed = " [+%d similar suppressed]" % b[2]
+            record.suppressed_count = b[2]
+            b[2] = 0
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out: Dict[str, Any] = {"ts": self.formatTime(record), "level": record.levelname, "logger": record.name,
+                               "msg": record.getMessage()}
+        # trace d'exception déjà incluse dans le message par QueueHandler.prepare
+        if getattr(record, "suppressed_count", 0):
+            out["suppressed"] = record.suppressed_count
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler qui ne bloque jamais l'appelant: file pleine = enregistrement compté puis abandonné."""
+
+    def __init__(self, q: "queue.Queue"):
+        super().__init__(q)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipe:
+    """Handler en file sur le logger, RotatingFileHandler servi par un QueueListener (thread)."""
+
+    def __init__(self, handler: NonBlockingQueueHandler, listener: QueueListener, limiter: RateLimitFilter):
+        self.handler = handler
+        self.listener = listener
+        self.limiter = limiter
+
+    @property
+    def dropped(self) -> int:
+        return self.handler.dropped
+
+    def stats(self) -> Dict[str, Any]:
+        return {"queued": self.handler.queue.qsize(), "dropped": self.handler.dropped, "suppressed": self.limiter.suppressed}
+
+    def stop(self) -> None:
+        #vide la file avant de rendre la main (arrêt propre)
+        try:
+            self.listener.stop()
+        except Exception:
+            pass
+
+
+def setup_logging(logger: logging.Logger, path: str, level: str = LOG_LEVEL, fmt: str = LOG_FORMAT,
+                  max_bytes: int = 5_000_000, backups: int = 3) -> LogPipe:
+    level_no = logging.getLevelName(level)
+    if not isinstance(level_no, int):
+        level_no = logging.INFO
+    # niveau posé sur le logger: un debug() filtré s'arrête à isEnabledFor, sans formatage ni mise en file
+    logger.setLevel(level_no)
+    file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+    file_handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+    q: "queue.Queue" = queue.Queue(max(1, LOG_QUEUE_SIZE))
+    handler = NonBlockingQueueHandler(q)
+    limiter = RateLimitFilter()
+    handler.addFilter(limiter)
+    logger.addHandler(handler)
+    listener = QueueListener(q, file_handler, respect_handler_level=True)
+    listener.start()
+    pipe = LogPipe(handler, listener, limiter)
+    atexit.register(pipe.stop)
+    return pipe
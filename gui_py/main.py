@@ -2,20 +2,51 @@ import sys
 import os
 import asyncio
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 import logging
-from logging.handlers import RotatingFileHandler
 import time
+import threading
 import uuid
 import secrets
-import mimetypes
 import subprocess
+import json
+import stat
+import shutil
+import platform
+import tarfile
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, Form, Request
-from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.requests import ClientDisconnect
 import uvicorn
 
+from scheduler import JobScheduler, POLICIES, needs_capability
+from scanner import iter_scan
+from scan_index import ScanIndex, fingerprint
+from transfer import file_response, parse_content_range, PartWriter
+from store import JobStore
+from progress import ProgressTracker
+from events import EventBus, sse
+from job_query import JobQuery
+from leases import LeaseManager
+from autotune import ConcurrencyTuner, family_of, load_signals
+from io_scheduler import ReadScheduler
+from metrics import Registry, Timer, probe_loop_lag
+from logpipe import setup_logging
+from outbox import Outbox
+from segments import split_source, concat_segments
+from probe import ProbeCache, estimate_cost
+from remux import choose_transcode
+from result_cache import ResultCache, result_key
+from local_agent import LocalExecutor, detect_encoders, local_part_path
+from mounts import IDENTITY, parse_mounts, map_path
+from records import JobRecord, record_dict
+from plans import ScanPlan
+from bundles import IMAGE_BATCH_FILES, IMAGE_BATCH_MAX_FILE, group_bundles, member_name, member_index, tar_stream, tar_length, write_file, TarSplitter
+
 #this part do that
 #configuration de base
 PORT = int(os.environ.get("GUI_PORT", "4010"))
@@ -23,29 +54,102 @@ HOST = os.environ.get("GUI_HOST", "0.0.0.0")
 PUBLIC_BASE_URL = os.environ.get("PUBLIC_BASE_URL", f"http://localhost:{PORT}")
 AGENT_TOKEN_FALLBACK = os.environ.get("AGENT_SHARED_TOKEN", "dev-token")
 HEADLESS = os.environ.get("HEADLESS", "").lower() in ("1", "true", "yes")
+SCHEDULER_POLICY = os.environ.get("SCHEDULER_POLICY", "largest")
+DATA_DIR = Path(os.environ.get("GUI_DATA_DIR", str(Path(__file__).parent / "data")))
+SCAN_INDEX_PATH = os.environ.get("SCAN_INDEX_PATH", str(DATA_DIR / "scan-index.sqlite"))
+JOB_STORE_PATH = os.environ.get("JOB_STORE_PATH", str(DATA_DIR / "jobs.sqlite"))
+LEASE_TICK_SEC = float(os.environ.get("LEASE_TICK_SEC", "5"))
+PREFETCH_DEPTH = int(os.environ.get("PREFETCH_DEPTH", "2"))
+SEGMENT_PARALLEL = os.environ.get("SEGMENT_PARALLEL", "").lower() in ("1", "true", "yes")
+SEGMENT_MIN_BYTES = int(os.environ.get("SEGMENT_MIN_BYTES", str(512 << 20)))
+SEGMENT_TARGET_SEC = float(os.environ.get("SEGMENT_TARGET_SEC", "120"))
+SEGMENTS_DIR = DATA_DIR / "segments"
+PROBE_CACHE_PATH = os.environ.get("PROBE_CACHE_PATH", str(DATA_DIR / "probe.sqlite"))
+PROBE_ENABLED = os.environ.get("PROBE_ENABLED", "1").lower() in ("1", "true", "yes")
+RESULT_CACHE_ENABLED = os.environ.get("RESULT_CACHE", "").lower() in ("1", "true", "yes")
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(20 << 30)))
+#encodages simultanés sur la machine du contrôleur (0 = désactivé, "auto" = un par tranche de 4 cœurs)
+LOCAL_WORKERS = os.environ.get("LOCAL_WORKERS", "0").strip().lower()
+#plans de scan gardés en mémoire en attente de /api/start (les plus anciens sont oubliés)
+PLAN_MAX = int(os.environ.get("PLAN_MAX", "4"))
 
 #this other part do that
-#logger avec rotation
+#logger avec rotation, écrit par un thread (LOG_LEVEL, LOG_FORMAT=json, LOG_RATE_PER_SEC)
 logs_dir = Path(__file__).parent / "logs"
 logs_dir.mkdir(parents=True, exist_ok=True)
 log_path = logs_dir / "python-gui.log"
 logger = logging.getLogger("gui_py")
-logger.setLevel(logging.DEBUG)
-handler = RotatingFileHandler(log_path, maxBytes=5_000_000, backupCount=3)
-formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
-handler.setFormatter(formatter)
-logger.addHandler(handler)
-logger.debug("Python GUI starting")
+LOG_PIPE = setup_logging(logger, str(log_path))
+logger.info("Python GUI starting")
 
 #this part do that
 #application FastAPI pour agents et conversions rapides
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    await startup()
+    try:
+        yield
+    finally:
+        await shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 # mémoire minimale (pairing codes + agents list)
 ALLOWED_TOKENS = set([AGENT_TOKEN_FALLBACK])
 AGENTS: Dict[str, Dict[str, Any]] = {}
 JOBS: Dict[str, Dict[str, Any]] = {}
-PENDING_JOBS: List[str] = []
+if SCHEDULER_POLICY not in POLICIES:
+    # valeur d'environnement invalide: le contrôleur démarre quand même avec la politique par défaut
+    logger.warning("unknown SCHEDULER_POLICY=%r, using largest", SCHEDULER_POLICY)
+    SCHEDULER_POLICY = "largest"
+SCHEDULER = JobScheduler(SCHEDULER_POLICY)
+SCAN_INDEX = ScanIndex(SCAN_INDEX_PATH)
+PROBES = ProbeCache(PROBE_CACHE_PATH)
+RESULTS = ResultCache(str(DATA_DIR / "results.sqlite"), str(DATA_DIR / "results"), RESULT_CACHE_MAX_BYTES)
+#clé de résultat -> jobs identiques qui attendent la fin du premier encodage
+RESULT_WAITERS: Dict[str, List[str]] = {}
+#clé de résultat -> job de référence qui l'encode; clés ayant des jobs en attente (vérifiées par lease_tick)
+RESULT_REFS: Dict[str, str] = {}
+RESULT_WAITED: set = set()
+UPLOADS_ACTIVE: set = set()
+SPAWNED_TASKS: set = set()
+PLANS: "OrderedDict[str, ScanPlan]" = OrderedDict()
+#lots d'images pas encore terminés
+BUNDLES: set = set()
+JOB_STORE = JobStore(JOB_STORE_PATH)
+PROGRESS = ProgressTracker(window=int(os.environ.get("PROGRESS_WINDOW_SEC", "30")))
+EVENTS = EventBus()
+JOB_QUERY = JobQuery(JOBS)
+LEASES = LeaseManager()
+TUNER = ConcurrencyTuner()
+READS = ReadScheduler()
+#métriques exposées par /metrics (Prometheus) et /api/metrics; les jauges sont calculées à la lecture
+METRICS = Registry("ffmpegeasy_")
+METRICS.gauge("jobs", "Jobs connus du contrôleur", fn=lambda: len(JOBS))
+METRICS.gauge("jobs_queued", "Jobs en file d'attente de dispatch", fn=lambda: len(SCHEDULER))
+METRICS.gauge("jobs_retrying", "Jobs en attente d'un nouvel essai", fn=lambda: len(LEASES))
+METRICS.gauge("jobs_running", "Baux en cours sur les agents", fn=lambda: sum(a["info"].get("activeJobs", 0) for a in AGENTS.values()))
+METRICS.gauge("agents", "Agents connectés", fn=lambda: len(AGENTS))
+M_JOBS_DONE = METRICS.counter("jobs_finished_total", "Jobs terminés", ("result",))
+M_DISPATCH = METRICS.histogram("dispatch_seconds", "Durée d'un passage de try_dispatch")
+M_LEASES = METRICS.counter("leases_total", "Baux attribués (copies spéculatives comprises)")
+M_LEASE_WAIT = METRICS.histogram("lease_wait_seconds", "Attente d'un job entre sa dernière transition et son bail")
+M_INPUT = METRICS.counter("stream_input_requests_total", "Requêtes /stream/input", ("kind",))
+METRICS.counter("stream_input_bytes_total", "Octets de sources lus pour /stream/input (hors lots)",
+                fn=lambda: sum(q.total_bytes for q in READS.devices.values()))
+M_BUNDLE_BYTES = METRICS.counter("bundle_input_bytes_total", "Octets des archives de lots servies")
+M_OUTPUT = METRICS.counter("stream_output_requests_total", "Uploads /stream/output", ("result",))
+M_OUTPUT_BYTES = METRICS.counter("stream_output_bytes_total", "Octets reçus sur /stream/output")
+M_OUTPUT_TIME = METRICS.histogram("stream_output_seconds", "Durée d'un upload /stream/output")
+M_WS_IN = METRICS.counter("agent_messages_received_total", "Messages websocket reçus des agents", ("type",))
+#étiquettes bornées: tout autre type reçu est compté sous "other"
+AGENT_MESSAGE_TYPES = frozenset({"register", "heartbeat", "lease-accepted", "progress", "complete", "output-ready"})
+METRICS.counter("agent_messages_sent_total", "Messages envoyés aux agents", fn=lambda: Outbox.sent_total)
+M_LOOP_LAG = METRICS.histogram("event_loop_lag_seconds", "Retard de la boucle d'événements (sonde périodique)")
+METRICS.counter("log_records_dropped_total", "Enregistrements de journal perdus (file pleine)", fn=lambda: LOG_PIPE.dropped)
+METRICS.counter("log_records_suppressed_total", "Enregistrements de journal écartés par la limite de débit", fn=lambda: LOG_PIPE.limiter.suppressed)
+M_LOOP_LAG_LAST = METRICS.gauge("event_loop_lag_last_seconds", "Dernière mesure du retard de la boucle d'événements")
+BACKGROUND_TASKS: List[asyncio.Task] = []
 
 #this part do that
 #utilitaires communs
@@ -54,6 +158,30 @@ def now_ms() -> int:
     return int(time.time() * 1000)
 
 
+def update_job(job: Dict[str, Any], **fields: Any) -> None:
+    #toute transition d'état passe ici pour être journalisée dans le store
+    job.update(fields)
+    job["updatedAt"] = now_ms()
+    JOB_STORE.mark(job["id"])
+    JOB_QUERY.touch()
+    if EVENTS.subscribers:
+        EVENTS.publish("job", job["id"], {"id": job["id"], "status": job.get("status"), "nodeId": job.get("nodeId"), "updatedAt": job["updatedAt"]})
+        EVENTS.publish("totals", "", {})
+    if "status" in fields and job.get("parentId"):
+        segment_changed(job)
+    if "status" in fields and job.get("resultKey"):
+        result_changed(job)
+    if "status" in fields and job.get("bundle"):
+        bundle_changed(job)
+
+
+def publish_agent(agent_id: str) -> None:
+    if EVENTS.subscribers:
+        rec = AGENTS.get(agent_id)
+        EVENTS.publish("agent", agent_id, dict(rec["info"]) if rec else {"id": agent_id, "removed": True})
+        EVENTS.publish("totals", "", {})
+
+
 def get_public_base_url() -> str:
     return PUBLIC_BASE_URL.rstrip('/')
 
@@ -69,15 +197,31 @@ def compute_output_ext(media_type: str, codec: str) -> str:
     return m.get(codec, ".png")
 
 
+#options globales de toute invocation ffmpeg (avant -i), communes aux sorties multiples et aux lots
+FFMPEG_GLOBAL_ARGS = ("-hide_banner", "-nostdin", "-y", "-progress", "pipe:1", "-loglevel", "error")
+
+
 def build_ffmpeg_args(job: Dict[str, Any]) -> List[str]:
+    head, output = ffmpeg_arg_parts(job)
+    return head + output
+
+
+def ffmpeg_arg_parts(job: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    #(options globales, options de la sortie) séparées, pour les invocations à plusieurs sorties
+    return list(FFMPEG_GLOBAL_ARGS), build_output_args(job)
+
+
+def build_output_args(job: Dict[str, Any]) -> List[str]:
     media_type = job.get("mediaType")
     codec = job.get("codec")
     options = job.get("options") or {}
+    # plan copie/ré-encodage décidé au scan d'après ffprobe (voir remux.choose_transcode)
+    tc = job.get("transcode") or {}
     args: List[str] = []
-    args += ["-hide_banner", "-nostdin", "-y", "-progress", "pipe:1", "-loglevel", "error"]
     if media_type == "audio":
         args.append("-vn")
-        if codec == "flac": args += ["-c:a", "flac"]
+        if tc.get("audio") == "copy": args += ["-c:a", "copy"]
+        elif codec == "flac": args += ["-c:a", "flac"]
         elif codec == "alac": args += ["-c:a", "alac"]
         elif codec == "aac": args += ["-c:a", "aac", "-b:a", str(options.get("bitrate", "192k"))]
         elif codec == "mp3": args += ["-c:a", "libmp3lame", "-b:a", str(options.get("bitrate", "192k"))]
@@ -87,16 +231,22 @@ def build_ffmpeg_args(job: Dict[str, Any]) -> List[str]:
     elif media_type == "video":
         crf = options.get("crf", 23 if codec == "h264" else 28 if codec in ("h265", "hevc") else 32 if codec == "av1" else 23)
         preset = str(options.get("preset", "medium"))
-        args += ["-pix_fmt", "yuv420p"]
-        if codec == "h264": args += ["-c:v", "libx264", "-preset", preset, "-crf", str(crf)]
-        elif codec in ("h265", "hevc"): args += ["-c:v", "libx265", "-preset", preset, "-crf", str(crf)]
-        elif codec == "av1": args += ["-c:v", "libsvtav1", "-preset", str(options.get("svtPreset", 6)), "-crf", str(crf)]
-        elif codec == "vp9": args += ["-c:v", "libvpx-vp9", "-b:v", "0", "-crf", str(crf), "-row-mt", "1"]
-        else: args += ["-c:v", "libx264", "-preset", preset, "-crf", str(crf)]
-        if options.get("audioCopy", True) is False:
-            args += ["-c:a", "aac", "-b:a", str(options.get("audioBitrate", "160k"))]
-        else:
+        out_ext = os.path.splitext(job.get("outputPath") or "")[1].lower()
+        if tc.get("video") == "copy":
+            args += ["-c:v", "copy"]
+            if codec in ("h265", "hevc") and out_ext in (".mp4", ".mov"): args += ["-tag:v", "hvc1"]
+        elif codec == "h264": args += ["-pix_fmt", "yuv420p", "-c:v", "libx264", "-preset", preset, "-crf", str(crf)]
+        elif codec in ("h265", "hevc"): args += ["-pix_fmt", "yuv420p", "-c:v", "libx265", "-preset", preset, "-crf", str(crf)]
+        elif codec == "av1": args += ["-pix_fmt", "yuv420p", "-c:v", "libsvtav1", "-preset", str(options.get("svtPreset", 6)), "-crf", str(crf)]
+        elif codec == "vp9": args += ["-pix_fmt", "yuv420p", "-c:v", "libvpx-vp9", "-b:v", "0", "-crf", str(crf), "-row-mt", "1"]
+        else: args += ["-pix_fmt", "yuv420p", "-c:v", "libx264", "-preset", preset, "-crf", str(crf)]
+        audio = tc.get("audio") or ("encode" if options.get("audioCopy", True) is False else "copy")
+        if audio == "copy":
             args += ["-c:a", "copy"]
+        elif out_ext == ".webm":
+            args += ["-c:a", "libopus", "-b:a", str(options.get("audioBitrate", "160k"))]
+        else:
+            args += ["-c:a", "aac", "-b:a", str(options.get("audioBitrate", "160k"))]
     else:
         if codec == "avif": args += ["-c:v", "libaom-av1", "-still-picture", "1", "-b:v", "0", "-crf", str(options.get("crf", 28))]
         elif codec in ("heic", "heif"): args += ["-c:v", "libx265"]
@@ -110,32 +260,407 @@ def build_ffmpeg_args(job: Dict[str, Any]) -> List[str]:
     return args
 
 
-async def scan_files(root: str, recursive: bool, media_type: str) -> List[Dict[str, Any]]:
-    results: List[Dict[str, Any]] = []
-    exts_audio = {'.mp3', '.wav', '.flac', '.aac', '.m4a', '.ogg', '.opus', '.wma', '.aiff', '.alac'}
-    exts_video = {'.mp4', '.mkv', '.mov', '.avi', '.webm', '.m4v'}
-    exts_image = {'.jpg', '.jpeg', '.png', '.webp', '.tiff', '.bmp', '.heic', '.heif', '.avif'}
-
-    async def walk(dir_path: str):
+#capacité annoncée par les agents capables d'écrire plusieurs sorties en une invocation
+MULTI_OUTPUT = "@multi-output"
+#capacité annoncée par les agents qui traitent les lots d'images (archives tar)
+BUNDLE = "@bundle"
+
+
+def build_rendition_args(job: Dict[str, Any]) -> Tuple[List[str], List[List[str]]]:
+    #un seul décodage: split du flux vidéo vers chaque rendu, puis une sortie ffmpeg par rendu
+    renditions = job.get("renditions") or []
+    head = list(FFMPEG_GLOBAL_ARGS)
+    videos = [i for i, r in enumerate(renditions) if r.get("mediaType") == "video"]
+    graph: List[str] = []
+    if videos:
+        graph.append("[0:v:0]split=%d%s" % (len(videos), "".join(f"[s{i}]" for i in videos)))
+        for i in videos:
+            height = renditions[i].get("height")
+            graph.append(f"[s{i}]scale=-2:{int(height)}[v{i}]" if height else f"[s{i}]null[v{i}]")
+    outputs: List[List[str]] = []
+    for i, r in enumerate(renditions):
+        args = build_output_args({"mediaType": r.get("mediaType"), "codec": r.get("codec"), "options": r.get("options") or {}, "outputPath": r.get("outputPath")})
+        if r.get("mediaType") == "video":
+            outputs.append(["-map", f"[v{i}]", "-map", "0:a:0?", *args])
+        else:
+            outputs.append(["-map", "0:a:0", *args])
+    return head + (["-filter_complex", ";".join(graph)] if graph else []), outputs
+
+
+def job_encoders(job: Dict[str, Any]) -> List[str]:
+    if job.get("bundle"):
+        return required_encoders(build_ffmpeg_args(job)) + [BUNDLE]
+    if job.get("renditions"):
+        head, outputs = build_rendition_args(job)
+        return required_encoders(head + [a for o in outputs for a in o]) + [MULTI_OUTPUT]
+    return required_encoders(build_ffmpeg_args(job))
+
+
+def required_encoders(args: List[str]) -> List[str]:
+    #encodeurs ffmpeg nécessaires (hors stream copy) pour router vers les agents compatibles
+    req: List[str] = []
+    for i, a in enumerate(args[:-1]):
+        if a in ("-c", "-c:a", "-c:v") or a.startswith(("-c:a:", "-c:v:")):
+            enc = args[i + 1]
+            if enc != "copy" and enc not in req:
+                req.append(enc)
+    return req
+
+
+def enqueue_job(job: Dict[str, Any]) -> None:
+    SCHEDULER.push(job["id"], job, job_encoders(job))
+
+
+def parse_scan_request(payload: Dict[str, Any]) -> Dict[str, Any]:
+    p = payload or {}
+    req = {
+        "inputRoot": os.path.abspath(p.get("inputRoot", "").strip()),
+        "outputRoot": os.path.abspath(p.get("outputRoot", "").strip()),
+        "recursive": bool(p.get("recursive", True)),
+        "mirror": bool(p.get("mirrorStructure", True)),
+        "mediaType": p.get("mediaType", ""),
+        "codec": p.get("codec", ""),
+        "options": p.get("options", {}) or {},
+    }
+    renditions = p.get("renditions") or []
+    if renditions:
+        # plusieurs rendus d'une même source: vidéo (codec, hauteur) et/ou audio seul
+        if not isinstance(renditions, list) or any(not isinstance(r, dict) or r.get("mediaType") not in ("audio", "video") or not r.get("codec") for r in renditions):
+            raise ValueError("invalid renditions")
+        req["renditions"] = [{"name": str(r.get("name") or f"r{i}"), "mediaType": r["mediaType"], "codec": r["codec"], "height": r.get("height"),
+                              "options": r.get("options") or {}} for i, r in enumerate(renditions)]
+        req["mediaType"] = "video" if any(r["mediaType"] == "video" for r in renditions) else "audio"
+        req["codec"] = req["codec"] or req["renditions"][0]["codec"]
+    if not req["inputRoot"] or not req["outputRoot"] or req["mediaType"] not in ("audio","video","image") or not req["codec"]:
+        raise ValueError("invalid request")
+    if not os.path.isdir(req["inputRoot"]):
+        raise ValueError("inputRoot not found")
+    req["outExt"] = compute_output_ext(req["mediaType"], req["codec"])
+    if renditions:
+        head, outputs = build_rendition_args(req)
+        req["fingerprint"] = fingerprint(req["mediaType"], req["codec"], head + [a for o in outputs for a in o] + [r["name"] for r in req["renditions"]])
+    else:
+        req["fingerprint"] = fingerprint(req["mediaType"], req["codec"], build_ffmpeg_args(req))
+    req["incremental"] = bool(p.get("incremental", True))
+    req["probe"] = bool(p.get("probe", PROBE_ENABLED))
+    req["dedupe"] = bool(p.get("dedupe", RESULT_CACHE_ENABLED))
+    req["detectDeleted"] = req["incremental"] and bool(p.get("detectDeleted", False))
+    return req
+
+
+def plan_entry(req: Dict[str, Any], f: Dict[str, Any]) -> JobRecord:
+    src = f["path"]
+    rel = os.path.relpath(src, req["inputRoot"])
+    base = os.path.join(req["outputRoot"], rel) if req["mirror"] else os.path.join(req["outputRoot"], os.path.basename(rel))
+    out_path = os.path.splitext(base)[0] + req["outExt"]
+    entry = {"sourcePath": src, "relativePath": rel, "mediaType": req["mediaType"], "sizeBytes": int(f["size"]), "sourceMtime": int(f.get("mtime") or 0), "outputPath": out_path, "codec": req["codec"], "options": req["options"], "fingerprint": req["fingerprint"]}
+    if req.get("renditions"):
+        stem = os.path.splitext(base)[0]
+        entry["renditions"] = [{**r, "outputPath": f"{stem}.{r['name']}{compute_output_ext(r['mediaType'], r['codec'])}"} for r in req["renditions"]]
+        # la première sortie sert de référence à l'index de scan
+        entry["outputPath"] = entry["renditions"][0]["outputPath"]
+    return JobRecord(entry)
+
+
+async def iter_plan(req: Dict[str, Any], stats: Dict[str, Any]) -> AsyncIterator[List[Dict[str, Any]]]:
+    #pages du plan; en mode incrémental l'index écarte les fichiers inchangés déjà convertis
+    scan_id = await asyncio.to_thread(SCAN_INDEX.begin_scan) if req["incremental"] else 0
+    async for batch in iter_scan(req["inputRoot"], req["recursive"], req["mediaType"]):
+        entries = [plan_entry(req, f) for f in batch]
+        if req["incremental"]:
+            entries, skipped = await asyncio.to_thread(SCAN_INDEX.filter_new, entries, req["fingerprint"], scan_id)
+            stats["skipped"] += skipped
+        if entries:
+            # analyse ffprobe (cache) puis coût estimé: sert au scheduler et au résumé du scan
+            infos = await PROBES.probe_entries(entries) if req["probe"] else {}
+            hashes = await RESULTS.hash_entries(entries) if req["dedupe"] else {}
+            for e in entries:
+                info = infos.get(e["sourcePath"]) or {}
+                e.update(info)
+                if e["sourcePath"] in hashes:
+                    e["contentHash"] = hashes[e["sourcePath"]]
+                if e.get("renditions"):
+                    # coût vidéo ramené au nombre de pixels de chaque rendu
+                    src_h = info.get("height") or 0
+                    e["estCost"] = sum(estimate_cost(info, r["mediaType"], r["codec"], r["options"], e["sizeBytes"])
+                                       * (min(1.0, (r["height"] / src_h) ** 2) if r.get("height") and src_h and r["mediaType"] == "video" else 1.0)
+                                       for r in e["renditions"])
+                    stats["paths"]["multi"] = stats["paths"].get("multi", 0) + 1
+                else:
+                    tc = choose_transcode(e)
+                    if tc:
+                        e["transcode"] = tc
+                    path = tc["path"] if tc else "encode"
+                    stats["paths"][path] = stats["paths"].get(path, 0) + 1
+                    e["estCost"] = estimate_cost(info, req["mediaType"], req["codec"], req["options"], e["sizeBytes"], tc)
+                stats["totalCostSec"] += e["estCost"]
+                stats["totalDurationSec"] += info.get("durationSec") or 0
+            yield entries
+    stats["totalCostSec"] = round(stats["totalCostSec"], 1)
+    stats["totalDurationSec"] = round(stats["totalDurationSec"], 1)
+    if req["detectDeleted"]:
+        stats["deleted"] = await asyncio.to_thread(SCAN_INDEX.pop_deleted, req["inputRoot"], req["fingerprint"], scan_id, req["recursive"])
+
+
+def create_job(pj: Dict[str, Any]) -> JobRecord:
+    jid = str(uuid.uuid4())
+    # une entrée de plan devient le job telle quelle; les dicts reçus par /api/start sont copiés
+    job = pj if isinstance(pj, JobRecord) else JobRecord(pj)
+    ts = now_ms()
+    job.update(id=jid, status="pending", inputToken=secrets.token_hex(16), outputToken=secrets.token_hex(16), createdAt=ts, updatedAt=ts, nodeId=None)
+    if job.get("renditions"):
+        # chaque rendu a son propre jeton d'upload et son état
+        job["renditions"] = [{**r, "outputToken": secrets.token_hex(16), "status": "pending"} for r in job["renditions"]]
+    elif job.get("contentHash") and job.get("outputPath"):
+        job["resultKey"] = result_key(job["contentHash"], build_ffmpeg_args(job), os.path.splitext(job["outputPath"])[1])
+    JOBS[jid] = job
+    JOB_STORE.mark(jid)
+    return job
+
+def accept_jobs(jobs_in: List[Dict[str, Any]]) -> int:
+    accepted = 0
+    small: List[JobRecord] = []
+    for pj in jobs_in:
+        job = create_job(pj)
+        if (SEGMENT_PARALLEL and job.get("mediaType") == "video" and int(job.get("sizeBytes") or 0) >= SEGMENT_MIN_BYTES
+                and (job.get("transcode") or {}).get("video") != "copy" and not job.get("renditions")):
+            # grosse vidéo: découpée en segments encodés en parallèle (voir split_job)
+            job["status"] = "splitting"
+            spawn(split_job(job))
+        elif IMAGE_BATCH_FILES > 1 and job.get("mediaType") == "image" and int(job.get("sizeBytes") or 0) <= IMAGE_BATCH_MAX_FILE:
+            # petite image à encoder (pas servie par le cache): regroupée en lot ci-dessous
+            if route_job(job, enqueue=False):
+                small.append(job)
+        else:
+            route_job(job)
+        accepted += 1
+    for group in group_bundles(small, key=lambda j: tuple(build_ffmpeg_args(j))):
+        if len(group) > 1:
+            create_bundle(group)
+        else:
+            enqueue_job(group[0])
+    JOB_QUERY.touch()
+    if accepted and EVENTS.subscribers:
+        EVENTS.publish("totals", "", {})
+    return accepted
+
+#lots d'images: un bail, une archive tar dans chaque sens, un état par fichier dans JOBS
+def create_bundle(children: List[JobRecord]) -> JobRecord:
+    first = children[0]
+    bundle = create_job({"mediaType": "image", "codec": first.get("codec"), "options": first.get("options") or {},
+                         "relativePath": f"{first.get('relativePath') or ''} (+{len(children) - 1})",
+                         "sizeBytes": sum(int(c.get("sizeBytes") or 0) for c in children),
+                         "estCost": sum(c.get("estCost") or 0 for c in children), "bundle": [c["id"] for c in children]})
+    for c in children:
+        c.update(status="bundled", bundleId=bundle["id"])
+        JOB_STORE.mark(c["id"])
+    BUNDLES.add(bundle["id"])
+    enqueue_job(bundle)
+    return bundle
+
+def bundle_todo(bundle: Dict[str, Any]) -> List[Tuple[int, Dict[str, Any]]]:
+    #(index, job) des fichiers du lot pas encore terminés (un nouvel essai ne refait pas les autres)
+    out = []
+    for i, cid in enumerate(bundle["bundle"]):
+        child = JOBS.get(cid)
+        if child and child.get("status") not in ("completed", "failed"):
+            out.append((i, child))
+    return out
+
+def bundle_changed(bundle: Dict[str, Any]) -> None:
+    status = bundle.get("status")
+    if status not in ("completed", "uploaded", "failed"):
+        return
+    BUNDLES.discard(bundle["id"])
+    for _, child in bundle_todo(bundle):
+        # fichier absent de l'archive renvoyée (source illisible, encodage en échec)
+        update_job(child, status="failed", error="bundle failed" if status == "failed" else "missing from bundle output")
+
+def unbundle(bundle: Dict[str, Any]) -> None:
+    #aucun agent ne sait traiter les lots: les fichiers repartent un par un
+    SCHEDULER.remove(bundle["id"])
+    BUNDLES.discard(bundle["id"])
+    for _, child in bundle_todo(bundle):
+        update_job(child, status="pending", bundleId=None)
+        enqueue_job(child)
+    JOBS.pop(bundle["id"], None)
+    JOB_STORE.delete(bundle["id"])
+    JOB_QUERY.touch()
+
+def spawn(coro) -> None:
+    task = asyncio.ensure_future(coro)
+    SPAWNED_TASKS.add(task)
+    task.add_done_callback(SPAWNED_TASKS.discard)
+
+async def mark_index(job: Dict[str, Any]) -> None:
+    if job.get("fingerprint"):
         try:
-            for entry in os.scandir(dir_path):
-                full = entry.path
-                if entry.is_dir(follow_symlinks=False):
-                    if recursive:
-                        await walk(full)
-                elif entry.is_file(follow_symlinks=False):
-                    ext = os.path.splitext(entry.name)[1].lower()
-                    if (media_type == 'audio' and ext in exts_audio) or (media_type == 'video' and ext in exts_video) or (media_type == 'image' and ext in exts_image):
-                        try:
-                            st = os.stat(full)
-                            results.append({"path": full, "size": st.st_size})
-                        except Exception as e:
-                            logger.debug(f"stat fail {full}: {e}")
+            await asyncio.to_thread(SCAN_INDEX.mark_converted, job["sourcePath"], int(job.get("sizeBytes") or 0), int(job.get("sourceMtime") or 0), job["fingerprint"], job["outputPath"])
         except Exception as e:
-            logger.debug(f"scan error {dir_path}: {e}")
+            logger.debug("scan index update failed %s", e)
+
+#cache de résultats: une source identique (hash) avec les mêmes arguments n'est encodée qu'une fois
+def route_job(job: Dict[str, Any], enqueue: bool = True) -> bool:
+    #True si le job doit être encodé (mis en file, sauf enqueue=False)
+    key = job.get("resultKey")
+    if key:
+        if RESULTS.lookup(key):
+            job["status"] = "caching"
+            JOB_STORE.mark(job["id"])
+            spawn(materialize_job(job))
+            return False
+        waiters = RESULT_WAITERS.get(key)
+        if waiters is not None:
+            # même contenu déjà en cours d'encodage: attendre son résultat
+            job["status"] = "waiting"
+            JOB_STORE.mark(job["id"])
+            waiters.append(job["id"])
+            RESULT_WAITED.add(key)
+            return False
+        RESULT_WAITERS[key] = []
+        RESULT_REFS[key] = job["id"]
+        if job.get("status") == "waiting":
+            # reprise: la référence d'avant l'arrêt n'existe plus, ce job encode lui-même
+            job["status"] = "pending"
+            JOB_STORE.mark(job["id"])
+    if enqueue:
+        enqueue_job(job)
+    return True
+
+def result_changed(job: Dict[str, Any]) -> None:
+    key = job["resultKey"]
+    if job.get("status") == "completed" and not job.get("cached"):
+        RESULT_REFS.pop(key, None)
+        RESULT_WAITED.discard(key)
+        spawn(publish_result(key, job["outputPath"], RESULT_WAITERS.pop(key, [])))
+    elif job.get("status") == "failed" and RESULT_REFS.get(key) == job["id"]:
+        release_waiters(key)
+
+def release_waiters(key: str) -> None:
+    #l'encodage de référence a échoué ou le job a disparu: le job identique suivant prend le relais
+    waiters = RESULT_WAITERS.get(key) or []
+    while waiters:
+        nxt = JOBS.get(waiters.pop(0))
+        if nxt and nxt.get("status") == "waiting":
+            RESULT_REFS[key] = nxt["id"]
+            if not waiters:
+                RESULT_WAITED.discard(key)
+            update_job(nxt, status="pending")
+            enqueue_job(nxt)
+            return
+    RESULT_WAITERS.pop(key, None)
+    RESULT_REFS.pop(key, None)
+    RESULT_WAITED.discard(key)
+
+async def publish_result(key: str, output_path: str, waiters: List[str]) -> None:
+    try:
+        await asyncio.to_thread(RESULTS.store, key, output_path)
+    except Exception as e:
+        logger.warning("result cache store failed %s", e)
+    for jid in waiters:
+        job = JOBS.get(jid)
+        if job and job.get("status") == "waiting":
+            await materialize_job(job)
+    try_dispatch()
+
+async def materialize_job(job: Dict[str, Any]) -> None:
+    try:
+        ok = await asyncio.to_thread(RESULTS.materialize, job["resultKey"], job["outputPath"])
+    except Exception as e:
+        logger.warning("result cache materialize failed job=%s %s", job["id"], e)
+        ok = False
+    if not ok:
+        # entrée évincée ou illisible: encodage normal
+        update_job(job, status="pending")
+        route_job(job)
+        try_dispatch()
+        return
+    await mark_index(job)
+    update_job(job, status="completed", cached=True)
+    logger.info("job %s served from result cache", job["id"])
 
-    await walk(root)
-    return results
+#encodage segmenté: découpe (stream copy), segments loués comme des jobs, concat final
+
+async def split_job(parent: Dict[str, Any]) -> None:
+    seg_dir = SEGMENTS_DIR / parent["id"]
+    try:
+        parts = await asyncio.to_thread(split_source, parent["sourcePath"], str(seg_dir), SEGMENT_TARGET_SEC)
+    except Exception as e:
+        logger.warning("segment split failed job=%s %s", parent["id"], e)
+        parts = []
+    if len(parts) < 2:
+        # vidéo trop courte ou découpe impossible: encodage d'un seul tenant
+        await asyncio.to_thread(shutil.rmtree, seg_dir, True)
+        update_job(parent, status="pending")
+        enqueue_job(parent)
+        try_dispatch()
+        return
+    name = parent.get("relativePath") or os.path.basename(parent.get("sourcePath") or "")
+    children: List[str] = []
+    total = sum(size for _, size in parts) or 1
+    for i, (src, size) in enumerate(parts):
+        # coût du parent réparti au prorata de la taille: même échelle (secondes) que les autres jobs en file
+        est = float(parent["estCost"]) * size / total if parent.get("estCost") is not None else None
+        child = create_job({
+            "sourcePath": src, "outputPath": str(seg_dir / f"enc_{i:05d}.mkv"), "relativePath": f"{name} [{i + 1}/{len(parts)}]",
+            "mediaType": parent.get("mediaType"), "codec": parent.get("codec"), "options": parent.get("options") or {},
+            "sizeBytes": size, "parentId": parent["id"], "segmentIndex": i, "transcode": parent.get("transcode"), "estCost": est,
+        })
+        enqueue_job(child)
+        children.append(child["id"])
+    update_job(parent, status="split", segments=children)
+    logger.info("job %s split into %s segments", parent["id"], len(children))
+    try_dispatch()
+
+def segment_changed(child: Dict[str, Any]) -> None:
+    parent = JOBS.get(child.get("parentId") or "")
+    if not parent or parent.get("status") != "split":
+        return
+    if child.get("status") == "failed":
+        update_job(parent, status="failed", error=f"segment {child.get('segmentIndex')} failed")
+        # les autres segments n'ont plus d'utilité: retirés de la file ou arrêtés avant la suppression de leurs sources
+        for cid in parent.get("segments") or ():
+            sibling = JOBS.get(cid)
+            if sibling and sibling.get("status") not in ("completed", "uploaded", "failed"):
+                cancel_job(sibling, "parent job failed")
+        spawn(asyncio.to_thread(shutil.rmtree, SEGMENTS_DIR / parent["id"], True))
+        return
+    check_segments(parent)
+
+def cancel_job(job: Dict[str, Any], error: str) -> None:
+    #job abandonné: hors de la file d'attente, copies en cours arrêtées (leur fin éventuelle est ignorée)
+    SCHEDULER.remove(job["id"])
+    for aid in {job.get("nodeId"), job.get("specNodeId")}:
+        rec = AGENTS.get(aid or "")
+        if rec and job["id"] in rec["jobs"]:
+            rec["outbox"].send({"type": "cancel", "payload": {"jobId": job["id"]}})
+    PROGRESS.forget(job["id"])
+    update_job(job, status="failed", error=error)
+
+def check_segments(parent: Dict[str, Any]) -> None:
+    if parent.get("status") == "split" and all(JOBS.get(cid, {}).get("status") in ("completed", "uploaded") for cid in parent.get("segments") or ()):
+        update_job(parent, status="concat")
+        spawn(concat_job(parent))
+
+async def concat_job(parent: Dict[str, Any]) -> None:
+    seg_ids = parent.get("segments") or []
+    parts = [JOBS[cid]["outputPath"] for cid in seg_ids if cid in JOBS]
+    try:
+        if len(parts) != len(seg_ids):
+            raise RuntimeError("missing segment jobs")
+        await asyncio.to_thread(concat_segments, parts, parent["outputPath"])
+    except Exception as e:
+        logger.warning("segment concat failed job=%s %s", parent["id"], e)
+        update_job(parent, status="failed", error="concat failed")
+        return
+    await mark_index(parent)
+    # les segments n'ont plus d'utilité une fois le fichier final assemblé
+    for cid in seg_ids:
+        JOBS.pop(cid, None)
+        JOB_STORE.delete(cid)
+    update_job(parent, status="completed", segments=[])
+    await asyncio.to_thread(shutil.rmtree, SEGMENTS_DIR / parent["id"], True)
+    logger.info("segmented job completed job=%s segments=%s", parent["id"], len(seg_ids))
 
 @app.get("/api/settings")
 def api_settings():
@@ -144,8 +669,9 @@ def api_settings():
 
 @app.post("/api/pair")
 def api_pair(payload: Dict[str, Any]):
-    logger.debug("/api/pair %s", payload)
     token = (payload or {}).get("token", "").strip()
+    # jamais le jeton lui-même dans le journal
+    logger.debug("/api/pair tokenlen=%s", len(token))
     if not token or len(token) != 25:
         return JSONResponse({"error": "invalid token"}, status_code=400)
     ALLOWED_TOKENS.add(token)
@@ -161,133 +687,450 @@ def api_settings_update(payload: Dict[str, Any]):
     logger.info("publicBaseUrl updated to %s", PUBLIC_BASE_URL)
     return {"ok": True, "publicBaseUrl": PUBLIC_BASE_URL}
 
+def nodes_totals() -> Dict[str, int]:
+    return {
+        "totalJobs": len(JOBS),
+        "pendingJobs": len(SCHEDULER),
+        "retryingJobs": len(LEASES),
+        "runningJobs": sum(a.get("info", {}).get("activeJobs", 0) for a in AGENTS.values())
+    }
+
 @app.get("/api/nodes")
-def api_nodes():
+async def api_nodes():
     logger.debug("/api/nodes")
+    for aid, a in AGENTS.items():
+        # créneaux effectifs par famille d'encodeurs (autotune), à jour même sans changement récent
+        a["info"]["slots"] = TUNER.limits(aid)
     lst = [a.get("info", {}) for a in AGENTS.values()]
-    totals = {
-        "totalJobs": len(JOBS),
-        "pendingJobs": len(PENDING_JOBS),
-        "runningJobs": sum(a.get("info", {}).get("activeJobs", 0) for a in AGENTS.values())
+    return {"agents": lst, "totals": nodes_totals()}
+
+#flux d'événements push (SSE): instantané puis deltas agents/jobs/progression, rien si inactif
+@app.get("/api/events")
+async def api_events():
+    sub = EVENTS.subscribe()
+
+    def snapshot() -> str:
+        return sse("snapshot", {"agents": [a.get("info", {}) for a in AGENTS.values()], "totals": nodes_totals()})
+
+    async def stream():
+        try:
+            yield snapshot()
+            while True:
+                overflow, batch = await sub.next_batch()
+                if overflow:
+                    yield snapshot()
+                    continue
+                out = []
+                for (kind, _key), data in batch.items():
+                    out.append(sse(kind, nodes_totals() if kind == "totals" else data))
+                yield "".join(out)
+        finally:
+            EVENTS.unsubscribe(sub)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+def job_row(job: Dict[str, Any]) -> Dict[str, Any]:
+    p = PROGRESS.job(job["id"])
+    return {
+        "id": job["id"], "path": job.get("relativePath") or job.get("sourcePath"), "status": job.get("status"),
+        "nodeId": job.get("nodeId"), "sizeBytes": job.get("sizeBytes"), "codec": job.get("codec"),
+        "updatedAt": job.get("updatedAt"), "percent": p.get("percent") if p else None,
     }
-    return {"agents": lst, "totals": totals}
+
+#liste paginée des jobs (filtres status=a,b / agent, tri sort=<clé> + desc)
+#async: JOBS n'est lu que depuis la boucle (le tri complet est amorti par le cache de JobQuery)
+@app.get("/api/jobs")
+async def api_jobs(offset: int = 0, limit: int = 200, status: Optional[str] = None, agent: Optional[str] = None, sort: str = "createdAt", desc: bool = False):
+    return JOB_QUERY.page(offset, limit, status, agent, sort, desc, row=job_row)
+
+@app.get("/api/cache")
+async def api_cache():
+    return RESULTS.summary()
+
+@app.get("/api/io")
+async def api_io():
+    return READS.stats()
+
+@app.get("/metrics")
+async def metrics_text():
+    return PlainTextResponse(METRICS.prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/metrics")
+async def api_metrics():
+    return METRICS.snapshot()
+
+@app.get("/api/progress")
+async def api_progress(jobs: bool = False):
+    out: Dict[str, Any] = {"cluster": PROGRESS.cluster_stats(), "agents": PROGRESS.agent_stats()}
+    if jobs:
+        out["jobs"] = [PROGRESS.job(jid) for jid in list(PROGRESS.jobs)]
+    return out
+
+@app.get("/api/progress/{job_id}")
+async def api_progress_job(job_id: str):
+    job = JOBS.get(job_id)
+    if not job:
+        return JSONResponse({"error": "not found"}, status_code=404)
+    return {"jobId": job_id, "status": job.get("status"), "progress": PROGRESS.job(job_id)}
+
+@app.get("/api/scheduler")
+async def api_scheduler():
+    return {**SCHEDULER.stats(), "policies": sorted(POLICIES)}
+
+#async: la reconstruction des tas se fait sur la boucle, jamais pendant un push/pop
+@app.post("/api/scheduler")
+async def api_scheduler_update(payload: Dict[str, Any]):
+    policy = (payload or {}).get("policy", "")
+    if policy not in POLICIES:
+        return JSONResponse({"error": "unknown policy"}, status_code=400)
+    SCHEDULER.set_policy(policy)
+    logger.info("scheduler policy set to %s", policy)
+    return {"ok": True, "policy": policy}
 
 #API scan pour préparer un plan de jobs
 @app.post("/api/scan")
 async def api_scan(payload: Dict[str, Any]):
     try:
-        input_root = os.path.abspath((payload or {}).get("inputRoot", "").strip())
-        output_root = os.path.abspath((payload or {}).get("outputRoot", "").strip())
-        recursive = bool((payload or {}).get("recursive", True))
-        mirror = bool((payload or {}).get("mirrorStructure", True))
-        media_type = (payload or {}).get("mediaType", "")
-        codec = (payload or {}).get("codec", "")
-        options = (payload or {}).get("options", {}) or {}
-        if not input_root or not output_root or media_type not in ("audio","video","image") or not codec:
-            return JSONResponse({"error": "invalid request"}, status_code=400)
-        if not os.path.isdir(input_root):
-            return JSONResponse({"error": "inputRoot not found"}, status_code=400)
-        os.makedirs(output_root, exist_ok=True)
-        files = await scan_files(input_root, recursive, media_type)
-        out_ext = compute_output_ext(media_type, codec)
-        plan: List[Dict[str, Any]] = []
-        total_size = 0
-        for f in files:
-            src = f["path"]; size = int(f["size"]); total_size += size
-            rel = os.path.relpath(src, input_root)
-            base = os.path.join(output_root, rel) if mirror else os.path.join(output_root, os.path.basename(rel))
-            out_path = os.path.splitext(base)[0] + out_ext
-            plan.append({"sourcePath": src, "relativePath": rel, "mediaType": media_type, "sizeBytes": size, "outputPath": out_path, "codec": codec, "options": options})
-        logger.info("scan %s files total=%s bytes", len(plan), total_size)
-        return {"count": len(plan), "totalBytes": total_size, "jobs": plan}
+        try:
+            req = parse_scan_request(payload)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        os.makedirs(req["outputRoot"], exist_ok=True)
+        entries_all: List[JobRecord] = []
+        stats: Dict[str, Any] = {"skipped": 0, "deleted": [], "totalCostSec": 0.0, "totalDurationSec": 0.0, "paths": {}}
+        async for entries in iter_plan(req, stats):
+            entries_all.extend(entries)
+        plan = keep_plan(req, entries_all, stats)
+        logger.info("scan plan=%s %s files total=%s bytes skipped=%s deleted=%s", plan.id, len(entries_all), plan.total_bytes, stats["skipped"], len(stats["deleted"]))
+        out = plan.summary()
+        if (payload or {}).get("includeJobs"):
+            # ancien format: plan complet dans la réponse, à renvoyer tel quel à /api/start
+            out["jobs"] = [dict(e) for e in entries_all]
+        return out
     except Exception as e:
         logger.exception("scan error")
         return JSONResponse({"error": str(e)}, status_code=500)
 
+def keep_plan(req: Dict[str, Any], entries: List[JobRecord], stats: Dict[str, Any]) -> ScanPlan:
+    plan = ScanPlan(uuid.uuid4().hex, req, entries, stats)
+    PLANS[plan.id] = plan
+    while len(PLANS) > PLAN_MAX:
+        old_id, _ = PLANS.popitem(last=False)
+        logger.info("scan plan %s dropped (PLAN_MAX=%s)", old_id, PLAN_MAX)
+    return plan
+
+#plans conservés: résumé, pages de la liste, abandon
+@app.get("/api/plans")
+async def api_plans():
+    return {"plans": [p.summary() for p in PLANS.values()]}
+
+@app.get("/api/plans/{plan_id}")
+async def api_plan(plan_id: str):
+    plan = PLANS.get(plan_id)
+    if not plan:
+        return JSONResponse({"error": "unknown plan"}, status_code=404)
+    return plan.summary()
+
+@app.get("/api/plans/{plan_id}/jobs")
+async def api_plan_jobs(plan_id: str, offset: int = 0, limit: int = 200):
+    plan = PLANS.get(plan_id)
+    if not plan:
+        return JSONResponse({"error": "unknown plan"}, status_code=404)
+    return plan.page(offset, limit)
+
+@app.delete("/api/plans/{plan_id}")
+async def api_plan_delete(plan_id: str):
+    if PLANS.pop(plan_id, None) is None:
+        return JSONResponse({"error": "unknown plan"}, status_code=404)
+    return {"ok": True}
+
+#API scan en flux NDJSON: pages de jobs au fil du parcours, démarrage optionnel immédiat
+@app.post("/api/scan/stream")
+async def api_scan_stream(payload: Dict[str, Any]):
+    try:
+        req = parse_scan_request(payload)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    os.makedirs(req["outputRoot"], exist_ok=True)
+    start = bool((payload or {}).get("start", False))
+    page_size = max(1, int((payload or {}).get("pageSize", 500)))
+
+    accepted = 0
+    kept: List[JobRecord] = []
+
+    async def flush(page: List[Dict[str, Any]]) -> str:
+        nonlocal accepted
+        line: Dict[str, Any] = {"type": "jobs", "jobs": page}
+        if start:
+            accepted += accept_jobs(page)
+            line["accepted"] = accepted
+            try_dispatch()
+        else:
+            kept.extend(page)
+        return json.dumps(line, default=record_dict) + "\n"
+
+    async def pages():
+        count = 0; total_size = 0
+        stats: Dict[str, Any] = {"skipped": 0, "deleted": [], "totalCostSec": 0.0, "totalDurationSec": 0.0, "paths": {}}
+        page: List[Dict[str, Any]] = []
+        try:
+            async for entries in iter_plan(req, stats):
+                page.extend(entries)
+                total_size += sum(e["sizeBytes"] for e in entries)
+                if len(page) >= page_size:
+                    count += len(page)
+                    yield await flush(page)
+                    page = []
+            if page:
+                count += len(page)
+                yield await flush(page)
+        except Exception as e:
+            logger.exception("scan stream error")
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+            return
+        logger.info("scan stream %s files total=%s bytes accepted=%s skipped=%s", count, total_size, accepted, stats["skipped"])
+        done: Dict[str, Any] = {"type": "done", "count": count, "totalBytes": total_size, "accepted": accepted, **stats}
+        if not start:
+            # le plan reste démarrable par son id, sans renvoyer les pages
+            done["planId"] = keep_plan(req, kept, stats).id
+        yield json.dumps(done) + "\n"
+
+    return StreamingResponse(pages(), media_type="application/x-ndjson")
+
 #API start pour accepter et mettre en file d'attente les jobs
 @app.post("/api/start")
 async def api_start(payload: Dict[str, Any]):
-    jobs_in = (payload or {}).get("jobs", [])
+    payload = payload or {}
+    if payload.get("planId"):
+        # plan gardé par /api/scan: seul l'id (et les filtres éventuels) transite
+        plan = PLANS.get(str(payload["planId"]))
+        if not plan:
+            return JSONResponse({"error": "unknown plan"}, status_code=404)
+        try:
+            jobs_in = plan.select(payload)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        # les entrées deviennent des jobs: le plan ne peut pas être démarré deux fois
+        del PLANS[plan.id]
+    else:
+        jobs_in = payload.get("jobs", [])
     if not isinstance(jobs_in, list) or not jobs_in:
         return JSONResponse({"error": "no jobs"}, status_code=400)
-    accepted = 0
-    for pj in jobs_in:
-        jid = str(uuid.uuid4())
-        job = {**pj, "id": jid, "status": "pending", "inputToken": secrets.token_hex(16), "outputToken": secrets.token_hex(16), "createdAt": now_ms(), "updatedAt": now_ms(), "nodeId": None}
-        JOBS[jid] = job
-        PENDING_JOBS.append(jid)
-        accepted += 1
+    accepted = accept_jobs(jobs_in)
     logger.info("start accepted jobs=%s", accepted)
-    await try_dispatch()
+    try_dispatch()
     return {"accepted": accepted}
 
 #flux de téléchargement du fichier source avec gestion du Range
-@app.get("/stream/input/{job_id}")
+@app.api_route("/stream/input/{job_id}", methods=["GET", "HEAD"])
 async def stream_input(job_id: str, request: Request, token: Optional[str] = None):
     job = JOBS.get(job_id)
     if not job or token != job.get("inputToken"):
         return JSONResponse({"error": "forbidden"}, status_code=403)
+    if job.get("bundle"):
+        M_INPUT.labels("bundle").inc()
+        return await bundle_input(job, request)
+    M_INPUT.labels("file").inc()
     src = job.get("sourcePath")
-    if not src or not os.path.isfile(src):
+    try:
+        st = await asyncio.to_thread(os.stat, src) if src else None
+    except OSError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
         return JSONResponse({"error": "not found"}, status_code=404)
-    file_size = os.path.getsize(src)
-    range_header = request.headers.get('range', '')
-    ctype = mimetypes.guess_type(src)[0] or 'application/octet-stream'
-
-    def file_iter(start: int, end: int, chunk_size: int = 1024 * 1024):
-        with open(src, 'rb') as f:
-            f.seek(start)
-            remaining = end - start + 1
-            while remaining > 0:
-                chunk = f.read(min(chunk_size, remaining))
-                if not chunk:
-                    break
-                remaining -= len(chunk)
-                yield chunk
-
-    if range_header.startswith('bytes='):
+    # lectures par blocs de read-ahead, en file sur le disque de la source (équité entre agents)
+    client = job.get("nodeId") or (request.client.host if request.client else "")
+    reader = await READS.stream(src, st, client) if request.method == "GET" else None
+    return file_response(src, request, st, reader)
+
+def stat_members(todo: List[Tuple[int, Dict[str, Any]]]) -> List[Tuple[str, str, int]]:
+    members = []
+    for i, child in todo:
         try:
-            start_s, end_s = range_header.replace('bytes=', '').split('-')
-            start = int(start_s or 0)
-            end = int(end_s) if end_s else file_size - 1
-        except Exception:
-            start, end = 0, file_size - 1
-        length = end - start + 1
-        headers = {
-            'Content-Range': f'bytes {start}-{end}/{file_size}',
-            'Accept-Ranges': 'bytes',
-            'Content-Length': str(length),
-            'Content-Type': ctype,
-        }
-        return StreamingResponse(file_iter(start, end), status_code=206, headers=headers)
-
-    headers = {'Accept-Ranges': 'bytes', 'Content-Length': str(file_size), 'Content-Type': ctype}
-    return StreamingResponse(file_iter(0, file_size - 1), status_code=200, headers=headers)
-
-#flux de réception du fichier encodé
+            members.append((member_name(i, child["sourcePath"]), child["sourcePath"], os.stat(child["sourcePath"]).st_size))
+        except OSError:
+            continue
+    return members
+
+async def bundle_input(bundle: Dict[str, Any], request: Request):
+    #archive tar des sources restantes du lot, lue au fil de l'envoi
+    members = await asyncio.to_thread(stat_members, bundle_todo(bundle))
+    length = tar_length(size for _, _, size in members)
+    headers = {"Content-Length": str(length)}
+    if request.method == "HEAD":
+        return Response(headers=headers, media_type="application/x-tar")
+    M_BUNDLE_BYTES.inc(length)
+    return StreamingResponse(tar_stream(members), headers=headers, media_type="application/x-tar")
+
+#flux de réception du fichier encodé (reprise via Content-Range, SHA-256 optionnel)
+
+def remove_quiet(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def part_size(tmp_path: str) -> int:
+    try:
+        return os.path.getsize(tmp_path)
+    except OSError:
+        return 0
+
+def output_target(job: Optional[Dict[str, Any]], rendition: Optional[int]) -> Optional[Dict[str, Any]]:
+    #le job lui-même, ou l'un de ses rendus (mêmes clés outputPath/outputToken/status)
+    if not job:
+        return None
+    if job.get("bundle"):
+        # lot: l'archive entière (rendition absente) ou l'un de ses fichiers
+        if rendition is None:
+            return job
+        return JOBS.get(job["bundle"][rendition]) if 0 <= rendition < len(job["bundle"]) else None
+    renditions = job.get("renditions")
+    if not renditions:
+        return job if rendition is None else None
+    if rendition is None or not 0 <= rendition < len(renditions):
+        return None
+    return renditions[rendition]
+
+@app.get("/stream/output/{job_id}/offset")
+async def stream_output_offset(job_id: str, token: Optional[str] = None, spec: int = 0, rendition: Optional[int] = None):
+    target = output_target(JOBS.get(job_id), rendition)
+    if not target or token != target.get("outputToken"):
+        return JSONResponse({"error": "forbidden"}, status_code=403)
+    out_path = target.get("outputPath") or ""
+    offset = await asyncio.to_thread(part_size, out_path + (".spec.part" if spec else ".part"))
+    return {"offset": offset, "complete": target.get("status") in ("completed", "uploaded")}
+
 @app.put("/stream/output/{job_id}")
-async def stream_output(job_id: str, token: Optional[str] = None, request: Request = None):
+async def stream_output(job_id: str, token: Optional[str] = None, spec: int = 0, rendition: Optional[int] = None, request: Request = None):
     job = JOBS.get(job_id)
-    if not job or token != job.get("outputToken"):
+    target = output_target(job, rendition)
+    if not target or token != target.get("outputToken"):
         return JSONResponse({"error": "forbidden"}, status_code=403)
-    out_path = job.get("outputPath")
+    if target.get("bundle"):
+        return await bundle_output(target, bool(spec), request)
+    out_path = target.get("outputPath")
     if not out_path:
         return JSONResponse({"error": "no output path"}, status_code=400)
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    tmp_path = out_path + ".part"
-
-    async def write_body():
-        with open(tmp_path, 'wb') as w:
+    # copie principale et copie spéculative écrivent chacune leur .part; la première finie gagne
+    if target.get("status") in ("completed", "uploaded"):
+        return {"ok": True, "duplicate": True, "complete": True}
+    if target.get("status") == "failed" and target.get("parentId"):
+        # segment d'un job abandonné: son dossier a été supprimé
+        return JSONResponse({"error": "job cancelled"}, status_code=410)
+    upload_key = (job_id, rendition, bool(spec))
+    if upload_key in UPLOADS_ACTIVE:
+        return JSONResponse({"error": "upload in progress"}, status_code=409)
+    # réservé avant le premier await: deux PUT simultanés n'écrivent jamais le même .part
+    UPLOADS_ACTIVE.add(upload_key)
+    try:
+        return await receive_output(job, target, rendition, bool(spec), out_path, request)
+    finally:
+        UPLOADS_ACTIVE.discard(upload_key)
+
+async def receive_output(job: Dict[str, Any], target: Dict[str, Any], rendition: Optional[int], spec: bool, out_path: str, request: Request):
+    tmp_path = out_path + (".spec.part" if spec else ".part")
+    checksum = (request.headers.get("x-checksum-sha256") or request.query_params.get("sha256") or "").strip().lower()
+    content_range = request.headers.get("content-range")
+    start, total = 0, None
+    if content_range:
+        cr = parse_content_range(content_range)
+        if cr is None:
+            return JSONResponse({"error": "invalid Content-Range"}, status_code=400)
+        start, _, total = cr
+        current = await asyncio.to_thread(part_size, tmp_path)
+        if start != current:
+            return JSONResponse({"error": "offset mismatch", "offset": current}, status_code=409)
+
+    received = M_OUTPUT_BYTES.labels()
+    with Timer(M_OUTPUT_TIME):
+        await asyncio.to_thread(os.makedirs, os.path.dirname(out_path), exist_ok=True)
+        writer = PartWriter(tmp_path, start, checksum=bool(checksum))
+        await writer.open()
+        try:
             async for chunk in request.stream():
                 if chunk:
-                    w.write(chunk)
-        os.replace(tmp_path, out_path)
-
-    await write_body()
-    job["status"] = "completed"
-    job["updatedAt"] = now_ms()
-    logger.info("upload completed job=%s", job_id)
-    return {"ok": True}
+                    received.inc(len(chunk))
+                    await writer.write(chunk)
+        except ClientDisconnect:
+            logger.info("upload interrupted job=%s offset=%s", job["id"], writer.offset)
+            M_OUTPUT.labels("interrupted").inc()
+            return Response(status_code=400)
+        finally:
+            await writer.close()
+    if total is not None and writer.offset < total:
+        M_OUTPUT.labels("partial").inc()
+        return {"ok": True, "offset": writer.offset, "complete": False}
+    if checksum and writer.hasher.hexdigest() != checksum:
+        await asyncio.to_thread(os.remove, tmp_path)
+        logger.warning("upload checksum mismatch job=%s", job["id"])
+        M_OUTPUT.labels("checksum").inc()
+        return JSONResponse({"error": "checksum mismatch"}, status_code=422)
+    result = await finish_output(job, target, rendition, spec, tmp_path)
+    M_OUTPUT.labels("complete").inc()
+    return {**result, "offset": writer.offset}
+
+async def bundle_output(bundle: Dict[str, Any], spec: bool, request: Request):
+    #archive tar des sorties d'un lot: chaque fichier est mis en place dès qu'il est reçu
+    if bundle.get("status") in ("completed", "uploaded"):
+        return {"ok": True, "duplicate": True, "complete": True}
+    upload_key = (bundle["id"], None, spec)
+    if upload_key in UPLOADS_ACTIVE:
+        return JSONResponse({"error": "upload in progress"}, status_code=409)
+    UPLOADS_ACTIVE.add(upload_key)
+    splitter = TarSplitter()
+    received = 0
+    try:
+        async for chunk in request.stream():
+            M_OUTPUT_BYTES.inc(len(chunk))
+            for name, data in splitter.feed(chunk):
+                i = member_index(name)
+                child = output_target(bundle, i) if i is not None else None
+                if not child or child.get("status") in ("completed", "failed"):
+                    continue
+                tmp_path = child["outputPath"] + (".spec.part" if spec else ".part")
+                await asyncio.to_thread(write_file, tmp_path, data)
+                await finish_output(bundle, child, i, spec, tmp_path)
+                received += 1
+    except ClientDisconnect:
+        logger.info("bundle upload interrupted job=%s received=%s", bundle["id"], received)
+        return Response(status_code=400)
+    except (tarfile.TarError, ValueError) as e:
+        logger.warning("bundle upload rejected job=%s %s", bundle["id"], e)
+        return JSONResponse({"error": "invalid bundle", "received": received}, status_code=422)
+    finally:
+        UPLOADS_ACTIVE.discard(upload_key)
+    logger.info("bundle upload completed job=%s files=%s", bundle["id"], received)
+    return {"ok": True, "received": received, "complete": True}
+
+async def finish_output(job: Dict[str, Any], target: Dict[str, Any], rendition: Optional[int], spec: bool, tmp_path: str) -> Dict[str, Any]:
+    #sortie complète dans tmp_path (upload HTTP ou exécuteur local): mise en place et fin du job
+    if target.get("status") in ("completed", "uploaded"):
+        # doublon (autre copie, nouvel essai après la mise en place): la sortie temporaire peut déjà avoir disparu
+        await asyncio.to_thread(remove_quiet, tmp_path)
+        return {"ok": True, "duplicate": True, "complete": True}
+    await asyncio.to_thread(os.replace, tmp_path, target["outputPath"])
+    if job.get("bundle"):
+        # fichier d'un lot: job à part entière (index de scan, cache, affichage); le lot finit avec le dernier
+        await mark_index(target)
+        update_job(target, status="completed")
+        if bundle_todo(job):
+            return {"ok": True, "complete": True}
+    elif target is not job:
+        target["status"] = "completed"
+        if any(r.get("status") != "completed" for r in job["renditions"]):
+            update_job(job, renditions=job["renditions"])
+            logger.info("upload completed job=%s rendition=%s", job["id"], rendition)
+            return {"ok": True, "complete": True}
+    if not job.get("bundle"):
+        await mark_index(job)
+    winner, loser = (job.get("specNodeId"), job.get("nodeId")) if spec else (job.get("nodeId"), job.get("specNodeId"))
+    update_job(job, status="completed", uploadedBy=winner)
+    if loser and loser in AGENTS:
+        # l'autre copie peut s'arrêter; son upload éventuel sera ignoré
+        AGENTS[loser]["outbox"].send({"type": "cancel", "payload": {"jobId": job["id"]}})
+    logger.info("upload completed job=%s", job["id"])
+    return {"ok": True, "complete": True}
 
 #upload de fichiers locaux vers un dossier de destination
 @app.post("/api/upload")
@@ -350,112 +1193,462 @@ async def agent_socket(ws: WebSocket):
             msg = await ws.receive_json()
             mtype = msg.get("type")
             payload = msg.get("payload") or {}
+            # compté seulement pour un agent authentifié (ou un register au jeton valide, ci-dessous)
+            if agent_id:
+                M_WS_IN.labels(mtype if isinstance(mtype, str) and mtype in AGENT_MESSAGE_TYPES else "other").inc()
             if mtype == "register":
                 token = (payload.get("token") or "").strip()
                 if not token or token not in ALLOWED_TOKENS:
                     await ws.close(code=1008)
                     return
+                if not agent_id:
+                    M_WS_IN.labels("register").inc()
                 agent_id = payload.get("id") or str(uuid.uuid4())
+                mounts = parse_mounts(payload.get("mounts"))
                 info = {
                     "id": agent_id,
                     "name": payload.get("name") or f"agent-{agent_id[:6]}",
                     "concurrency": int(max(1, int(payload.get("concurrency") or 1))),
                     "encoders": list(payload.get("encoders") or []),
+                    # préchargement seulement si l'agent l'annonce (sinon il ignorerait les baux en trop)
+                    "prefetch": max(0, min(PREFETCH_DEPTH, int(payload.get("prefetch") or 0))),
+                    "mounts": [m for m, _ in mounts],
                     "activeJobs": 0,
                     "lastHeartbeat": now_ms(),
                 }
-                AGENTS[agent_id] = {"info": info, "ws": ws}
+                info["effectiveConcurrency"] = info["concurrency"]
+                # même id sur une nouvelle connexion: les baux de l'ancienne sont repris
+                if agent_id in AGENTS:
+                    drop_agent(agent_id, AGENTS[agent_id]["ws"])
+                # liste vide = agent sans détection d'encodeurs, accepte tout
+                outbox = Outbox(ws, on_close=lambda aid=agent_id, sock=ws: drop_agent(aid, sock))
+                encoders = frozenset(info["encoders"])
+                if encoders and payload.get("multiOutput"):
+                    encoders = encoders | {MULTI_OUTPUT}
+                if encoders and payload.get("bundles"):
+                    encoders = encoders | {BUNDLE}
+                AGENTS[agent_id] = {"info": info, "ws": ws, "outbox": outbox, "encoders": encoders or None,
+                                   "jobs": set(), "batch": bool(payload.get("batchLeases")), "mounts": mounts,
+                                   "autotune": bool(payload.get("autotune"))}
+                # au-delà de la concurrence annoncée seulement si l'agent accepte les messages "concurrency"
+                TUNER.add_agent(agent_id, info["concurrency"], adjustable=bool(payload.get("autotune")), cpus=payload.get("cpus"))
+                outbox.start()
                 logger.info("agent registered id=%s", agent_id)
-                await try_dispatch()
-            elif mtype == "heartbeat":
-                aid = payload.get("id")
-                rec = AGENTS.get(aid or agent_id or "")
-                if rec:
-                    rec["info"]["lastHeartbeat"] = now_ms()
-                    if isinstance(payload.get("activeJobs"), int):
-                        rec["info"]["activeJobs"] = int(payload.get("activeJobs"))
-            elif mtype == "lease-accepted":
-                job_id = payload.get("jobId")
-                job = JOBS.get(job_id or "")
-                if job:
-                    job["status"] = "running"
-                    job["updatedAt"] = now_ms()
-            elif mtype == "progress":
-                pass
-            elif mtype == "complete":
-                job_id = payload.get("jobId")
-                success = bool(payload.get("success"))
-                aid = payload.get("agentId") or agent_id
-                rec = AGENTS.get(aid or "")
-                job = JOBS.get(job_id or "")
-                if rec and rec.get("info", {}).get("activeJobs", 0) > 0:
-                    rec["info"]["activeJobs"] -= 1
-                if job:
-                    job["status"] = "uploaded" if success else "failed"
-                    job["updatedAt"] = now_ms()
-                await try_dispatch()
+                publish_agent(agent_id)
+                try_dispatch()
+            else:
+                await agent_message(agent_id, mtype, payload)
     except WebSocketDisconnect:
         pass
     except Exception as e:
         logger.debug("agent socket error %s", e)
     finally:
-        if agent_id and agent_id in AGENTS:
-            try:
-                del AGENTS[agent_id]
-            except Exception:
-                pass
+        if agent_id:
+            drop_agent(agent_id, ws)
         try:
             await ws.close()
         except Exception:
             pass
 
+async def agent_message(agent_id: Optional[str], mtype: Optional[str], payload: Dict[str, Any]) -> None:
+    #messages d'un agent enregistré: socket /agent ou exécuteur local
+    if mtype == "heartbeat":
+        aid = payload.get("id")
+        rec = AGENTS.get(aid or agent_id or "")
+        if rec:
+            rec["info"]["lastHeartbeat"] = now_ms()
+            load = load_signals(payload)
+            if load:
+                rec["info"]["load"] = load
+                TUNER.observe_load(rec["info"]["id"], load)
+            if isinstance(payload.get("activeJobs"), int) and rec["info"]["activeJobs"] != payload["activeJobs"]:
+                rec["info"]["activeJobs"] = int(payload.get("activeJobs"))
+                publish_agent(rec["info"]["id"])
+    elif mtype == "lease-accepted":
+        job_id = payload.get("jobId")
+        job = JOBS.get(job_id or "")
+        if job and job.get("status") == "assigned":
+            update_job(job, status="running")
+    elif mtype == "progress":
+        # Node envoie les clés à plat, les agents Rust/C sous "data"
+        job_id = payload.get("jobId")
+        job = JOBS.get(job_id or "")
+        if job:
+            if job.get("status") == "assigned" and job.get("nodeId") == agent_id:
+                # agents sans lease-accepted (Rust/C, anciens Node): la première progression vaut démarrage
+                update_job(job, status="running")
+            data = payload.get("data") if isinstance(payload.get("data"), dict) else payload
+            if PROGRESS.ingest(job_id, job.get("nodeId") or agent_id or "", data, job.get("durationSec")) and EVENTS.subscribers:
+                EVENTS.publish("progress", job_id, PROGRESS.job(job_id))
+    elif mtype == "complete":
+        job_id = payload.get("jobId")
+        success = bool(payload.get("success"))
+        aid = payload.get("agentId") or agent_id
+        rec = AGENTS.get(aid or "")
+        job = JOBS.get(job_id or "")
+        if rec:
+            rec["jobs"].discard(job_id)
+            TUNER.finished(aid, job_id, job_units(job) if job and success else 0.0)
+            if rec.get("info", {}).get("activeJobs", 0) > 0:
+                rec["info"]["activeJobs"] -= 1
+                publish_agent(aid)
+        if job:
+            complete_job(job, aid, success)
+        try_dispatch()
+    elif mtype == "output-ready":
+        # bail par chemins (exécuteur local, stockage partagé): la sortie est déjà écrite à côté de outputPath
+        rec = AGENTS.get(agent_id or "")
+        job = JOBS.get(payload.get("jobId") or "")
+        rendition = payload.get("rendition")
+        target = output_target(job, rendition)
+        # seul un détenteur du bail (copie principale ou spéculative) peut mettre une sortie en place
+        if not rec or not target or agent_id not in (job.get("nodeId"), job.get("specNodeId")):
+            return
+        if map_path(target.get("outputPath") or "", agent_mounts(rec)):
+            spec = bool(payload.get("spec"))
+            try:
+                await finish_output(job, target, rendition, spec, local_part_path(target["outputPath"], spec))
+            except OSError as e:
+                # .local-part absent (montage mal déclaré...): seul ce job ou ce fichier du lot échoue, pas la connexion
+                logger.warning("output-ready failed job=%s rendition=%s %s", job["id"], rendition, e)
+                output_failed(job, target, agent_id)
+
+def output_failed(job: Dict[str, Any], target: Dict[str, Any], aid: str) -> None:
+    if target is not job and job.get("bundle"):
+        update_job(target, status="failed", error="output missing")
+        return
+    complete_job(job, aid, False)
+    if job.get("status") == "failed" and job.get("nodeId") == aid:
+        # le "complete" réussi qui suit de la même copie ne doit pas faire passer le job pour envoyé
+        update_job(job, nodeId=None, error="output missing")
+
+def complete_job(job: Dict[str, Any], aid: Optional[str], success: bool) -> None:
+    #fin d'une copie (principale ou spéculative); la première sortie reçue gagne
+    spec = job.get("specNodeId")
+    if job.get("status") in ("completed", "uploaded") and job.get("uploadedBy") not in (None, aid):
+        if spec == aid:
+            update_job(job, specNodeId=None)
+        return
+    if aid not in (job.get("nodeId"), spec):
+        # bail déjà repris ailleurs: message périmé
+        return
+    if success:
+        update_job(job, status="uploaded", specNodeId=None)
+        PROGRESS.finish(job["id"], True)
+        M_JOBS_DONE.labels("success").inc()
+    elif aid == spec:
+        update_job(job, specNodeId=None)
+    elif spec and spec in AGENTS:
+        # la copie spéculative devient la copie principale
+        update_job(job, nodeId=spec, specNodeId=None)
+    else:
+        update_job(job, status="failed")
+        PROGRESS.finish(job["id"], False)
+        M_JOBS_DONE.labels("failed").inc()
+
+#baux: reprise des jobs d'un agent perdu, nouvel essai différé, duplication des traînards
+def drop_agent(aid: str, ws: Any) -> None:
+    rec = AGENTS.get(aid)
+    if not rec or rec["ws"] is not ws:
+        return
+    del AGENTS[aid]
+    TUNER.drop_agent(aid)
+    rec["outbox"].close()
+    PROGRESS.drop_agent(aid)
+    for jid in list(rec["jobs"]):
+        job = JOBS.get(jid)
+        if not job:
+            continue
+        if job.get("specNodeId") == aid:
+            update_job(job, specNodeId=None)
+        elif job.get("nodeId") == aid and job.get("status") in ("assigned", "running"):
+            spec = job.get("specNodeId")
+            if spec and spec in AGENTS:
+                update_job(job, nodeId=spec, specNodeId=None)
+            else:
+                requeue_orphan(job)
+    publish_agent(aid)
+
+def requeue_orphan(job: Dict[str, Any]) -> None:
+    PROGRESS.forget(job["id"])
+    attempts = int(job.get("attempts") or 0)
+    if LEASES.exhausted(attempts):
+        logger.warning("job %s failed: lease lost %s times", job["id"], attempts)
+        update_job(job, status="failed", nodeId=None, error=f"lease lost {attempts} times")
+        return
+    update_job(job, status="pending", nodeId=None)
+    LEASES.delay(job["id"], LEASES.backoff(attempts))
+
+def agent_free_slots(rec: Dict[str, Any], prefetch: bool = True) -> int:
+    #les baux préchargés (pas encore démarrés) comptent comme des jobs actifs
+    info = rec.get("info", {})
+    limit = TUNER.slots(info.get("id"), int(info.get("concurrency", 1))) + (int(info.get("prefetch", 0)) if prefetch else 0)
+    return limit - max(int(info.get("activeJobs", 0)), len(rec.get("jobs") or ()))
+
+def job_units(job: Dict[str, Any]) -> float:
+    #travail mesuré par l'autotune: secondes de média, ou fichiers quand la durée est inconnue (images)
+    if job.get("bundle"):
+        return float(len(job["bundle"]))
+    return float(job.get("durationSec") or 1.0)
+
+def apply_slots(aid: str) -> None:
+    #nouvelles limites de l'autotune: visibles dans /api/nodes et transmises à l'agent qui sait les appliquer
+    rec = AGENTS.get(aid)
+    if not rec:
+        return
+    info = rec["info"]
+    slots = TUNER.slots(aid, int(info.get("concurrency", 1)))
+    info["slots"] = TUNER.limits(aid)
+    if slots != info.get("effectiveConcurrency"):
+        info["effectiveConcurrency"] = slots
+        if rec.get("autotune"):
+            rec["outbox"].send({"type": "concurrency", "payload": {"slots": slots}})
+    publish_agent(aid)
+
+def agent_can_run(rec: Dict[str, Any], job: Dict[str, Any]) -> bool:
+    enc = rec.get("encoders")
+    req = job_encoders(job)
+    return not needs_capability(req) if enc is None else enc.issuperset(req)
+
+async def lease_tick() -> None:
+    for aid in LEASES.stale_agents(AGENTS, now_ms()):
+        logger.warning("agent heartbeat timeout id=%s", aid)
+        AGENTS[aid]["outbox"].close(1001)
+    for aid in TUNER.tick():
+        apply_slots(aid)
+    for jid in LEASES.due():
+        job = JOBS.get(jid)
+        if job and job.get("status") == "pending":
+            enqueue_job(job)
+    for key in list(RESULT_WAITED):
+        # job de référence retiré de JOBS sans fin d'encodage: ses jobs identiques ne doivent pas attendre indéfiniment
+        if RESULT_REFS.get(key) not in JOBS:
+            release_waiters(key)
+    if BUNDLES and AGENTS and not any(BUNDLE in (rec.get("encoders") or ()) for rec in AGENTS.values()):
+        # agents sans prise en charge des lots (Rust/C, anciens Node, sans liste d'encodeurs): les images repartent une par une
+        for bid in list(BUNDLES):
+            bundle = JOBS.get(bid)
+            if bundle and bundle.get("status") == "pending":
+                unbundle(bundle)
+    try_dispatch()
+    if LEASES.speculative and not len(SCHEDULER) and not len(LEASES):
+        speculate()
+
+def speculate() -> None:
+    #fin de lot: les créneaux libres dupliquent les jobs les plus lents sur un autre agent
+    free = [(aid, rec) for aid, rec in AGENTS.items() if agent_free_slots(rec, prefetch=False) > 0]
+    if not free:
+        return
+    running = [JOBS[jid] for rec in AGENTS.values() for jid in rec["jobs"] if jid in JOBS and JOBS[jid].get("status") == "running" and JOBS[jid].get("nodeId")]
+    progress = {j["id"]: PROGRESS.job(j["id"]) for j in running}
+    for job in LEASES.stragglers(running, progress, sum(agent_free_slots(r, prefetch=False) for _, r in free)):
+        for aid, rec in free:
+            if (aid != job.get("nodeId") and agent_free_slots(rec, prefetch=False) > 0 and agent_can_run(rec, job)
+                    and not TUNER.full(aid, family_of(job_encoders(job)))):
+                logger.info("speculative lease job=%s agent=%s", job["id"], aid)
+                send_leases(aid, rec, [assign_lease(aid, rec, job, spec=True)])
+                break
+
+async def run_leases() -> None:
+    while True:
+        await asyncio.sleep(LEASE_TICK_SEC)
+        try:
+            await lease_tick()
+        except Exception as e:
+            logger.warning("lease tick failed %s", e)
+
 #dispatch des jobs vers agents disponibles
-async def try_dispatch():
+def agent_mounts(rec: Dict[str, Any]) -> List[Tuple[str, str]]:
+    return IDENTITY if rec.get("local") else rec.get("mounts") or []
+
+def lease_payload(job: Dict[str, Any], spec: bool = False, mounts: Optional[List[Tuple[str, str]]] = None) -> Dict[str, Any]:
+    payload = remote_payload(job, spec)
+    if mounts and job.get("bundle"):
+        todo = bundle_todo(job)
+        srcs = [map_path(c.get("sourcePath") or "", mounts) for _, c in todo]
+        parts = [map_path(local_part_path(c.get("outputPath") or "", spec), mounts) for _, c in todo]
+        if all(srcs) and all(parts):
+            payload["spec"] = spec
+            for member, src, part in zip(payload["bundle"], srcs, parts):
+                member.update(inputPath=src, partPath=part)
+    elif mounts:
+        # source et sorties visibles par l'agent: lecture/écriture directes, le contrôleur sort du chemin des données.
+        # les URL restent dans le bail pour le repli HTTP si le montage est inaccessible côté agent
+        src = map_path(job.get("sourcePath") or "", mounts)
+        parts = [map_path(local_part_path(t.get("outputPath") or "", spec), mounts) for t in job.get("renditions") or [job]]
+        if src and all(parts):
+            payload.update(inputPath=src, spec=spec)
+            for out, part in zip(payload.get("outputs") or [payload], parts):
+                out["partPath"] = part
+    return payload
+
+def remote_payload(job: Dict[str, Any], spec: bool = False) -> Dict[str, Any]:
+    jid = job["id"]
+    base = get_public_base_url()
+    input_url = f"{base}/stream/input/{jid}?token={job['inputToken']}"
+    suffix = "&spec=1" if spec else ""
+    if job.get("bundle"):
+        # lot: arguments communs puis, par fichier, -map <entrée> + arguments de sortie; noms = index dans le lot
+        head, output = ffmpeg_arg_parts(job)
+        members = [{"index": i, "name": member_name(i, c["sourcePath"]), "output": member_name(i, c["outputPath"])} for i, c in bundle_todo(job)]
+        return {"jobId": jid, "inputUrl": input_url, "outputUrl": f"{base}/stream/output/{jid}?token={job['outputToken']}{suffix}",
+                "ffmpegArgs": head, "outputArgs": output, "outputExt": compute_output_ext("image", job.get("codec")), "bundle": members, "threads": 0}
+    if job.get("renditions"):
+        # une invocation, plusieurs sorties: arguments communs + arguments/URL par rendu
+        head, outputs = build_rendition_args(job)
+        outs = [{"name": r["name"], "outputUrl": f"{base}/stream/output/{jid}?token={r['outputToken']}&rendition={i}{suffix}",
+                 "outputExt": os.path.splitext(r["outputPath"])[1], "ffmpegArgs": args}
+                for i, (r, args) in enumerate(zip(job["renditions"], outputs))]
+        return {"jobId": jid, "inputUrl": input_url, "outputUrl": outs[0]["outputUrl"], "ffmpegArgs": head, "outputExt": outs[0]["outputExt"], "outputs": outs, "threads": 0}
+    output_url = f"{base}/stream/output/{jid}?token={job['outputToken']}{suffix}"
+    ff_args = build_ffmpeg_args(job)
+    out_ext = os.path.splitext(job.get("outputPath") or "")[1] or compute_output_ext(job.get("mediaType"), job.get("codec"))
+    return {"jobId": jid, "inputUrl": input_url, "outputUrl": output_url, "ffmpegArgs": ff_args, "outputExt": out_ext, "threads": 0}
+
+def assign_lease(aid: str, rec: Dict[str, Any], job: Dict[str, Any], spec: bool = False) -> Dict[str, Any]:
+    info = rec["info"]
+    M_LEASES.inc()
+    if spec:
+        update_job(job, specNodeId=aid)
+    else:
+        M_LEASE_WAIT.observe(max(0, now_ms() - int(job.get("updatedAt") or now_ms())) / 1000)
+        update_job(job, status="assigned", nodeId=aid, attempts=int(job.get("attempts") or 0) + 1, leasedAt=now_ms())
+    info["activeJobs"] = int(info.get("activeJobs", 0)) + 1
+    rec["jobs"].add(job["id"])
+    TUNER.started(aid, job["id"], family_of(job_encoders(job)))
+    return lease_payload(job, spec, agent_mounts(rec))
+
+def send_leases(aid: str, rec: Dict[str, Any], payloads: List[Dict[str, Any]]) -> None:
+    #ne fait qu'empiler les messages: aucune attente réseau pendant le dispatch.
+    #si la file est pleine la connexion est fermée et drop_agent reprend ces baux
+    if len(payloads) > 1 and rec.get("batch"):
+        rec["outbox"].send({"type": "leases", "payload": {"jobs": payloads}})
+    else:
+        for p in payloads:
+            if not rec["outbox"].send({"type": "lease", "payload": p}):
+                break
+    publish_agent(aid)
+
+def try_dispatch() -> None:
+    with Timer(M_DISPATCH):
+        _dispatch()
+
+def _dispatch() -> None:
     try:
-        # tri: plus gros fichiers en premier
-        PENDING_JOBS.sort(key=lambda jid: JOBS.get(jid, {}).get("sizeBytes", 0), reverse=True)
+        # ordre défini par la politique du scheduler, filtré par encodeurs de l'agent;
+        # un job par agent et par tour pour répartir, puis un seul message par agent
+        batches: Dict[str, List[Dict[str, Any]]] = {}
         made_progress = True
-        while made_progress:
+        while made_progress and len(SCHEDULER):
             made_progress = False
-            # boucle sur agents pour respecter leur capacité
+            # boucle sur agents pour respecter leur capacité (+ profondeur de préchargement)
             for aid, rec in list(AGENTS.items()):
-                info = rec.get("info", {})
-                free = int(info.get("concurrency", 1)) - int(info.get("activeJobs", 0))
-                if free <= 0:
+                if agent_free_slots(rec) <= 0 or rec["outbox"].closed:
                     continue
-                if not PENDING_JOBS:
+                if not len(SCHEDULER):
                     break
-                jid = PENDING_JOBS.pop(0)
+                # familles d'encodeurs à leur limite sur cet agent (autotune): sautées
+                extra = int(rec["info"].get("prefetch", 0))
+                jid = SCHEDULER.pop_for(rec.get("encoders"), skip=lambda req, aid=aid, extra=extra: TUNER.full(aid, family_of(req), extra))
+                if jid is None:
+                    continue
                 job = JOBS.get(jid)
                 if not job:
                     continue
-                base = get_public_base_url()
-                input_url = f"{base}/stream/input/{jid}?token={job['inputToken']}"
-                output_url = f"{base}/stream/output/{jid}?token={job['outputToken']}"
-                ff_args = build_ffmpeg_args(job)
-                out_ext = os.path.splitext(job.get("outputPath") or "")[1] or compute_output_ext(job.get("mediaType"), job.get("codec"))
-                job["status"] = "assigned"
-                job["nodeId"] = aid
-                job["updatedAt"] = now_ms()
-                info["activeJobs"] = int(info.get("activeJobs", 0)) + 1
-                try:
-                    await rec["ws"].send_json({"type": "lease", "payload": {"jobId": jid, "inputUrl": input_url, "outputUrl": output_url, "ffmpegArgs": ff_args, "outputExt": out_ext, "threads": 0}})
-                    made_progress = True
-                except Exception as e:
-                    logger.debug("send lease failed %s", e)
-                    # échec d'envoi: remettre en file d'attente
-                    info["activeJobs"] = max(0, int(info.get("activeJobs", 0)) - 1)
-                    PENDING_JOBS.insert(0, jid)
+                batches.setdefault(aid, []).append(assign_lease(aid, rec, job))
+                made_progress = True
+        for aid, payloads in batches.items():
+            send_leases(aid, AGENTS[aid], payloads)
     except Exception as e:
         logger.debug("dispatch error %s", e)
 
+#démarrage/arrêt: reprise des jobs persistés et tâches de fond
+def recover_jobs(jobs: List[Dict[str, Any]]) -> int:
+    requeued = 0
+    jobs = [JobRecord(j) for j in jobs]
+    for job in jobs:
+        JOBS[job["id"]] = job
+        # un job attribué ou en cours au moment de l'arrêt est perdu côté agent
+        if job.get("status") in ("pending", "assigned", "running"):
+            update_job(job, status="pending", nodeId=None)
+            route_job(job)
+            requeued += 1
+        elif job.get("status") == "splitting":
+            spawn(split_job(job))
+        if job.get("bundle") and job.get("status") not in ("completed", "uploaded", "failed"):
+            BUNDLES.add(job["id"])
+    for job in jobs:
+        # jobs identiques: rattachés à nouveau au job de référence (ou servis par le cache)
+        if job.get("status") in ("waiting", "caching"):
+            route_job(job)
+        # parents segmentés: tous les segments ont pu finir pendant l'arrêt
+        elif job.get("status") == "concat":
+            spawn(concat_job(job))
+        elif job.get("status") == "split":
+            check_segments(job)
+    JOB_QUERY.touch()
+    return requeued
+
+async def startup():
+    requeued = recover_jobs(await asyncio.to_thread(JOB_STORE.load)) if not JOBS else 0
+    logger.info("job store loaded jobs=%s requeued=%s", len(JOBS), requeued)
+    BACKGROUND_TASKS.append(asyncio.create_task(JOB_STORE.run(JOBS)))
+    BACKGROUND_TASKS.append(asyncio.create_task(run_leases()))
+    BACKGROUND_TASKS.append(asyncio.create_task(probe_loop_lag(M_LOOP_LAG, M_LOOP_LAG_LAST)))
+    await register_local_agent()
+
+def local_workers() -> int:
+    if LOCAL_WORKERS == "auto":
+        return max(1, (os.cpu_count() or 4) // 4)
+    try:
+        return max(0, int(LOCAL_WORKERS))
+    except ValueError:
+        logger.warning("invalid LOCAL_WORKERS=%r, local executor disabled", LOCAL_WORKERS)
+        return 0
+
+async def register_local_agent() -> None:
+    #pseudo-agent interne: mêmes baux, même file d'envoi et mêmes messages qu'un agent distant
+    workers = local_workers()
+    if not workers:
+        return
+    encoders = await detect_encoders()
+    if encoders is None:
+        logger.warning("local executor disabled: ffmpeg not found")
+        return
+    agent_id = "local-" + (platform.node() or "controller")
+    executor = LocalExecutor(agent_id, lambda mtype, payload: agent_message(agent_id, mtype, payload))
+    info = {"id": agent_id, "name": f"{agent_id} (controller)", "concurrency": workers, "effectiveConcurrency": workers,
+            "encoders": encoders, "prefetch": 0, "activeJobs": 0, "lastHeartbeat": now_ms(), "local": True}
+    outbox = Outbox(executor, on_close=lambda: drop_agent(agent_id, executor))
+    AGENTS[agent_id] = {"info": info, "ws": executor, "outbox": outbox,
+                        "encoders": frozenset(encoders) | {MULTI_OUTPUT, BUNDLE} if encoders else None,
+                        "jobs": set(), "batch": True, "local": True}
+    # l'exécuteur local lance chaque bail reçu: sa concurrence est entièrement celle du contrôleur
+    TUNER.add_agent(agent_id, workers, adjustable=True, cpus=os.cpu_count())
+    outbox.start()
+    executor.start()
+    logger.info("local executor registered id=%s workers=%s", agent_id, workers)
+    publish_agent(agent_id)
+    try_dispatch()
+
+async def shutdown():
+    for task in BACKGROUND_TASKS:
+        task.cancel()
+    await asyncio.gather(*BACKGROUND_TASKS, return_exceptions=True)
+    BACKGROUND_TASKS.clear()
+    for rec in [r for r in AGENTS.values() if r.get("local")]:
+        # pas de ffmpeg orphelin après l'arrêt: les jobs en cours repassent en attente
+        rec["outbox"].close()
+        await rec["ws"].close()
+    await JOB_STORE.flush(JOBS)
+
 #fenêtre Qt et serveur intégrés (désactivés en mode headless)
 if not HEADLESS:
     from PySide6 import QtCore, QtWidgets
     from PySide6.QtWidgets import (
         QApplication, QMainWindow, QWidget, QLabel, QLineEdit, QPushButton,
         QVBoxLayout, QHBoxLayout, QComboBox, QCheckBox, QFileDialog, QSpinBox,
-        QTableWidget, QTableWidgetItem, QMessageBox
+        QTableWidget, QTableWidgetItem, QMessageBox, QTableView, QHeaderView
     )
 
     #serveur uvicorn dans thread dédié
@@ -466,9 +1659,225 @@ if not HEADLESS:
             server = uvicorn.Server(config)
             asyncio.run(server.serve())
 
+    #lecture du flux /api/events hors du thread GUI, reconnexion avec backoff
+    #(thread Python daemon: une lecture bloquée sur un cluster inactif ne retient pas la sortie)
+    class EventStream(QtCore.QObject):
+        event_received = QtCore.Signal(str, object)
+
+        def __init__(self, url: str, parent=None):
+            super().__init__(parent)
+            self.url = url
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="events", daemon=True)
+
+        def start(self):
+            self._thread.start()
+
+        def stop(self):
+            self._stopping = True
+
+        def _run(self):
+            import requests
+            backoff = 1.0
+            while not self._stopping:
+                try:
+                    # pas de timeout de lecture: un cluster inactif n'émet rien
+                    with requests.get(self.url, stream=True, timeout=(5, None)) as r:
+                        backoff = 1.0
+                        kind, data = "message", []
+                        for line in r.iter_lines(decode_unicode=True):
+                            if self._stopping:
+                                return
+                            if line:
+                                if line.startswith("event:"):
+                                    kind = line[6:].strip()
+                                elif line.startswith("data:"):
+                                    data.append(line[5:].strip())
+                                continue
+                            if data:
+                                try:
+                                    self.event_received.emit(kind, json.loads("\n".join(data)))
+                                except ValueError:
+                                    logger.debug("bad event payload kind=%s", kind)
+                            kind, data = "message", []
+                except Exception as e:
+                    logger.debug("event stream error %s", e)
+                if not self._stopping:
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, 30.0)
+
+    #modèle de la table des jobs: pages chargées à la demande depuis /api/jobs, cache LRU borné
+    class JobTableModel(QtCore.QAbstractTableModel):
+        COLUMNS = [("path", "File"), ("status", "Status"), ("nodeId", "Agent"), ("sizeBytes", "Size"), ("percent", "%"), ("updatedAt", "Updated")]
+        SORTABLE = {"path", "status", "nodeId", "sizeBytes", "updatedAt"}
+        PAGE = 200
+        MAX_PAGES = 20
+        LIVE_PAGES = 3
+        page_loaded = QtCore.Signal(int, int, object)
+
+        def __init__(self, base_url: str, parent=None):
+            super().__init__(parent)
+            from collections import OrderedDict
+            from concurrent.futures import ThreadPoolExecutor
+            self.base_url = base_url
+            self.total = 0
+            self.pages: "OrderedDict[int, List[Dict[str, Any]]]" = OrderedDict()
+            self.loading: set = set()
+            self.row_index: Dict[str, tuple] = {}
+            self.status = ""
+            self.agent = ""
+            self.sort_key = "createdAt"
+            self.desc = False
+            self.generation = 0
+            self.dirty_rows: set = set()
+            self.pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="jobs-page")
+            self.page_loaded.connect(self._on_page)
+            self.refresh_timer = QtCore.QTimer(self); self.refresh_timer.setSingleShot(True)
+            self.refresh_timer.timeout.connect(self.refresh)
+            self.flush_timer = QtCore.QTimer(self); self.flush_timer.setSingleShot(True)
+            self.flush_timer.timeout.connect(self._flush_rows)
+            self._request(0)
+
+        def rowCount(self, parent=QtCore.QModelIndex()):
+            return 0 if parent.isValid() else self.total
+
+        def columnCount(self, parent=QtCore.QModelIndex()):
+            return 0 if parent.isValid() else len(self.COLUMNS)
+
+        def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+            if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+                return self.COLUMNS[section][1]
+            return None
+
+        def data(self, index, role=QtCore.Qt.DisplayRole):
+            if role != QtCore.Qt.DisplayRole or not index.isValid():
+                return None
+            page, i = divmod(index.row(), self.PAGE)
+            rows = self.pages.get(page)
+            if rows is None:
+                self._request(page)
+                return "…"
+            self.pages.move_to_end(page)
+            if i >= len(rows):
+                return None
+            key = self.COLUMNS[index.column()][0]
+            val = rows[i].get(key)
+            if val is None:
+                return ""
+            if key == "sizeBytes":
+                return f"{val / (1024 * 1024):.1f} MiB"
+            if key == "updatedAt":
+                return time.strftime("%H:%M:%S", time.localtime(val / 1000))
+            if key == "percent":
+                return f"{val:.1f}"
+            return str(val)
+
+        def sort(self, column, order=QtCore.Qt.AscendingOrder):
+            key = self.COLUMNS[column][0] if 0 <= column < len(self.COLUMNS) else ""
+            self.sort_key = key if key in self.SORTABLE else "createdAt"
+            self.desc = order == QtCore.Qt.DescendingOrder
+            self.reload()
+
+        def set_filters(self, status: str, agent: str):
+            self.status, self.agent = status, agent
+            self.reload()
+
+        def reload(self):
+            self.generation += 1
+            self.beginResetModel()
+            self.pages.clear(); self.row_index.clear(); self.loading.clear(); self.dirty_rows.clear()
+            self.total = 0
+            self.endResetModel()
+            self._request(0)
+
+        def _request(self, page: int):
+            if page in self.loading:
+                return
+            self.loading.add(page)
+            params = {"offset": page * self.PAGE, "limit": self.PAGE, "sort": self.sort_key, "desc": str(self.desc).lower()}
+            if self.status:
+                params["status"] = self.status
+            if self.agent:
+                params["agent"] = self.agent
+            self.pool.submit(self._fetch, self.generation, page, params)
+
+        def _fetch(self, generation: int, page: int, params: Dict[str, Any]):
+            import requests
+            try:
+                r = requests.get(f"{self.base_url}/api/jobs", params=params, timeout=10)
+                payload = r.json() if r.status_code < 300 else None
+            except Exception as e:
+                logger.debug("jobs page error %s", e)
+                payload = None
+            self.page_loaded.emit(generation, page, payload)
+
+        def _on_page(self, generation: int, page: int, payload: Optional[Dict[str, Any]]):
+            self.loading.discard(page)
+            if generation != self.generation or payload is None:
+                return
+            rows = payload.get("jobs") or []
+            old = self.pages.pop(page, None)
+            for r in old or []:
+                self.row_index.pop(r.get("id"), None)
+            self.pages[page] = rows
+            for i, r in enumerate(rows):
+                self.row_index[r.get("id")] = (page, i)
+            while len(self.pages) > self.MAX_PAGES:
+                _, evicted = self.pages.popitem(last=False)
+                for r in evicted:
+                    self.row_index.pop(r.get("id"), None)
+            self._set_total(int(payload.get("total", 0)))
+            first = page * self.PAGE
+            last = min(first + self.PAGE, self.total) - 1
+            if last >= first:
+                self.dataChanged.emit(self.index(first, 0), self.index(last, len(self.COLUMNS) - 1))
+
+        def _set_total(self, n: int):
+            if n > self.total:
+                self.beginInsertRows(QtCore.QModelIndex(), self.total, n - 1)
+                self.total = n
+                self.endInsertRows()
+            elif n < self.total:
+                self.beginRemoveRows(QtCore.QModelIndex(), n, self.total - 1)
+                self.total = n
+                self.endRemoveRows()
+
+        def apply_delta(self, job_id: str, fields: Dict[str, Any]):
+            #mise à jour en place des lignes en cache, signalées par lots
+            loc = self.row_index.get(job_id)
+            if loc is not None:
+                self.pages[loc[0]][loc[1]].update(fields)
+                self.dirty_rows.add(loc[0] * self.PAGE + loc[1])
+                if not self.flush_timer.isActive():
+                    self.flush_timer.start(100)
+            if "status" in fields and (self.status or self.sort_key != "createdAt"):
+                self.schedule_refresh()
+
+        def _flush_rows(self):
+            if not self.dirty_rows:
+                return
+            lo, hi = min(self.dirty_rows), max(self.dirty_rows)
+            self.dirty_rows.clear()
+            if hi < self.total:
+                self.dataChanged.emit(self.index(lo, 0), self.index(hi, len(self.COLUMNS) - 1))
+
+        def schedule_refresh(self):
+            if not self.refresh_timer.isActive():
+                self.refresh_timer.start(1000)
+
+        def refresh(self):
+            #recharge seulement les pages récemment affichées; les autres seront relues à la demande
+            live = list(self.pages.keys())[-self.LIVE_PAGES:] or [0]
+            for page in list(self.pages.keys()):
+                if page not in live:
+                    for r in self.pages.pop(page):
+                        self.row_index.pop(r.get("id"), None)
+            for page in live:
+                self._request(page)
+
     #fenêtre principale Qt native
     class MainWindow(QMainWindow):
-        poll_timer: QtCore.QTimer
+        events: EventStream
 
         def __init__(self):
             super().__init__()
@@ -512,8 +1921,11 @@ if not HEADLESS:
             self.chk_recursive.setChecked(True)
             self.chk_mirror = QCheckBox("Mirror structure")
             self.chk_mirror.setChecked(True)
+            self.chk_incremental = QCheckBox("Skip converted")
+            self.chk_incremental.setChecked(True)
             flags_row.addWidget(self.chk_recursive)
             flags_row.addWidget(self.chk_mirror)
+            flags_row.addWidget(self.chk_incremental)
 
             # Media & Codec section
             media_row = QHBoxLayout(); layout.addLayout(media_row)
@@ -550,6 +1962,8 @@ if not HEADLESS:
 
             self.lbl_summary = QLabel("")
             layout.addWidget(self.lbl_summary)
+            self.lbl_totals = QLabel("")
+            layout.addWidget(self.lbl_totals)
 
             # Nodes table
             layout.addWidget(QLabel("Nodes"))
@@ -557,6 +1971,24 @@ if not HEADLESS:
             self.tbl_nodes.setHorizontalHeaderLabels(["Name","Concurrency","Active","Last heartbeat"])
             layout.addWidget(self.tbl_nodes)
 
+            # Jobs table (modèle paginé)
+            jobs_row = QHBoxLayout(); layout.addLayout(jobs_row)
+            jobs_row.addWidget(QLabel("Jobs"))
+            jobs_row.addWidget(QLabel("Status:"))
+            self.cmb_job_status = QComboBox(); self.cmb_job_status.addItems(["", "pending", "assigned", "running", "uploaded", "completed", "failed"])
+            jobs_row.addWidget(self.cmb_job_status)
+            jobs_row.addWidget(QLabel("Agent:"))
+            self.ed_job_agent = QLineEdit()
+            jobs_row.addWidget(self.ed_job_agent)
+            self.jobs_model = JobTableModel(f"http://localhost:{PORT}", self)
+            self.tbl_jobs = QTableView()
+            self.tbl_jobs.setModel(self.jobs_model)
+            self.tbl_jobs.horizontalHeader().setSortIndicator(-1, QtCore.Qt.AscendingOrder)
+            self.tbl_jobs.setSortingEnabled(True)
+            self.tbl_jobs.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+            self.tbl_jobs.verticalHeader().setDefaultSectionSize(22)
+            layout.addWidget(self.tbl_jobs, 2)
+
             self.setCentralWidget(root)
 
             # events
@@ -567,16 +1999,19 @@ if not HEADLESS:
             self.btn_pair.clicked.connect(self.do_pair)
             self.btn_scan.clicked.connect(self.do_scan)
             self.btn_start.clicked.connect(self.do_start)
+            self.cmb_job_status.currentTextChanged.connect(self.apply_job_filters)
+            self.ed_job_agent.editingFinished.connect(self.apply_job_filters)
 
             # init
             self.last_plan = None
             self.fill_codecs()
             self.update_fields()
 
-            # polling nodes
-            self.poll_timer = QtCore.QTimer(self)
-            self.poll_timer.timeout.connect(self.refresh_nodes)
-            self.poll_timer.start(1500)
+            # nœuds et totaux poussés par le serveur
+            self.node_rows: Dict[str, int] = {}
+            self.events = EventStream(f"http://localhost:{PORT}/api/events", self)
+            self.events.event_received.connect(self.on_event)
+            self.events.start()
 
         #helpers
         def fill_codecs(self):
@@ -634,6 +2069,7 @@ if not HEADLESS:
                 "outputRoot": self.output_root.text().strip(),
                 "recursive": self.chk_recursive.isChecked(),
                 "mirrorStructure": self.chk_mirror.isChecked(),
+                "incremental": self.chk_incremental.isChecked(),
                 "mediaType": self.cmb_media.currentText(),
                 "codec": self.cmb_codec.currentText(),
                 "options": { "crf": self.spn_crf.value(), "preset": self.cmb_preset.currentText(), "bitrate": self.ed_bitrate.text().strip() }
@@ -641,7 +2077,8 @@ if not HEADLESS:
             logger.debug("do_scan %s", payload)
             try:
                 self.lbl_summary.setText("Scanning…")
-                r = requests.post(f"http://localhost:{PORT}/api/scan", json=payload, timeout=30)
+                # la réponse n'est qu'un résumé; le parcours d'un gros arbre peut prendre plusieurs minutes
+                r = requests.post(f"http://localhost:{PORT}/api/scan", json=payload, timeout=(5, 900))
                 j = r.json()
                 if r.status_code >= 300:
                     self.lbl_summary.setText(j.get('error') or 'Scan failed')
@@ -649,7 +2086,7 @@ if not HEADLESS:
                     return
                 self.last_plan = j
                 mib = (j.get('totalBytes', 0) / (1024*1024))
-                self.lbl_summary.setText(f"{j.get('count',0)} files, total {mib:.1f} MiB")
+                self.lbl_summary.setText(f"{j.get('count',0)} files, total {mib:.1f} MiB, {j.get('skipped',0)} already converted")
                 self.btn_start.setEnabled(j.get('count', 0) > 0)
             except Exception as e:
                 QMessageBox.warning(self, "Error", str(e))
@@ -657,35 +2094,69 @@ if not HEADLESS:
         def do_start(self):
             import requests
             try:
-                if not self.last_plan or not self.last_plan.get('jobs'):
+                if not self.last_plan or not self.last_plan.get('planId') or not self.last_plan.get('count'):
                     QMessageBox.information(self, "Start", "Scan first")
                     return
-                r = requests.post(f"http://localhost:{PORT}/api/start", json={"jobs": self.last_plan['jobs']}, timeout=15)
+                r = requests.post(f"http://localhost:{PORT}/api/start", json={"planId": self.last_plan['planId']}, timeout=60)
                 j = r.json()
                 if r.status_code >= 300:
                     QMessageBox.warning(self, "Error", j.get('error') or 'Start failed')
                     return
+                self.last_plan = None
+                self.btn_start.setEnabled(False)
                 QMessageBox.information(self, "Start", f"Accepted {j.get('accepted',0)} jobs")
             except Exception as e:
                 QMessageBox.warning(self, "Error", str(e))
 
-        def refresh_nodes(self):
-            import requests
-            try:
-                r = requests.get(f"http://localhost:{PORT}/api/nodes", timeout=3)
-                if r.status_code >= 300:
-                    return
-                data = r.json()
-                agents = data.get("agents", [])
-                self.tbl_nodes.setRowCount(len(agents))
-                for i, a in enumerate(agents):
-                    self.tbl_nodes.setItem(i, 0, QTableWidgetItem(str(a.get("name",""))))
-                    self.tbl_nodes.setItem(i, 1, QTableWidgetItem(str(a.get("concurrency",0))))
-                    self.tbl_nodes.setItem(i, 2, QTableWidgetItem(str(a.get("activeJobs",0))))
-                    hb_ms = a.get("lastHeartbeat") or 0
-                    self.tbl_nodes.setItem(i, 3, QTableWidgetItem(str(hb_ms)))
-            except Exception as e:
-                logger.debug("refresh_nodes error %s", e)
+        def on_event(self, kind: str, data: Dict[str, Any]):
+            if kind == "snapshot":
+                self.tbl_nodes.setRowCount(0)
+                self.node_rows.clear()
+                for a in data.get("agents", []):
+                    self.apply_agent(a)
+                self.apply_totals(data.get("totals") or {})
+                self.jobs_model.schedule_refresh()
+            elif kind == "agent":
+                self.apply_agent(data)
+            elif kind == "totals":
+                self.apply_totals(data)
+                self.jobs_model.schedule_refresh()
+            elif kind == "job":
+                self.jobs_model.apply_delta(str(data.get("id")), {k: data.get(k) for k in ("status", "nodeId", "updatedAt")})
+            elif kind == "progress":
+                self.jobs_model.apply_delta(str(data.get("jobId")), {"percent": data.get("percent")})
+
+        def apply_agent(self, a: Dict[str, Any]):
+            #mise à jour de la seule ligne concernée
+            aid = str(a.get("id", ""))
+            row = self.node_rows.get(aid)
+            if a.get("removed"):
+                if row is not None:
+                    self.tbl_nodes.removeRow(row)
+                    del self.node_rows[aid]
+                    self.node_rows = {k: (r - 1 if r > row else r) for k, r in self.node_rows.items()}
+                return
+            if row is None:
+                row = self.tbl_nodes.rowCount()
+                self.tbl_nodes.insertRow(row)
+                self.node_rows[aid] = row
+            values = [str(a.get("name","")), str(a.get("effectiveConcurrency", a.get("concurrency",0))), str(a.get("activeJobs",0)), str(a.get("lastHeartbeat") or 0)]
+            for col, text in enumerate(values):
+                item = self.tbl_nodes.item(row, col)
+                if item is None:
+                    self.tbl_nodes.setItem(row, col, QTableWidgetItem(text))
+                elif item.text() != text:
+                    item.setText(text)
+
+        def apply_job_filters(self):
+            self.jobs_model.set_filters(self.cmb_job_status.currentText(), self.ed_job_agent.text().strip())
+
+        def apply_totals(self, t: Dict[str, Any]):
+            self.lbl_totals.setText(f"Jobs: {t.get('totalJobs',0)} total, {t.get('pendingJobs',0)} pending, {t.get('runningJobs',0)} running")
+
+        def closeEvent(self, event):
+            self.events.stop()
+            super().closeEvent(event)
 
 #bootstrap app + server
 
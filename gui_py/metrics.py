@@ -0,0 +1,203 @@
+import time
+import asyncio
+import bisect
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+#this part do that
+#métriques du contrôleur: compteurs/histogrammes en mémoire, lus au format Prometheus (/metrics) ou JSON
+
+#secondes: de la milliseconde (dispatch, lag) à l'heure (attente en file)
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+
+
+def _escape(v: Any) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, n: float = 1.0) -> None:
+        self.value += n
+
+    def set(self, v: float) -> None:
+        self.value = v
+
+
+class _Buckets:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, v)] += 1
+        self.sum += v
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        #borne supérieure du seau qui contient le quantile (approximation, comme histogram_quantile)
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metric:
+    """Compteur, jauge ou histogramme, avec ou sans étiquettes.
+
+    Le chemin chaud ne fait qu'une addition (inc/observe sur l'enfant
+    renvoyé par labels(), à garder sous la main quand les étiquettes sont
+    fixes). `fn` donne une valeur calculée à la lecture (profondeur de
+    file, octets cumulés d'un autre module): aucun coût hors des lectures.
+    """
+
+    def __init__(self, kind: str, name: str, doc: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = TIME_BUCKETS, fn: Optional[Callable[[], Any]] = None):
+        self.kind = kind
+        self.name = name
+        self.doc = doc
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self.fn = fn
+        self.children: Dict[Tuple[str, ...], Any] = {}
+        self._default = self.labels() if not labelnames and fn is None else None
+
+    def labels(self, *values: str) -> Any:
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = _Buckets(self.buckets) if self.kind == "histogram" else _Value()
+        return child
+
+    def inc(self, n: float = 1.0) -> None:
+        self._default.value += n
+
+    def set(self, v: float) -> None:
+        self._default.value = v
+
+    def observe(self, v: float) -> None:
+        self._default.observe(v)
+
+    def values(self) -> Dict[Tuple[str, ...], Any]:
+        if self.fn is None:
+            return self.children
+        got = self.fn()
+        # fn: nombre (sans étiquettes) ou {valeurs d'étiquettes: nombre}
+        if isinstance(got, dict):
+            return {(k if isinstance(k, tuple) else (k,)): v for k, v in got.items()}
+        return {(): got}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        for values, v in list(self.values().items()):
+            if isinstance(v, _Buckets):
+                cum = 0
+                for bound, n in zip(v.bounds + (float("inf"),), v.counts):
+                    cum += n
+                    le = 'le="%s"' % _num(bound)
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, le)} {cum}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {_num(v.sum)}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {v.count}")
+            else:
+                lines.append(f"{self.name}{_labels(self.labelnames, values)} {_num(v.value if isinstance(v, _Value) else v)}")
+        return lines
+
+    def snapshot(self) -> Any:
+        out: Dict[str, Any] = {}
+        for values, v in list(self.values().items()):
+            key = ",".join(f"{n}={x}" for n, x in zip(self.labelnames, values)) or "value"
+            if isinstance(v, _Buckets):
+                out[key] = {"count": v.count, "sum": round(v.sum, 6), "p50": v.quantile(0.5), "p99": v.quantile(0.99)}
+            else:
+                out[key] = v.value if isinstance(v, _Value) else v
+        return out
+
+
+class Registry:
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self.metrics: Dict[str, Metric] = {}
+
+    def _add(self, kind: str, name: str, doc: str, **kw: Any) -> Metric:
+        m = self.metrics[name] = Metric(kind, self.prefix + name, doc, **kw)
+        return m
+
+    def counter(self, name: str, doc: str, labelnames: Tuple[str, ...] = (), fn: Optional[Callable[[], Any]] = None) -> Metric:
+        return self._add("counter", name, doc, labelnames=labelnames, fn=fn)
+
+    def gauge(self, name: str, doc: str, labelnames: Tuple[str, ...] = (), fn: Optional[Callable[[], Any]] = None) -> Metric:
+        return self._add("gauge", name, doc, labelnames=labelnames, fn=fn)
+
+    def histogram(self, name: str, doc: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = TIME_BUCKETS) -> Metric:
+        return self._add("histogram", name, doc, labelnames=labelnames, buckets=buckets)
+
+    def prometheus(self) -> str:
+        lines: List[str] = []
+        for m in list(self.metrics.values()):
+            try:
+                lines += m.render()
+            except Exception:
+                # une jauge calculée en erreur ne doit pas priver le scrape des autres métriques
+                continue
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for name, m in list(self.metrics.items()):
+            try:
+                out[name] = m.snapshot()
+            except Exception:
+                continue
+        return out
+
+
+async def probe_loop_lag(hist: Metric, gauge: Metric, interval: float = 0.5) -> None:
+    #retard du réveil d'un sleep = temps pendant lequel la boucle d'événements était occupée ailleurs
+    loop = asyncio.get_running_loop()
+    while True:
+        t0 = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - t0 - interval)
+        hist.observe(lag)
+        gauge.set(lag)
+
+
+class Timer:
+    """with Timer(hist): ... observe la durée du bloc (perf_counter)."""
+
+    __slots__ = ("target", "t0")
+
+    def __init__(self, target: Any):
+        self.target = target
+        self.t0 = 0.0
+
+    def __enter__(self) -> "Timer":
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.target.observe(time.perf_counter() - self.t0)
@@ -0,0 +1,43 @@
+import os
+from typing import Any, List, Optional, Tuple
+
+#this part do that
+#stockage partagé: correspondance des préfixes de chemins contrôleur -> agent annoncés au register
+
+#tout chemin, inchangé (exécuteur local du contrôleur)
+IDENTITY: List[Tuple[str, str]] = [("", "")]
+
+
+def parse_mounts(raw: Any) -> List[Tuple[str, str]]:
+    """[{"controller": "/mnt/nas", "agent": "/Volumes/nas"}] ou ["/mnt/nas=/Volumes/nas"]; préfixe le plus long en premier."""
+    mounts: List[Tuple[str, str]] = []
+    for m in raw if isinstance(raw, list) else []:
+        if isinstance(m, dict):
+            ctrl, agent = m.get("controller"), m.get("agent")
+        elif isinstance(m, str) and "=" in m:
+            ctrl, _, agent = m.partition("=")
+        else:
+            continue
+        if not ctrl or not agent or not os.path.isabs(str(ctrl)):
+            continue
+        mounts.append((os.path.normpath(str(ctrl)), str(agent)))
+    mounts.sort(key=lambda m: len(m[0]), reverse=True)
+    return mounts
+
+
+def map_path(path: str, mounts: Optional[List[Tuple[str, str]]]) -> Optional[str]:
+    """Chemin vu par l'agent, ou None si `path` n'est sous aucun montage partagé."""
+    if not path or not mounts:
+        return None
+    for ctrl, agent in mounts:
+        if not ctrl:
+            return path
+        if path != ctrl and not path.startswith(ctrl.rstrip(os.sep) + os.sep):
+            continue
+        rest = path[len(ctrl):].lstrip(os.sep)
+        # agent Windows (Z:\share): séparateurs de l'agent pour la suite du chemin
+        sep = "\\" if "\\" in agent and "/" not in agent else "/"
+        if not rest:
+            return agent
+        return agent.rstrip("/\\") + sep + rest.replace(os.sep, sep)
+    return None
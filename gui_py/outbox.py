@@ -0,0 +1,78 @@
+import os
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("gui_py")
+
+#this part do that
+#file d'envoi bornée par connexion agent, vidée par une tâche d'écriture dédiée
+
+OUTBOX_LIMIT = int(os.environ.get("AGENT_OUTBOX_LIMIT", "256"))
+SEND_TIMEOUT = float(os.environ.get("AGENT_SEND_TIMEOUT_SEC", "30"))
+
+
+class Outbox:
+    """Messages sortants d'un agent.
+
+    send() ne fait qu'empiler (O(1), jamais d'attente réseau): le dispatch
+    reste une opération en mémoire même si le socket de l'agent est lent.
+    Une file pleine ou un envoi qui dépasse `send_timeout` ferme la
+    connexion; `on_close` est appelé une seule fois pour reprendre les baux.
+    """
+
+    #messages envoyés par toutes les files, agents déconnectés compris (métriques)
+    sent_total = 0
+
+    def __init__(self, ws: Any, limit: int = OUTBOX_LIMIT, send_timeout: float = SEND_TIMEOUT,
+                 on_close: Optional[Callable[[], None]] = None):
+        self.ws = ws
+        self.queue: asyncio.Queue = asyncio.Queue(max(1, limit))
+        self.send_timeout = send_timeout
+        self.on_close = on_close
+        self.closed = False
+        self.sent = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self._run())
+
+    def send(self, msg: Dict[str, Any]) -> bool:
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(msg)
+            return True
+        except asyncio.QueueFull:
+            logger.warning("agent outbox full (%s messages), closing connection", self.queue.maxsize)
+            self.close(1013)
+            return False
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                msg = await self.queue.get()
+                await asyncio.wait_for(self.ws.send_json(msg), self.send_timeout)
+                self.sent += 1
+                Outbox.sent_total += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.debug("agent outbox send failed %s", e)
+            self.close(1011)
+
+    def close(self, code: int = 1000) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self.task and self.task is not asyncio.current_task():
+            self.task.cancel()
+        asyncio.ensure_future(self._close_ws(code))
+        if self.on_close:
+            self.on_close()
+
+    async def _close_ws(self, code: int) -> None:
+        try:
+            await asyncio.wait_for(self.ws.close(code=code), 2)
+        except Exception:
+            pass
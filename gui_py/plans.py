@@ -0,0 +1,65 @@
+import time
+import fnmatch
+from typing import Any, Dict, List
+
+from records import JobRecord
+
+#this part do that
+#plans de scan conservés côté serveur: le client ne manipule qu'un identifiant
+
+
+class ScanPlan:
+    """Résultat d'un /api/scan, gardé jusqu'au /api/start correspondant.
+
+    Les entrées sont des JobRecord qui deviennent directement les jobs au
+    démarrage (aucune copie); le client ne télécharge que le résumé et, s'il
+    veut les afficher, des pages de la liste.
+    """
+
+    def __init__(self, plan_id: str, req: Dict[str, Any], entries: List[JobRecord], stats: Dict[str, Any]):
+        self.id = plan_id
+        self.req = req
+        self.entries = entries
+        self.stats = stats
+        self.total_bytes = sum(int(e.get("sizeBytes") or 0) for e in entries)
+        self.created_at = int(time.time() * 1000)
+
+    def summary(self) -> Dict[str, Any]:
+        return {"planId": self.id, "count": len(self.entries), "totalBytes": self.total_bytes, "createdAt": self.created_at,
+                "inputRoot": self.req.get("inputRoot"), "outputRoot": self.req.get("outputRoot"),
+                "mediaType": self.req.get("mediaType"), "codec": self.req.get("codec"), **self.stats}
+
+    def page(self, offset: int = 0, limit: int = 200) -> Dict[str, Any]:
+        offset = max(0, offset)
+        limit = max(0, min(limit, 5000))
+        return {"total": len(self.entries), "offset": offset, "jobs": [dict(e) for e in self.entries[offset:offset + limit]]}
+
+    def select(self, filters: Dict[str, Any]) -> List[JobRecord]:
+        """Entrées retenues par include/exclude (chemins relatifs), pattern (glob) et minBytes/maxBytes."""
+        include = filters.get("include")
+        exclude = filters.get("exclude") or []
+        patterns = filters.get("pattern") or []
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        if (include is not None and not isinstance(include, list)) or not isinstance(exclude, list) or not isinstance(patterns, list):
+            raise ValueError("invalid filters")
+        try:
+            min_bytes = int(filters.get("minBytes") or 0)
+            max_bytes = int(filters["maxBytes"]) if filters.get("maxBytes") is not None else None
+        except (TypeError, ValueError):
+            raise ValueError("invalid filters") from None
+        include_set = set(include) if include is not None else None
+        exclude_set = set(exclude)
+        out: List[JobRecord] = []
+        for e in self.entries:
+            rel = e.get("relativePath") or ""
+            if include_set is not None and rel not in include_set:
+                continue
+            if rel in exclude_set or int(e.get("sizeBytes") or 0) < min_bytes:
+                continue
+            if max_bytes is not None and int(e.get("sizeBytes") or 0) > max_bytes:
+                continue
+            if patterns and not any(fnmatch.fnmatch(rel, p) for p in patterns):
+                continue
+            out.append(e)
+        return out
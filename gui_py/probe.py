@@ -0,0 +1,176 @@
+import os
+import json
+import sqlite3
+import asyncio
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("gui_py")
+
+#this part do that
+#analyse ffprobe des fichiers scannés (cache par chemin/taille/mtime) et modèle de coût d'encodage
+
+FFPROBE_PATH = os.environ.get("FFPROBE_PATH", "ffprobe")
+PROBE_WORKERS = int(os.environ.get("PROBE_WORKERS", "4"))
+#version du résumé stocké: les entrées plus anciennes sont ré-analysées
+PROBE_VERSION = 2
+
+#coût relatif de l'encodeur par pixel (libx264 preset medium = 1)
+VIDEO_CODEC_COST = {"h264": 1.0, "h265": 4.0, "hevc": 4.0, "av1": 3.0, "vp9": 5.0}
+X26X_PRESET_COST = {"ultrafast": 0.15, "superfast": 0.25, "veryfast": 0.4, "faster": 0.6, "fast": 0.8, "medium": 1.0,
+                    "slow": 2.0, "slower": 4.0, "veryslow": 8.0, "placebo": 16.0}
+#coût relatif du décodage de la source par pixel (h264 = 1)
+DECODE_COST = {"mjpeg": 0.3, "mpeg2video": 0.5, "h264": 1.0, "hevc": 2.0, "vp9": 2.0, "av1": 3.0, "prores": 0.6}
+#débit de référence: libx264 medium 1080p60 sur un cœur de référence (~10 threads)
+REF_ENCODE_PIXELS_PER_SEC = 1920 * 1080 * 60
+REF_DECODE_PIXELS_PER_SEC = 1920 * 1080 * 600
+#secondes d'encodage par seconde audio
+AUDIO_CODEC_COST = {"flac": 0.004, "alac": 0.004, "aac": 0.01, "mp3": 0.015, "opus": 0.012, "ogg": 0.012, "vorbis": 0.012}
+#secondes d'encodage par mégapixel d'image
+IMAGE_CODEC_COST = {"avif": 1.5, "heic": 0.6, "heif": 0.6, "webp": 0.15, "png": 0.08, "jpeg": 0.02, "jpg": 0.02}
+#sans analyse: octets traités par seconde, pour garder la même unité (secondes estimées)
+SIZE_FALLBACK_BPS = {"audio": 50e6, "video": 4e6, "image": 10e6}
+#copie de flux (remux): limitée par les E/S
+REMUX_BPS = 200e6
+
+
+def _rate(v: Any) -> Optional[float]:
+    try:
+        num, _, den = str(v).partition("/")
+        r = float(num) / float(den or 1)
+        return r if r > 0 else None
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+
+
+def probe_file(path: str) -> Dict[str, Any]:
+    """Résumé compact de ffprobe; {} si le fichier n'est pas lisible (résultat mis en cache aussi)."""
+    r = subprocess.run([FFPROBE_PATH, "-v", "error", "-show_format", "-show_streams", "-of", "json", path],
+                       capture_output=True, text=True, timeout=60)
+    if r.returncode != 0:
+        return {}
+    try:
+        data = json.loads(r.stdout or "{}")
+    except ValueError:
+        return {}
+    fmt = data.get("format") or {}
+    streams = data.get("streams") or []
+    video = next((s for s in streams if s.get("codec_type") == "video" and not (s.get("disposition") or {}).get("attached_pic")), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    info: Dict[str, Any] = {"streams": len(streams)}
+    try:
+        info["durationSec"] = round(float(fmt.get("duration") or (video or audio or {}).get("duration") or 0), 3) or None
+    except (TypeError, ValueError):
+        info["durationSec"] = None
+    if fmt.get("bit_rate"):
+        info["bitRate"] = int(fmt["bit_rate"])
+    if video:
+        info.update(width=int(video.get("width") or 0), height=int(video.get("height") or 0), vcodec=video.get("codec_name"),
+                    fps=_rate(video.get("avg_frame_rate")) or _rate(video.get("r_frame_rate")),
+                    pixFmt=video.get("pix_fmt"), vprofile=video.get("profile"), vBitRate=int(video.get("bit_rate") or 0) or None)
+    if audio:
+        info.update(acodec=audio.get("codec_name"), sampleRate=int(audio.get("sample_rate") or 0), channels=int(audio.get("channels") or 0),
+                    aBitRate=int(audio.get("bit_rate") or 0) or None)
+    return info
+
+
+def estimate_cost(info: Dict[str, Any], media_type: str, codec: str, options: Dict[str, Any], size: int,
+                  transcode: Optional[Dict[str, Any]] = None) -> float:
+    """Temps d'encodage estimé (secondes sur l'agent de référence). Sert à l'ordonnancement, pas à l'affichage exact.
+
+    Non arrondi: un petit fichier vaudrait 0.0 et perdrait son rang face aux autres (arrondir à l'affichage).
+    """
+    duration = info.get("durationSec") or 0
+    if transcode and transcode.get("path") != "encode":
+        # flux principal copié: reste l'E/S et, au plus, l'audio
+        audio = duration * AUDIO_CODEC_COST["aac"] if transcode.get("audio") == "encode" else 0.0
+        return size / REMUX_BPS + audio
+    if media_type == "video" and duration and info.get("width") and info.get("height"):
+        pixels = info["width"] * info["height"] * (info.get("fps") or 30.0)
+        if codec == "av1":
+            # SVT-AV1: chaque cran de preset en dessous de 6 coûte ~1.5x
+            factor = VIDEO_CODEC_COST["av1"] * 1.5 ** (6 - int(options.get("svtPreset", 6)))
+        else:
+            factor = VIDEO_CODEC_COST.get(codec, 1.0) * X26X_PRESET_COST.get(str(options.get("preset", "medium")), 1.0)
+        encode = duration * pixels / REF_ENCODE_PIXELS_PER_SEC * factor
+        decode = duration * pixels / REF_DECODE_PIXELS_PER_SEC * DECODE_COST.get(info.get("vcodec") or "", 1.0)
+        return encode + decode
+    if media_type == "audio" and duration:
+        return duration * AUDIO_CODEC_COST.get(codec, 0.01)
+    if media_type == "image" and info.get("width") and info.get("height"):
+        return info["width"] * info["height"] / 1e6 * IMAGE_CODEC_COST.get(codec, 0.1)
+    return size / SIZE_FALLBACK_BPS.get(media_type, 10e6)
+
+
+class ProbeCache:
+    """Résultats ffprobe persistés par chemin; valides tant que (taille, mtime) n'ont pas changé.
+
+    Un second scan du même arbre ne lance donc aucun ffprobe: une requête SQLite par lot.
+    """
+
+    def __init__(self, path: str, workers: int = PROBE_WORKERS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS probes (path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, data TEXT)")
+        self._db.commit()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ffprobe")
+        self.available = True
+        self.stats = {"probed": 0, "cached": 0}
+
+    def get_many(self, entries: List[Tuple[str, int, int]]) -> Dict[str, Dict[str, Any]]:
+        found: Dict[str, Dict[str, Any]] = {}
+        want = {p: (s, m) for p, s, m in entries}
+        paths = list(want)
+        with self._lock:
+            for i in range(0, len(paths), 500):
+                chunk = paths[i:i + 500]
+                q = "SELECT path, size, mtime, data FROM probes WHERE path IN (%s)" % ",".join("?" * len(chunk))
+                for path, size, mtime, data in self._db.execute(q, chunk):
+                    info = json.loads(data)
+                    if want[path] == (size, mtime) and info.pop("_v", 1) == PROBE_VERSION:
+                        found[path] = info
+        return found
+
+    def put_many(self, rows: List[Tuple[str, int, int, Dict[str, Any]]]) -> None:
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO probes (path, size, mtime, data) VALUES (?,?,?,?)",
+                                 [(p, s, m, json.dumps({**d, "_v": PROBE_VERSION})) for p, s, m, d in rows])
+            self._db.commit()
+
+    async def probe_entries(self, entries: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """chemin -> résumé pour un lot d'entrées de plan (sourcePath, sizeBytes, sourceMtime)."""
+        keys = [(e["sourcePath"], int(e.get("sizeBytes") or 0), int(e.get("sourceMtime") or 0)) for e in entries]
+        found = await asyncio.to_thread(self.get_many, keys)
+        self.stats["cached"] += len(found)
+        missing = [k for k in keys if k[0] not in found]
+        if not missing or not self.available:
+            return found
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(loop.run_in_executor(self._pool, probe_file, k[0]) for k in missing), return_exceptions=True)
+        rows: List[Tuple[str, int, int, Dict[str, Any]]] = []
+        for key, res in zip(missing, results):
+            if isinstance(res, FileNotFoundError):
+                # ffprobe absent: coût estimé par la taille pour la suite
+                logger.warning("ffprobe not found (%s), probing disabled", FFPROBE_PATH)
+                self.available = False
+                break
+            if isinstance(res, BaseException):
+                logger.debug("probe failed %s %s", key[0], res)
+                continue
+            found[key[0]] = res
+            rows.append((*key, res))
+        if rows:
+            await asyncio.to_thread(self.put_many, rows)
+            self.stats["probed"] += len(rows)
+        return found
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,175 @@
+import time
+from typing import Any, Dict, Optional
+
+#this part do that
+#agrégation des messages `progress` des agents (sortie ffmpeg -progress pipe:1)
+
+
+class RateWindow:
+    """Somme glissante sur `seconds` secondes, par seaux d'une seconde (mémoire constante)."""
+
+    __slots__ = ("seconds", "buckets", "head", "head_t")
+
+    def __init__(self, seconds: int = 30):
+        self.seconds = max(1, seconds)
+        self.buckets = [0.0] * self.seconds
+        self.head = 0
+        self.head_t = int(time.monotonic())
+
+    def _advance(self, now: float) -> None:
+        t = int(now)
+        steps = t - self.head_t
+        if steps <= 0:
+            return
+        for _ in range(min(steps, self.seconds)):
+            self.head = (self.head + 1) % self.seconds
+            self.buckets[self.head] = 0.0
+        self.head_t = t
+
+    def add(self, value: float, now: Optional[float] = None) -> None:
+        self._advance(time.monotonic() if now is None else now)
+        self.buckets[self.head] += value
+
+    def rate(self, now: Optional[float] = None) -> float:
+        self._advance(time.monotonic() if now is None else now)
+        return sum(self.buckets) / self.seconds
+
+
+def _num(v: Any) -> Optional[float]:
+    try:
+        return float(str(v).rstrip("x").strip())
+    except (TypeError, ValueError):
+        return None
+
+
+class JobProgress:
+    __slots__ = ("job_id", "agent_id", "duration", "out_time", "frame", "fps", "speed", "size", "started", "updated", "emitted")
+
+    def __init__(self, job_id: str, agent_id: str, duration: Optional[float], now: float):
+        self.job_id = job_id
+        self.agent_id = agent_id
+        self.duration = duration
+        self.out_time = 0.0
+        self.frame = 0
+        self.fps = 0.0
+        self.speed = 0.0
+        self.size = 0
+        self.started = now
+        self.updated = now
+        self.emitted = 0.0
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        eta = None
+        pct = None
+        if self.duration:
+            pct = min(100.0, self.out_time / self.duration * 100)
+            if self.speed > 0:
+                eta = max(0.0, (self.duration - self.out_time) / self.speed)
+        return {
+            "jobId": self.job_id, "agentId": self.agent_id, "outTimeSec": round(self.out_time, 3),
+            "frame": self.frame, "fps": self.fps, "speed": self.speed, "outputBytes": self.size,
+            "percent": None if pct is None else round(pct, 2), "etaSec": None if eta is None else round(eta, 1),
+            "elapsedSec": round(now - self.started, 1), "idleSec": round(now - self.updated, 1),
+        }
+
+
+class AgentRates:
+    __slots__ = ("media", "bytes", "frames")
+
+    def __init__(self, window: int):
+        self.media = RateWindow(window)
+        self.bytes = RateWindow(window)
+        self.frames = RateWindow(window)
+
+
+class ProgressTracker:
+    """État de progression par job (taille fixe) et débits glissants par agent et pour le cluster.
+
+    ingest() est O(1) et renvoie True au plus une fois par `min_interval`
+    secondes et par job: c'est le signal pour propager la progression
+    (événements, GUI) sans relayer chaque ligne ffmpeg.
+    """
+
+    def __init__(self, window: int = 30, min_interval: float = 1.0):
+        self.window = window
+        self.min_interval = min_interval
+        self.jobs: Dict[str, JobProgress] = {}
+        self.agents: Dict[str, AgentRates] = {}
+        self.cluster = AgentRates(window)
+        self.completed = RateWindow(window)
+        self.failed = RateWindow(window)
+
+    def ingest(self, job_id: str, agent_id: str, data: Dict[str, Any], duration: Optional[float] = None) -> bool:
+        now = time.monotonic()
+        jp = self.jobs.get(job_id)
+        if jp is None:
+            jp = self.jobs[job_id] = JobProgress(job_id, agent_id, duration, now)
+        rates = self.agents.get(jp.agent_id)
+        if rates is None:
+            rates = self.agents[jp.agent_id] = AgentRates(self.window)
+        out_us = _num(data.get("out_time_us") or data.get("out_time_ms"))
+        if out_us is not None:
+            out_time = out_us / 1e6
+            delta = max(0.0, out_time - jp.out_time)
+            jp.out_time = max(jp.out_time, out_time)
+            rates.media.add(delta, now); self.cluster.media.add(delta, now)
+        size = _num(data.get("total_size"))
+        if size is not None:
+            delta = max(0.0, size - jp.size)
+            jp.size = int(max(jp.size, size))
+            rates.bytes.add(delta, now); self.cluster.bytes.add(delta, now)
+        frame = _num(data.get("frame"))
+        if frame is not None:
+            delta = max(0.0, frame - jp.frame)
+            jp.frame = int(max(jp.frame, frame))
+            rates.frames.add(delta, now); self.cluster.frames.add(delta, now)
+        fps = _num(data.get("fps"))
+        if fps is not None:
+            jp.fps = fps
+        speed = _num(data.get("speed"))
+        if speed is not None:
+            jp.speed = speed
+        elif jp.out_time and now > jp.started:
+            jp.speed = jp.out_time / (now - jp.started)
+        jp.updated = now
+        if now - jp.emitted >= self.min_interval or data.get("progress") == "end":
+            jp.emitted = now
+            return True
+        return False
+
+    def finish(self, job_id: str, success: bool) -> None:
+        self.jobs.pop(job_id, None)
+        (self.completed if success else self.failed).add(1.0)
+
+    def forget(self, job_id: str) -> None:
+        self.jobs.pop(job_id, None)
+
+    def drop_agent(self, agent_id: str) -> None:
+        self.agents.pop(agent_id, None)
+
+    def job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        jp = self.jobs.get(job_id)
+        return jp.snapshot(time.monotonic()) if jp else None
+
+    def agent_stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        out: Dict[str, Dict[str, Any]] = {}
+        for aid, rates in self.agents.items():
+            out[aid] = {
+                "fps": round(rates.frames.rate(now), 2), "bytesPerSec": round(rates.bytes.rate(now)),
+                "mediaSecPerSec": round(rates.media.rate(now), 3),
+                "activeJobs": sum(1 for jp in self.jobs.values() if jp.agent_id == aid),
+            }
+        return out
+
+    def cluster_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "windowSec": self.window,
+            "fps": round(self.cluster.frames.rate(now), 2),
+            "bytesPerSec": round(self.cluster.bytes.rate(now)),
+            "mediaSecPerSec": round(self.cluster.media.rate(now), 3),
+            "jobsCompletedPerMin": round(self.completed.rate(now) * 60, 2),
+            "jobsFailedPerMin": round(self.failed.rate(now) * 60, 2),
+            "jobsInProgress": len(self.jobs),
+        }
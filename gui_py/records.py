@@ -0,0 +1,105 @@
+from collections.abc import MutableMapping
+from operator import attrgetter
+from typing import Any, Dict, Iterator, Optional
+
+#this part do that
+#enregistrement de job compact (__slots__) qui se comporte comme un dict
+
+#clés connues: un emplacement fixe chacune au lieu d'une table de hachage par job
+JOB_FIELDS = (
+    "id", "status", "sourcePath", "relativePath", "outputPath", "mediaType", "codec", "options", "fingerprint",
+    "sizeBytes", "sourceMtime", "inputToken", "outputToken", "createdAt", "updatedAt", "nodeId", "specNodeId",
+    "attempts", "leasedAt", "uploadedBy", "error", "estCost", "transcode", "contentHash", "resultKey", "renditions",
+    "parentId", "segmentIndex", "segments", "bundle", "bundleId",
+    # résumé ffprobe (probe.probe_file)
+    "streams", "durationSec", "bitRate", "width", "height", "vcodec", "fps", "pixFmt", "vprofile", "vBitRate",
+    "acodec", "sampleRate", "channels", "aBitRate",
+)
+_FIELDS = frozenset(JOB_FIELDS)
+_MISSING = object()
+
+
+class JobRecord(MutableMapping):
+    """Job ou entrée de plan: get/[]/update/in/** comme un dict, sans table de hachage par instance.
+
+    Les clés hors JOB_FIELDS vont dans un petit dict annexe créé à la demande.
+    json.dumps(record, default=record_dict) produit le même JSON qu'un dict.
+    """
+
+    __slots__ = JOB_FIELDS + ("_extra",)
+
+    def __init__(self, data: Any = (), **fields: Any):
+        # emplacements vides = _MISSING plutôt que non définis: une lecture ne lève jamais AttributeError (coûteux)
+        for fill in _FILL:
+            fill(self, _MISSING)
+        self._extra: Optional[Dict[str, Any]] = None
+        self.update(data, **fields)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _FIELDS:
+            value = getattr(self, key)
+            if value is _MISSING:
+                raise KeyError(key)
+            return value
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _FIELDS:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        return self._extra.get(key, default) if self._extra is not None else default
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in _FIELDS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in _FIELDS:
+            if getattr(self, key) is _MISSING:
+                raise KeyError(key)
+            setattr(self, key, _MISSING)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        if key in _FIELDS:
+            return getattr(self, key) is not _MISSING  # type: ignore[arg-type]
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self) -> Iterator[str]:
+        for key in JOB_FIELDS:
+            if getattr(self, key) is not _MISSING:
+                yield key
+        if self._extra:
+            yield from list(self._extra)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        #copie rapide (snapshot du store, JSON): un seul passage sur les emplacements
+        out = {key: value for key, value in zip(JOB_FIELDS, _VALUES(self)) if value is not _MISSING}
+        if self._extra:
+            out.update(self._extra)
+        return out
+
+    def __repr__(self) -> str:
+        return f"JobRecord({self.to_dict()!r})"
+
+
+#tous les emplacements d'un coup (tuple dans l'ordre de JOB_FIELDS); remplissage direct par les descripteurs
+_VALUES = attrgetter(*JOB_FIELDS)
+_FILL = tuple(JobRecord.__dict__[key].__set__ for key in JOB_FIELDS)
+
+
+def record_dict(obj: Any) -> Dict[str, Any]:
+    #default= de json.dumps pour les JobRecord imbriqués
+    return obj.to_dict() if isinstance(obj, JobRecord) else dict(obj)
@@ -0,0 +1,95 @@
+import os
+from typing import Any, Dict, Optional
+
+#this part do that
+#choix copie de flux / remux / ré-encodage à partir des métadonnées ffprobe du job
+
+#codec_name ffprobe attendu pour chaque codec cible
+VIDEO_TARGET = {"h264": "h264", "h265": "hevc", "hevc": "hevc", "av1": "av1", "vp9": "vp9"}
+AUDIO_TARGET = {"flac": "flac", "alac": "alac", "aac": "aac", "mp3": "mp3", "opus": "opus", "ogg": "vorbis", "vorbis": "vorbis"}
+LOSSLESS_AUDIO = {"flac", "alac"}
+#profils (noms ffprobe) compatibles avec la sortie ré-encodée (8 bits 4:2:0); options.copyProfiles pour les remplacer
+COPY_PROFILES = {
+    "h264": {"Baseline", "Constrained Baseline", "Main", "High"},
+    "hevc": {"Main"},
+    "av1": {"Main"},
+    "vp9": {"Profile 0"},
+}
+#bits par pixel au-delà desquels la source est assez lourde pour qu'un ré-encodage CRF vaille le coût
+COPY_MAX_BPP = {"h264": 0.15, "hevc": 0.08, "av1": 0.06, "vp9": 0.08}
+#codecs audio acceptés tels quels par le conteneur de sortie (None = tous)
+CONTAINER_AUDIO: Dict[str, Optional[set]] = {
+    ".mp4": {"aac", "mp3", "ac3", "eac3", "alac", "opus", "flac"},
+    ".m4a": {"aac", "alac"},
+    ".webm": {"opus", "vorbis"},
+    ".mkv": None,
+}
+
+
+def parse_bitrate(v: Any) -> Optional[int]:
+    s = str(v or "").strip().lower()
+    if not s:
+        return None
+    try:
+        mult = {"k": 1_000, "m": 1_000_000}.get(s[-1], 1)
+        return int(float(s[:-1] if mult > 1 else s) * mult)
+    except ValueError:
+        return None
+
+
+def _video_copyable(job: Dict[str, Any], target: str, options: Dict[str, Any]) -> bool:
+    if not options.get("allowCopy", True) or job.get("vcodec") != target:
+        return False
+    # les sorties ré-encodées sont en yuv420p 8 bits: ne copier que ce qui y correspond déjà
+    if job.get("pixFmt") != "yuv420p":
+        return False
+    # pix_fmt ne suffit pas: un flux High 10 ou High 4:4:4 peut être annoncé yuv420p
+    profiles = options.get("copyProfiles") or COPY_PROFILES.get(target)
+    if profiles is not None and job.get("vprofile") not in profiles:
+        return False
+    bitrate = job.get("vBitRate") or job.get("bitRate")
+    pixels = (job.get("width") or 0) * (job.get("height") or 0) * (job.get("fps") or 0)
+    if not bitrate or not pixels:
+        return False
+    return bitrate / pixels <= float(options.get("copyMaxBpp", COPY_MAX_BPP.get(target, 0.1)))
+
+
+def _audio_meets(job: Dict[str, Any], target: str, bitrate: Optional[int]) -> bool:
+    if job.get("acodec") != target:
+        return False
+    if target in LOSSLESS_AUDIO:
+        return True
+    src = job.get("aBitRate")
+    return bool(src and bitrate and src <= bitrate * 1.1)
+
+
+def choose_transcode(job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Plan par flux {"video", "audio", "path"} ou None quand rien n'a été analysé (ré-encodage complet).
+
+    path vaut "remux" (tout copié), "copy-video" (vidéo copiée, audio ré-encodé) ou "encode".
+    """
+    if not job.get("streams"):
+        return None
+    media_type = job.get("mediaType")
+    codec = job.get("codec") or ""
+    options = job.get("options") or {}
+    ext = os.path.splitext(job.get("outputPath") or "")[1].lower()
+    if media_type == "audio":
+        target = AUDIO_TARGET.get(codec, "aac")
+        copy = options.get("allowCopy", True) and _audio_meets(job, target, parse_bitrate(options.get("bitrate", "192k" if codec != "opus" else "160k")))
+        return {"video": None, "audio": "copy" if copy else "encode", "path": "remux" if copy else "encode"}
+    if media_type != "video":
+        return None
+    target = VIDEO_TARGET.get(codec, "h264")
+    video = "copy" if _video_copyable(job, target, options) else "encode"
+    audio = None
+    if job.get("acodec"):
+        allowed = CONTAINER_AUDIO.get(ext)
+        if options.get("audioCopy", True) is False:
+            keep = _audio_meets(job, "aac", parse_bitrate(options.get("audioBitrate", "160k"))) and (allowed is None or "aac" in allowed)
+        else:
+            # copie demandée mais codec refusé par le conteneur (pcm, dts, truehd dans mp4...): ré-encodage de l'audio seul
+            keep = allowed is None or job["acodec"] in allowed
+        audio = "copy" if keep else "encode"
+    path = "encode" if video == "encode" else "remux" if audio in (None, "copy") else "copy-video"
+    return {"video": video, "audio": audio, "path": path}
@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("gui_py")
+
+#this part do that
+#empreinte de contenu des sources et cache des sorties déjà encodées (clé = contenu + arguments)
+
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", "4"))
+HASH_CHUNK = 1 << 20
+#arguments sans effet sur le fichier produit, exclus de la clé
+_NEUTRAL_ARGS = {"-hide_banner", "-nostdin", "-y"}
+_NEUTRAL_PAIRS = {"-progress", "-loglevel"}
+
+
+def hash_file(path: str) -> str:
+    # blake2b libère le GIL: plusieurs fichiers sont hachés en parallèle par le pool de threads
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def result_key(content_hash: str, ffmpeg_args: List[str], output_ext: str) -> str:
+    args: List[str] = []
+    skip = False
+    for a in ffmpeg_args:
+        if skip:
+            skip = False
+        elif a in _NEUTRAL_PAIRS:
+            skip = True
+        elif a not in _NEUTRAL_ARGS:
+            args.append(a)
+    raw = json.dumps([content_hash, args, output_ext.lower()], separators=(",", ":"))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+class ResultCache:
+    """Sorties encodées réutilisables, indexées par (hash de la source, arguments normalisés).
+
+    Chaque résultat est conservé par lien physique (copie si autre volume)
+    dans `root`; la taille totale est bornée par `max_bytes` avec éviction
+    LRU. L'index est gardé en mémoire (lookup O(1) depuis la boucle) et
+    persisté dans SQLite; les opérations sur fichiers sont bloquantes et
+    s'appellent via asyncio.to_thread.
+    """
+
+    def __init__(self, db_path: str, root: str, max_bytes: int, workers: int = HASH_WORKERS):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # index mémoire partagé entre la boucle (lookup) et les threads (store/éviction)
+        self._mem = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS hashes (path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, digest TEXT)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, path TEXT, size INTEGER, last_used REAL)")
+        self._db.commit()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="hash")
+        self.entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        for key, path, size, _ in self._db.execute("SELECT key, path, size, last_used FROM results ORDER BY last_used"):
+            self.entries[key] = (path, int(size))
+        self.total_bytes = sum(size for _, size in self.entries.values())
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0, "hashed": 0, "hashCached": 0}
+
+    def _hashes_get(self, keys: List[Tuple[str, int, int]]) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        want = {p: (s, m) for p, s, m in keys}
+        paths = list(want)
+        with self._lock:
+            for i in range(0, len(paths), 500):
+                chunk = paths[i:i + 500]
+                q = "SELECT path, size, mtime, digest FROM hashes WHERE path IN (%s)" % ",".join("?" * len(chunk))
+                for path, size, mtime, digest in self._db.execute(q, chunk):
+                    if want[path] == (size, mtime):
+                        found[path] = digest
+        return found
+
+    def _hashes_put(self, rows: List[Tuple[str, int, int, str]]) -> None:
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO hashes (path, size, mtime, digest) VALUES (?,?,?,?)", rows)
+            self._db.commit()
+
+    async def hash_entries(self, entries: List[Dict[str, Any]]) -> Dict[str, str]:
+        """chemin -> hash de contenu; seuls les fichiers nouveaux ou modifiés sont relus."""
+        keys = [(e["sourcePath"], int(e.get("sizeBytes") or 0), int(e.get("sourceMtime") or 0)) for e in entries]
+        found = await asyncio.to_thread(self._hashes_get, keys)
+        self.stats["hashCached"] += len(found)
+        missing = [k for k in keys if k[0] not in found]
+        if not missing:
+            return found
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(loop.run_in_executor(self._pool, hash_file, k[0]) for k in missing), return_exceptions=True)
+        rows: List[Tuple[str, int, int, str]] = []
+        for key, res in zip(missing, results):
+            if isinstance(res, BaseException):
+                logger.debug("hash failed %s %s", key[0], res)
+                continue
+            found[key[0]] = res
+            rows.append((*key, res))
+        if rows:
+            await asyncio.to_thread(self._hashes_put, rows)
+            self.stats["hashed"] += len(rows)
+        return found
+
+    def lookup(self, key: str) -> Optional[str]:
+        with self._mem:
+            hit = self.entries.get(key)
+            if hit is None:
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return hit[0]
+
+    def materialize(self, key: str, dest: str) -> bool:
+        """Crée `dest` depuis le résultat en cache (lien physique, sinon copie). False si l'entrée a disparu."""
+        with self._mem:
+            hit = self.entries.get(key)
+        if hit is None or not os.path.exists(hit[0]):
+            self._forget(key)
+            return False
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        tmp = dest + ".cache.part"
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        try:
+            os.link(hit[0], tmp)
+        except OSError:
+            shutil.copyfile(hit[0], tmp)
+        os.replace(tmp, dest)
+        with self._lock:
+            self._db.execute("UPDATE results SET last_used=? WHERE key=?", (time.time(), key))
+            self._db.commit()
+        return True
+
+    def store(self, key: str, output_path: str) -> None:
+        with self._mem:
+            if key in self.entries:
+                return
+        ext = os.path.splitext(output_path)[1]
+        path = os.path.join(self.root, key[:2], key + ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.link(output_path, path)
+        except FileExistsError:
+            pass
+        except OSError:
+            shutil.copyfile(output_path, path)
+        size = os.path.getsize(path)
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO results (key, path, size, last_used) VALUES (?,?,?,?)", (key, path, size, time.time()))
+            self._db.commit()
+        with self._mem:
+            # deux stores concurrents de la même clé: compté une seule fois
+            if key in self.entries:
+                return
+            self.entries[key] = (path, size)
+            self.total_bytes += size
+            self.stats["stored"] += 1
+        self.evict()
+
+    def evict(self) -> None:
+        while True:
+            with self._mem:
+                if self.total_bytes <= self.max_bytes or len(self.entries) <= 1:
+                    return
+                key = next(iter(self.entries))
+            self._forget(key)
+            self.stats["evicted"] += 1
+
+    def _forget(self, key: str) -> None:
+        with self._mem:
+            hit = self.entries.pop(key, None)
+            if hit is None:
+                return
+            self.total_bytes -= hit[1]
+        try:
+            os.remove(hit[0])
+        except OSError:
+            pass
+        with self._lock:
+            self._db.execute("DELETE FROM results WHERE key=?", (key,))
+            self._db.commit()
+
+    def summary(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {**self.stats, "entries": len(self.entries), "bytes": self.total_bytes, "maxBytes": self.max_bytes,
+                "hitRate": round(self.stats["hits"] / lookups, 4) if lookups else None}
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+        with self._lock:
+            self._db.close()
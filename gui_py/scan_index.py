@@ -0,0 +1,111 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Dict, List, Tuple
+
+#this part do that
+#index persistant des scans: (chemin, taille, mtime, empreinte codec/options) -> déjà converti ?
+
+
+def fingerprint(media_type: str, codec: str, ffmpeg_args: List[str]) -> str:
+    raw = json.dumps({"mediaType": media_type, "codec": codec, "args": ffmpeg_args}, sort_keys=True)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+class ScanIndex:
+    """Index SQLite des fichiers vus par /api/scan.
+
+    Une entrée est « convertie » quand sa sortie a été reçue pour exactement
+    la même taille, le même mtime et la même empreinte d'encodage (ou, pour
+    une source déjà indexée avec cette empreinte, quand la sortie existe et
+    est plus récente que la source). Les méthodes sont bloquantes:
+    les appeler via asyncio.to_thread depuis la boucle d'événements.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT NOT NULL, fingerprint TEXT NOT NULL, size INTEGER, mtime INTEGER, output_path TEXT,"
+            " converted INTEGER NOT NULL DEFAULT 0, scan_id INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (fingerprint, path))"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self._db.commit()
+
+    def begin_scan(self) -> int:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key='scan_id'").fetchone()
+            scan_id = (row[0] if row else 0) + 1
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('scan_id', ?)", (scan_id,))
+            self._db.commit()
+            return scan_id
+
+    def filter_new(self, entries: List[Dict[str, Any]], fp: str, scan_id: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Retourne (entrées à encoder, nombre ignoré) pour un lot d'entrées de plan d'empreinte `fp`."""
+        keep: List[Dict[str, Any]] = []
+        skipped = 0
+        with self._lock:
+            known: Dict[str, Tuple[int, int, int]] = {}
+            paths = [e["sourcePath"] for e in entries]
+            for i in range(0, len(paths), 500):
+                chunk = paths[i:i + 500]
+                q = "SELECT path, size, mtime, converted FROM files WHERE fingerprint=? AND path IN (%s)" % ",".join("?" * len(chunk))
+                for path, size, mtime, conv in self._db.execute(q, [fp, *chunk]):
+                    known[path] = (size, mtime, conv)
+            rows = []
+            for e in entries:
+                src = e["sourcePath"]; size = int(e["sizeBytes"]); mtime = int(e.get("sourceMtime") or 0)
+                prev = known.get(src)
+                converted = bool(prev and prev[:2] == (size, mtime) and prev[2])
+                if not converted and prev is not None:
+                    # sortie déjà présente et plus récente que la source, pour une source déjà vue avec cette
+                    # même empreinte (marquage perdu); sans ligne, la sortie peut venir d'autres réglages
+                    try:
+                        converted = os.stat(e["outputPath"]).st_mtime_ns >= mtime
+                    except OSError:
+                        converted = False
+                if converted:
+                    skipped += 1
+                else:
+                    keep.append(e)
+                rows.append((src, fp, size, mtime, e["outputPath"], int(converted), scan_id))
+            self._db.executemany(
+                "INSERT INTO files (path, fingerprint, size, mtime, output_path, converted, scan_id) VALUES (?,?,?,?,?,?,?)"
+                " ON CONFLICT(fingerprint, path) DO UPDATE SET size=excluded.size, mtime=excluded.mtime,"
+                " output_path=excluded.output_path, converted=excluded.converted, scan_id=excluded.scan_id",
+                rows,
+            )
+            self._db.commit()
+        return keep, skipped
+
+    def mark_converted(self, path: str, size: int, mtime: int, fp: str, output_path: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO files (path, fingerprint, size, mtime, output_path, converted) VALUES (?,?,?,?,?,1)"
+                " ON CONFLICT(fingerprint, path) DO UPDATE SET converted=1, output_path=excluded.output_path"
+                " WHERE files.size=excluded.size AND files.mtime=excluded.mtime",
+                (path, fp, size, mtime, output_path),
+            )
+            self._db.commit()
+
+    def pop_deleted(self, root: str, fp: str, scan_id: int, recursive: bool = True) -> List[str]:
+        """Sources sous `root` absentes du scan `scan_id`; elles sont retirées de l'index."""
+        prefix = root.rstrip(os.sep) + os.sep
+        with self._lock:
+            # intervalle [prefix, prefix + U+10FFFF) pour utiliser l'index de la clé primaire
+            bounds = (fp, prefix, prefix + "\U0010ffff", scan_id)
+            rows = self._db.execute("SELECT path FROM files WHERE fingerprint=? AND path >= ? AND path < ? AND scan_id != ?", bounds)
+            gone = [r[0] for r in rows if recursive or os.sep not in r[0][len(prefix):]]
+            self._db.executemany("DELETE FROM files WHERE fingerprint=? AND path=?", [(fp, p) for p in gone])
+            self._db.commit()
+        return gone
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,67 @@
+import os
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Set, Tuple
+
+logger = logging.getLogger("gui_py")
+
+#this part do that
+#extensions reconnues par type de média
+MEDIA_EXTS: Dict[str, Set[str]] = {
+    "audio": {'.mp3', '.wav', '.flac', '.aac', '.m4a', '.ogg', '.opus', '.wma', '.aiff', '.alac'},
+    "video": {'.mp4', '.mkv', '.mov', '.avi', '.webm', '.m4v'},
+    "image": {'.jpg', '.jpeg', '.png', '.webp', '.tiff', '.bmp', '.heic', '.heif', '.avif'},
+}
+
+SCAN_WORKERS = int(os.environ.get("SCAN_WORKERS", "8"))
+
+
+def list_dir(dir_path: str, exts: Set[str], recursive: bool) -> Tuple[List[Dict[str, Any]], List[str]]:
+    #lecture d'un seul dossier (exécutée dans le pool), stat réutilisé depuis DirEntry
+    files: List[Dict[str, Any]] = []
+    subdirs: List[str] = []
+    try:
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        if os.path.splitext(entry.name)[1].lower() in exts:
+                            st = entry.stat(follow_symlinks=False)
+                            files.append({"path": entry.path, "size": st.st_size, "mtime": st.st_mtime_ns})
+                except OSError as e:
+                    logger.debug("stat fail %s: %s", entry.path, e)
+    except OSError as e:
+        logger.debug("scan error %s: %s", dir_path, e)
+    return files, subdirs
+
+
+async def iter_scan(root: str, recursive: bool, media_type: str, workers: int = SCAN_WORKERS) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Parcourt `root` en parallèle sur un pool de threads et produit les fichiers par lots (un lot par dossier).
+
+    La boucle d'événements n'exécute jamais scandir/stat elle-même; au plus
+    2*workers dossiers sont en cours de lecture à la fois.
+    """
+    exts = MEDIA_EXTS.get(media_type, set())
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="scan")
+    todo = deque([root])
+    running: Set[asyncio.Future] = set()
+    try:
+        while todo or running:
+            while todo and len(running) < 2 * max(1, workers):
+                running.add(loop.run_in_executor(pool, list_dir, todo.popleft(), exts, recursive))
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                files, subdirs = fut.result()
+                todo.extend(subdirs)
+                if files:
+                    yield files
+    finally:
+        for fut in running:
+            fut.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
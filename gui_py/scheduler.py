@@ -0,0 +1,150 @@
+import heapq
+import itertools
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from probe import SIZE_FALLBACK_BPS
+
+#this part do that
+#politiques de priorité (clé la plus petite = servie en premier)
+PolicyFn = Callable[[Dict[str, Any], int], Any]
+
+
+def job_cost(job: Dict[str, Any]) -> float:
+    # estCost (secondes estimées) si le scan l'a calculé, sinon la taille ramenée à la même échelle
+    # (segments, jobs postés sans sonde, estimation nulle): octets et secondes ne se comparent pas dans un même tas
+    est = job.get("estCost")
+    if est:
+        return float(est)
+    return float(job.get("sizeBytes") or 0) / SIZE_FALLBACK_BPS.get(job.get("mediaType") or "", 10e6)
+
+
+def needs_capability(req: Iterable[str]) -> bool:
+    # "@..." = capacité d'agent (lots, sorties multiples): jamais supposée, même pour un agent qui accepte tout
+    return any(r[:1] == "@" for r in req)
+
+
+def _largest_first(job: Dict[str, Any], seq: int) -> Any:
+    # travail le plus long d'abord (LPT)
+    return -job_cost(job)
+
+
+def _fifo(job: Dict[str, Any], seq: int) -> Any:
+    return seq
+
+
+def _shortest_estimated(job: Dict[str, Any], seq: int) -> Any:
+    return job_cost(job)
+
+
+POLICIES: Dict[str, PolicyFn] = {
+    "largest": _largest_first,
+    "fifo": _fifo,
+    "shortest": _shortest_estimated,
+}
+
+
+def register_policy(name: str, fn: PolicyFn) -> None:
+    POLICIES[name] = fn
+
+
+class JobScheduler:
+    """File d'attente des jobs en attente, un tas par jeu d'encodeurs requis.
+
+    push/pop sont en O(log n); pop_for() ne regarde que le sommet de chaque
+    tas dont les encodeurs sont disponibles sur l'agent, donc le coût ne
+    dépend que du nombre de familles d'encodeurs, pas de la taille de la file.
+    Les suppressions sont paresseuses (entrée marquée morte, ignorée au pop).
+    """
+
+    def __init__(self, policy: str = "largest"):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown policy {policy}")
+        self.policy = policy
+        self._key = POLICIES[policy]
+        self._seq = itertools.count()
+        self._heaps: Dict[Tuple[str, ...], List[list]] = {}
+        self._live: Dict[str, list] = {}
+        self._counts: Dict[Tuple[str, ...], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._live
+
+    def push(self, job_id: str, job: Dict[str, Any], requires: Iterable[str] = ()) -> None:
+        self.remove(job_id)
+        req = tuple(sorted(set(requires)))
+        seq = next(self._seq)
+        entry = [self._key(job, seq), seq, job_id, job, req, True]
+        self._live[job_id] = entry
+        self._counts[req] = self._counts.get(req, 0) + 1
+        heapq.heappush(self._heaps.setdefault(req, []), entry)
+
+    def remove(self, job_id: str) -> bool:
+        entry = self._live.pop(job_id, None)
+        if entry is None:
+            return False
+        entry[5] = False
+        self._dec(entry[4])
+        return True
+
+    def _dec(self, req: Tuple[str, ...]) -> None:
+        n = self._counts.get(req, 0) - 1
+        if n > 0:
+            self._counts[req] = n
+        else:
+            self._counts.pop(req, None)
+
+    def _top(self, req: Tuple[str, ...]) -> Optional[list]:
+        heap = self._heaps.get(req)
+        while heap and not heap[0][5]:
+            heapq.heappop(heap)
+        if not heap:
+            self._heaps.pop(req, None)
+            return None
+        return heap[0]
+
+    def pop_for(self, encoders: Optional[FrozenSet[str]] = None,
+                skip: Optional[Callable[[Tuple[str, ...]], bool]] = None) -> Optional[str]:
+        """Retire le meilleur job exécutable avec `encoders` (None = tout encodeur, sans capacité "@"), hors familles où `skip(req)`."""
+        best: Optional[list] = None
+        for req in list(self._heaps.keys()):
+            if encoders is None:
+                if needs_capability(req):
+                    continue
+            elif req and not encoders.issuperset(req):
+                continue
+            if skip is not None and skip(req):
+                continue
+            top = self._top(req)
+            if top is not None and (best is None or top[:2] < best[:2]):
+                best = top
+        if best is None:
+            return None
+        heapq.heappop(self._heaps[best[4]])
+        best[5] = False
+        self._live.pop(best[2], None)
+        self._dec(best[4])
+        return best[2]
+
+    def set_policy(self, policy: str) -> None:
+        #reconstruction des tas en O(n) avec la nouvelle clé
+        if policy not in POLICIES:
+            raise ValueError(f"unknown policy {policy}")
+        self.policy = policy
+        self._key = POLICIES[policy]
+        heaps: Dict[Tuple[str, ...], List[list]] = {}
+        for entry in self._live.values():
+            entry[0] = self._key(entry[3], entry[1])
+            heaps.setdefault(entry[4], []).append(entry)
+        for heap in heaps.values():
+            heapq.heapify(heap)
+        self._heaps = heaps
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "policy": self.policy,
+            "pending": len(self._live),
+            "queues": {"+".join(req) or "*": n for req, n in self._counts.items()},
+        }
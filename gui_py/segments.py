@@ -0,0 +1,77 @@
+import os
+import glob
+import subprocess
+from typing import List, Tuple
+
+#this part do that
+#découpage d'une longue vidéo en segments alignés sur les images clés, puis réassemblage (stream copy)
+
+FFMPEG_PATH = os.environ.get("FFMPEG_PATH", "ffmpeg")
+FFPROBE_PATH = os.environ.get("FFPROBE_PATH", "ffprobe")
+
+
+def probe_keyframes(path: str) -> Tuple[float, List[float]]:
+    #lecture des paquets seulement (pas de décodage): rapide même sur un master de plusieurs heures
+    fmt = subprocess.run([FFPROBE_PATH, "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+                         capture_output=True, text=True, check=True)
+    duration = float(fmt.stdout.strip() or 0)
+    pk = subprocess.run([FFPROBE_PATH, "-v", "error", "-select_streams", "v:0", "-show_entries", "packet=pts_time,flags",
+                         "-of", "csv=p=0", path], capture_output=True, text=True, check=True)
+    keyframes: List[float] = []
+    for line in pk.stdout.splitlines():
+        pts, _, flags = line.partition(",")
+        if "K" in flags:
+            try:
+                keyframes.append(float(pts))
+            except ValueError:
+                continue
+    keyframes.sort()
+    return duration, keyframes
+
+
+def plan_segments(keyframes: List[float], duration: float, target: float) -> List[float]:
+    """Instants de coupe: première image clé après chaque tranche de `target` secondes.
+
+    Pas de coupe si le reste fait moins de target/2 (pas de segment minuscule en fin).
+    """
+    cuts: List[float] = []
+    last = 0.0
+    for t in keyframes:
+        if t - last >= target and duration - t >= target / 2:
+            cuts.append(t)
+            last = t
+    return cuts
+
+
+def split_source(path: str, out_dir: str, target: float) -> List[Tuple[str, int]]:
+    duration, keyframes = probe_keyframes(path)
+    cuts = plan_segments(keyframes, duration, target)
+    if not cuts:
+        return []
+    os.makedirs(out_dir, exist_ok=True)
+    pattern = os.path.join(out_dir, "src_%05d.mkv")
+    subprocess.run([FFMPEG_PATH, "-hide_banner", "-nostdin", "-y", "-loglevel", "error", "-i", path,
+                    "-map", "0:v:0", "-map", "0:a?", "-c", "copy", "-f", "segment",
+                    "-segment_times", ",".join(f"{c:.6f}" for c in cuts), "-reset_timestamps", "1", pattern],
+                   capture_output=True, check=True)
+    return [(p, os.path.getsize(p)) for p in sorted(glob.glob(os.path.join(out_dir, "src_*.mkv")))]
+
+
+def concat_segments(parts: List[str], out_path: str) -> None:
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    root, ext = os.path.splitext(out_path)
+    list_path = root + ".concat.txt"
+    tmp_path = root + ".concat" + ext
+    with open(list_path, "w", encoding="utf-8") as f:
+        for p in parts:
+            f.write("file '" + os.path.abspath(p).replace("'", "'\\''") + "'\n")
+    try:
+        subprocess.run([FFMPEG_PATH, "-hide_banner", "-nostdin", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                        "-i", list_path, "-map", "0", "-c", "copy", tmp_path], capture_output=True, check=True)
+        os.replace(tmp_path, out_path)
+    finally:
+        for p in (list_path, tmp_path):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from records import JobRecord, record_dict
+
+logger = logging.getLogger("gui_py")
+
+#this part do that
+#stockage durable des jobs (SQLite WAL) avec commits groupés
+
+
+class JobStore:
+    """Journal persistant de l'état des jobs.
+
+    La boucle d'événements ne fait que marquer les jobs modifiés (O(1));
+    la tâche run() copie périodiquement le dernier état de chaque job
+    marqué, puis le sérialise et l'écrit en une seule transaction dans un
+    thread. Plusieurs
+    transitions d'un même job entre deux flushs coûtent donc une seule ligne
+    et un seul fsync est payé par lot.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 0.05):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.flush_interval = flush_interval
+        #jobs copiés entre deux rendus de main à la boucle
+        self.slice = 2000
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT, updated_at INTEGER, data TEXT)")
+        self._db.commit()
+        self._dirty: Set[str] = set()
+        self._deleted: Set[str] = set()
+        self.stats = {"flushes": 0, "rows": 0, "lastFlushMs": 0.0}
+
+    def mark(self, job_id: str) -> None:
+        self._deleted.discard(job_id)
+        self._dirty.add(job_id)
+
+    def delete(self, job_id: str) -> None:
+        self._dirty.discard(job_id)
+        self._deleted.add(job_id)
+
+    def load(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute("SELECT data FROM jobs").fetchall()
+        jobs: List[Dict[str, Any]] = []
+        for (data,) in rows:
+            try:
+                jobs.append(json.loads(data))
+            except ValueError:
+                logger.warning("job store: unreadable row skipped")
+        return jobs
+
+    def write(self, rows: Iterable[Tuple[str, str, int, str]], deleted: Iterable[str] = ()) -> int:
+        with self._lock:
+            cur = self._db.executemany(
+                "INSERT INTO jobs (id, status, updated_at, data) VALUES (?,?,?,?)"
+                " ON CONFLICT(id) DO UPDATE SET status=excluded.status, updated_at=excluded.updated_at, data=excluded.data",
+                rows,
+            )
+            n = cur.rowcount
+            self._db.executemany("DELETE FROM jobs WHERE id=?", [(d,) for d in deleted])
+            self._db.commit()
+        return n
+
+    async def snapshot(self, jobs: Dict[str, Dict[str, Any]]) -> Tuple[List[Tuple[str, str, int, Dict[str, Any]]], List[str]]:
+        #sur la boucle: copie superficielle des jobs marqués, par tranches (le JSON est fait dans le thread)
+        dirty, self._dirty = self._dirty, set()
+        deleted, self._deleted = list(self._deleted), set()
+        rows = []
+        for i, jid in enumerate(dirty, 1):
+            job = jobs.get(jid)
+            if job is not None:
+                rows.append((jid, str(job.get("status")), int(job.get("updatedAt") or 0),
+                             job.to_dict() if isinstance(job, JobRecord) else dict(job)))
+            if i % self.slice == 0:
+                # un job modifié pendant la pause est remarqué et repart au flush suivant
+                await asyncio.sleep(0)
+        return rows, deleted
+
+    def _encode_write(self, rows: List[Tuple[str, str, int, Dict[str, Any]]], deleted: List[str]) -> List[str]:
+        #hors de la boucle; une valeur imbriquée modifiée pendant l'encodage fait repousser le job au flush suivant
+        encoded: List[Tuple[str, str, int, str]] = []
+        retry: List[str] = []
+        for jid, status, updated, data in rows:
+            try:
+                encoded.append((jid, status, updated, json.dumps(data, default=record_dict)))
+            except RuntimeError:
+                retry.append(jid)
+        self.write(encoded, deleted)
+        return retry
+
+    async def flush(self, jobs: Dict[str, Dict[str, Any]]) -> None:
+        if not self._dirty and not self._deleted:
+            return
+        rows, deleted = await self.snapshot(jobs)
+        t0 = time.perf_counter()
+        try:
+            retry = await asyncio.to_thread(self._encode_write, rows, deleted)
+        except Exception:
+            # on remarque tout pour réessayer au prochain flush
+            self._dirty.update(r[0] for r in rows)
+            self._deleted.update(deleted)
+            raise
+        self._dirty.update(retry)
+        self.stats["flushes"] += 1
+        self.stats["rows"] += len(rows)
+        self.stats["lastFlushMs"] = round((time.perf_counter() - t0) * 1000, 3)
+
+    async def run(self, jobs: Dict[str, Dict[str, Any]]) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush(jobs)
+            except Exception as e:
+                logger.warning("job store flush failed %s", e)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
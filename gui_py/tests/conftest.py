@@ -0,0 +1,5 @@
+import os
+import sys
+
+#les modules de gui_py s'importent entre eux par leur nom (lancé en script depuis gui_py/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
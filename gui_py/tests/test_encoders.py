@@ -0,0 +1,51 @@
+from local_agent import parse_encoders
+from scheduler import JobScheduler
+
+#extrait réel de `ffmpeg -hide_banner -encoders` (légende, séparateur, puis une ligne par encodeur)
+SAMPLE = """Encoders:
+ V..... = Video
+ A..... = Audio
+ S..... = Subtitle
+ .F.... = Frame-level multithreading
+ ..S... = Slice-level multithreading
+ ...X.. = Codec is experimental
+ ....B. = Supports draw_horiz_band
+ .....D = Supports direct rendering method 1
+ ------
+ V....D libx264              libx264 H.264 / AVC / MPEG-4 AVC / MPEG-4 part 10 (codec h264)
+ V....D mjpeg                MJPEG (Motion JPEG)
+ V....D png                  PNG (Portable Network Graphics) image
+ V....D libwebp              libwebp WebP image (codec webp)
+ A....D aac                  AAC (Advanced Audio Coding)
+ A....D alac                 ALAC (Apple Lossless Audio Codec)
+ A....D flac                 FLAC (Free Lossless Audio Codec)
+ A....D libopus              libopus Opus (codec opus)
+ S..... srt                  SubRip subtitle (codec subrip)
+"""
+
+
+def test_parse_encoders_reads_names_not_descriptions():
+    assert parse_encoders(SAMPLE) == ["libx264", "mjpeg", "png", "libwebp", "aac", "alac", "flac", "libopus", "srt"]
+
+
+def test_parse_encoders_without_listing():
+    assert parse_encoders("") == []
+    assert parse_encoders("Encoders:\n V..... = Video\n") == []
+
+
+def test_detected_encoders_dispatch_matching_jobs():
+    sched = JobScheduler("fifo")
+    wanted = {"a": ["aac"], "f": ["flac"], "o": ["libopus"], "p": ["png"], "w": ["libwebp"], "j": ["mjpeg"], "v": ["libx264", "aac"]}
+    for jid, req in wanted.items():
+        sched.push(jid, {"id": jid, "sizeBytes": 1}, req)
+    sched.push("x265", {"id": "x265", "sizeBytes": 1}, ["libx265"])
+    encoders = frozenset(parse_encoders(SAMPLE))
+    got = set()
+    while True:
+        jid = sched.pop_for(encoders)
+        if jid is None:
+            break
+        got.add(jid)
+    assert got == set(wanted)
+    # encodeur absent de l'agent: le job reste en file
+    assert "x265" in sched
@@ -0,0 +1,22 @@
+from remux import choose_transcode
+
+
+def video_job(**fields):
+    job = {"mediaType": "video", "codec": "h264", "outputPath": "/o/a.mkv", "streams": 2, "vcodec": "h264", "pixFmt": "yuv420p",
+           "vprofile": "High", "width": 1920, "height": 1080, "fps": 30.0, "vBitRate": 4_000_000, "acodec": "aac", "options": {}}
+    job.update(fields)
+    return job
+
+
+def test_light_h264_high_is_copied():
+    assert choose_transcode(video_job())["video"] == "copy"
+
+
+def test_rejected_profile_is_reencoded():
+    for profile in ("High 10", "High 4:4:4 Predictive", None):
+        assert choose_transcode(video_job(vprofile=profile))["video"] == "encode"
+
+
+def test_copy_profiles_override():
+    assert choose_transcode(video_job(vprofile="High 10", options={"copyProfiles": ["High", "High 10"]}))["video"] == "copy"
+    assert choose_transcode(video_job(options={"copyProfiles": ["Main"]}))["video"] == "encode"
@@ -0,0 +1,15 @@
+from probe import estimate_cost
+from scheduler import JobScheduler, job_cost
+
+
+def test_small_unprobed_files_keep_their_size_order():
+    # sans ffprobe: estimation par la taille, trop petite pour survivre à un arrondi au millième
+    sizes = {"s": 1_000, "m": 2_000, "l": 3_000}
+    sched = JobScheduler("largest")
+    for jid, size in sizes.items():
+        sched.push(jid, {"id": jid, "mediaType": "audio", "sizeBytes": size, "estCost": estimate_cost({}, "audio", "flac", {}, size)})
+    assert [sched.pop_for() for _ in sizes] == ["l", "m", "s"]
+
+
+def test_zero_estimate_falls_back_to_size():
+    assert job_cost({"estCost": 0.0, "mediaType": "audio", "sizeBytes": 4_000}) > job_cost({"estCost": 0.0, "mediaType": "audio", "sizeBytes": 1_000})
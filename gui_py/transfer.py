@@ -0,0 +1,262 @@
+import os
+import asyncio
+import hashlib
+import secrets
+import mimetypes
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+#this part do that
+#envoi de fichiers avec Range/If-Range/ETag et chemin zéro-copie si le serveur ASGI le propose
+
+MAX_RANGES = 64
+CHUNK_SIZE = 4 * 1024 * 1024
+UPLOAD_MAX_PENDING = int(os.environ.get("UPLOAD_MAX_PENDING", "16"))
+
+
+def file_etag(st: os.stat_result) -> str:
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def parse_ranges(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """Plages (début, fin incluse) triées et fusionnées.
+
+    None = en-tête invalide (à ignorer, réponse 200 complète);
+    liste vide = aucune plage satisfaisable (416).
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+    ranges: List[Tuple[int, int]] = []
+    parts = spec.split(",")
+    if len(parts) > MAX_RANGES:
+        return None
+    for part in parts:
+        start_s, sep, end_s = part.strip().partition("-")
+        if not sep:
+            return None
+        try:
+            if not start_s:
+                n = int(end_s)
+                if n <= 0:
+                    continue
+                start, end = max(0, size - n), size - 1
+            else:
+                start = int(start_s)
+                end = int(end_s) if end_s else size - 1
+                if end_s and end < start:
+                    return None
+                end = min(end, size - 1)
+        except ValueError:
+            return None
+        if start < size:
+            ranges.append((start, end))
+    ranges.sort()
+    merged: List[Tuple[int, int]] = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class FileRangeResponse(Response):
+    """Réponse fichier (200, 206 simple ou multipart/byteranges).
+
+    Utilise l'extension ASGI `http.response.zerocopysend` (sendfile côté
+    serveur) quand elle est annoncée dans le scope; sinon lit par pread()
+    dans un thread avec lecture anticipée d'un bloc, sans jamais bloquer la
+    boucle d'événements. Avec `reader` (io_scheduler.ReadStream), chaque
+    bloc attend un créneau de lecture de son disque et fait reader.chunk octets.
+    """
+
+    def __init__(self, path: str, st: os.stat_result, ranges: List[Tuple[int, int]], status_code: int, headers: Dict[str, str], content_type: str,
+                 head: bool = False, reader: Optional[Any] = None):
+        super().__init__(status_code=status_code, headers=headers)
+        self.path = path
+        self.head = head
+        self.reader = reader
+        self.parts: List[Tuple[bytes, int, int]] = []
+        if status_code == 206 and len(ranges) > 1:
+            boundary = secrets.token_hex(12)
+            for start, end in ranges:
+                preamble = f"--{boundary}\r\nContent-Type: {content_type}\r\nContent-Range: bytes {start}-{end}/{st.st_size}\r\n\r\n"
+                self.parts.append((preamble.encode(), start, end - start + 1))
+                self.parts.append((b"\r\n", 0, 0))
+            self.parts.append((f"--{boundary}--\r\n".encode(), 0, 0))
+            self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+        else:
+            start, end = ranges[0] if ranges else (0, st.st_size - 1)
+            self.parts.append((b"", start, end - start + 1))
+            self.headers["content-type"] = content_type
+        self.headers["content-length"] = str(sum(len(p) + n for p, _, n in self.parts))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.head:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+        fd = await asyncio.to_thread(os.open, self.path, os.O_RDONLY)
+        try:
+            with os.fdopen(fd, "rb", buffering=0, closefd=False) as f:
+                for preamble, offset, count in self.parts:
+                    if preamble:
+                        await send({"type": "http.response.body", "body": preamble, "more_body": True})
+                    if count <= 0:
+                        continue
+                    if zerocopy and self.reader is not None:
+                        await self._send_zerocopy(send, f, offset, count)
+                    elif zerocopy:
+                        await send({"type": "http.response.zerocopysend", "file": f, "offset": offset, "count": count, "more_body": True})
+                    else:
+                        await self._send_pread(send, fd, offset, count)
+        finally:
+            os.close(fd)
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _send_zerocopy(self, send: Send, f, offset: int, count: int) -> None:
+        #le serveur lit pendant l'envoi: le créneau du disque couvre chaque bloc envoyé
+        end = offset + count
+        while offset < end:
+            n = min(self.reader.chunk, end - offset)
+            async with self.reader.slot(n):
+                await send({"type": "http.response.zerocopysend", "file": f, "offset": offset, "count": n, "more_body": True})
+            offset += n
+
+    def _read(self, fd: int, size: int, offset: int):
+        if self.reader is not None:
+            return asyncio.ensure_future(self.reader.read(fd, size, offset))
+        return asyncio.ensure_future(asyncio.to_thread(os.pread, fd, size, offset))
+
+    async def _send_pread(self, send: Send, fd: int, offset: int, count: int) -> None:
+        #lecture du bloc suivant pendant l'envoi du bloc courant
+        end = offset + count
+        chunk_size = self.reader.chunk if self.reader is not None else CHUNK_SIZE
+        nxt = self._read(fd, min(chunk_size, count), offset)
+        while nxt is not None:
+            chunk = await nxt
+            if not chunk:
+                break
+            offset += len(chunk)
+            nxt = self._read(fd, min(chunk_size, end - offset), offset) if offset < end else None
+            try:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            except BaseException:
+                if nxt is not None:
+                    nxt.cancel()
+                raise
+
+
+def file_response(path: str, request: Request, st: Optional[os.stat_result] = None, reader: Optional[Any] = None) -> Response:
+    """Construit la réponse pour `path` selon Range/If-Range de `request` (GET ou HEAD)."""
+    st = st or os.stat(path)
+    etag = file_etag(st)
+    last_modified = formatdate(st.st_mtime, usegmt=True)
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    headers = {"accept-ranges": "bytes", "etag": etag, "last-modified": last_modified}
+    head = request.method == "HEAD"
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # If-Range périmé: la ressource a changé, on renvoie le fichier entier
+    if range_header and if_range and if_range not in (etag, last_modified):
+        range_header = None
+    ranges = parse_ranges(range_header, st.st_size) if range_header else None
+    if ranges is None:
+        return FileRangeResponse(path, st, [], 200, headers, content_type, head, reader)
+    if not ranges:
+        return Response(status_code=416, headers={**headers, "content-range": f"bytes */{st.st_size}"})
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["content-range"] = f"bytes {start}-{end}/{st.st_size}"
+    return FileRangeResponse(path, st, ranges, 206, headers, content_type, head, reader)
+
+
+def parse_content_range(header: str) -> Optional[Tuple[int, int, Optional[int]]]:
+    """`bytes a-b/total` -> (a, b, total|None); None si invalide."""
+    unit, _, spec = header.strip().partition(" ")
+    if unit.lower() != "bytes":
+        return None
+    rng, _, total_s = spec.partition("/")
+    start_s, sep, end_s = rng.partition("-")
+    try:
+        start, end = int(start_s), int(end_s)
+        total = None if total_s.strip() in ("", "*") else int(total_s)
+    except ValueError:
+        return None
+    if not sep or end < start or (total is not None and end >= total):
+        return None
+    return start, end, total
+
+
+class PartWriter:
+    """Écriture d'un fichier `.part` hors de la boucle d'événements.
+
+    Un thread dédié par upload sérialise les écritures (ordre garanti);
+    au plus UPLOAD_MAX_PENDING blocs attendent en mémoire, au-delà write()
+    attend le disque (contre-pression vers le client). Le SHA-256 est calculé
+    au fil de l'eau, préfixe existant compris en cas de reprise.
+    """
+
+    def __init__(self, path: str, offset: int = 0, checksum: bool = False, max_pending: int = UPLOAD_MAX_PENDING):
+        self.path = path
+        self.offset = offset
+        self.hasher = hashlib.sha256() if checksum else None
+        self._max_pending = max(1, max_pending)
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="upload")
+        self._pending: Deque[asyncio.Future] = deque()
+        self._f = None
+
+    def _open(self) -> None:
+        if self.offset == 0:
+            self._f = open(self.path, "wb")
+            return
+        self._f = open(self.path, "r+b")
+        if self.hasher is not None:
+            while self._f.tell() < self.offset:
+                chunk = self._f.read(min(CHUNK_SIZE, self.offset - self._f.tell()))
+                if not chunk:
+                    break
+                self.hasher.update(chunk)
+        self._f.seek(self.offset)
+        self._f.truncate()
+
+    def _write(self, chunk: bytes) -> None:
+        self._f.write(chunk)
+        if self.hasher is not None:
+            self.hasher.update(chunk)
+
+    def _close(self, sync: bool) -> None:
+        if self._f is not None:
+            self._f.flush()
+            if sync:
+                os.fsync(self._f.fileno())
+            self._f.close()
+            self._f = None
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+
+    async def open(self) -> None:
+        await self._run(self._open)
+
+    async def write(self, chunk: bytes) -> None:
+        self._pending.append(asyncio.ensure_future(self._run(self._write, chunk)))
+        self.offset += len(chunk)
+        while len(self._pending) > self._max_pending:
+            await self._pending.popleft()
+
+    async def close(self, sync: bool = False) -> None:
+        try:
+            while self._pending:
+                await self._pending.popleft()
+        finally:
+            await self._run(self._close, sync)
+            self._pool.shutdown(wait=False)
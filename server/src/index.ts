@@ -2,7 +2,7 @@ import WebSocket from 'ws';
 import os from 'os';
 import fs from 'fs';
 import path from 'path';
-import { spawn } from 'child_process';
+import { spawn, ChildProcess } from 'child_process';
 import axios from 'axios';
 import pino from 'pino';
 
@@ -17,10 +17,20 @@ const CONTROLLER_WS = CONTROLLER_URL.replace(/^http/, 'ws');
 const AGENT_TOKEN = process.env.AGENT_TOKEN || 'dev-token';
 const CONCURRENCY = Number(process.env.CONCURRENCY || os.cpus().length);
 const FFMPEG_PATH = process.env.FFMPEG_PATH || 'ffmpeg';
+const PREFETCH = Number(process.env.PREFETCH || 2);
+//montages partagés avec le contrôleur: "cheminControleur=cheminAgent;..." (ex. /mnt/nas=/Volumes/nas)
+const STORAGE_MOUNTS = (process.env.STORAGE_MOUNTS || '').split(';').map((m) => m.trim()).filter((m) => m.includes('='));
 
 const agentId = `${os.hostname()}-${process.pid}`;
 let activeJobs = 0;
+//créneaux effectifs: CONCURRENCY au départ, puis la valeur réglée par l'autotune du contrôleur
+let slots = CONCURRENCY;
+//baux reçus en avance: l'entrée est téléchargée pendant l'encodage du job courant
+const queued: { p: any; input: Promise<string | null> }[] = [];
 let lastHeartbeatAt = Date.now();
+//processus en cours par job, arrêtés sur "cancel" (copie perdante d'un job spéculé)
+const children = new Map<string, Set<ChildProcess>>();
+const cancelled = new Set<string>();
 
 async function execCapture(cmd: string, args: string[]): Promise<string> {
   return new Promise((resolve) => {
@@ -37,9 +47,15 @@ async function detectEncoders(): Promise<string[]> {
     const out = await execCapture(FFMPEG_PATH, ['-hide_banner', '-encoders']);
     const lines = out.split(/\r?\n/);
     const enc: string[] = [];
+    // 2e colonne des lignes après le séparateur ------ (la légende " V..... = Video" le précède)
+    let listing = false;
     for (const line of lines) {
-      const m = line.match(/^[\s\.A-Z]+\s+([a-z0-9_\-]+)\s+/i);
-      if (m) enc.push(m[1]);
+      const fields = line.trim().split(/\s+/);
+      if (!listing) {
+        listing = /^-+$/.test(fields[0]);
+        continue;
+      }
+      if (fields.length >= 2 && /^[A-Za-z0-9_\-]+$/.test(fields[1])) enc.push(fields[1]);
     }
     logger.debug({ count: enc.length }, 'detectEncoders done');
     return enc;
@@ -55,7 +71,7 @@ const ws = new WebSocket(`${CONTROLLER_WS}/agent?token=${encodeURIComponent(AGEN
 ws.on('open', async () => {
   logger.info('websocket open');
   const encoders = await detectEncoders();
-  ws.send(JSON.stringify({ type: 'register', payload: { id: agentId, name: os.hostname(), concurrency: CONCURRENCY, encoders, token: AGENT_TOKEN } }));
+  ws.send(JSON.stringify({ type: 'register', payload: { id: agentId, name: os.hostname(), concurrency: CONCURRENCY, encoders, token: AGENT_TOKEN, prefetch: PREFETCH, batchLeases: true, multiOutput: true, bundles: true, autotune: true, cpus: os.cpus().length, mounts: STORAGE_MOUNTS } }));
   logger.debug({ agentId, encodersCount: encoders.length }, 'register sent');
 });
 
@@ -64,17 +80,65 @@ ws.on('error', (err) => { logger.error({ err: String(err) }, 'websocket error');
 ws.on('message', async (data) => {
   try {
     const msg = JSON.parse(data.toString());
-    if (msg.type === 'lease') {
-      const p = msg.payload || {};
-      if (activeJobs >= CONCURRENCY) return;
-      logger.debug({ jobId: p.jobId }, 'lease received');
-      handleLease(p).catch(() => {});
+    if (msg.type === 'lease' || msg.type === 'leases') {
+      const leases: any[] = msg.type === 'leases' ? (msg.payload?.jobs || []) : [msg.payload || {}];
+      for (const p of leases) {
+        logger.debug({ jobId: p.jobId }, 'lease received');
+        queued.push({ p, input: prefetchInput(p) });
+      }
+      pump();
+    } else if (msg.type === 'concurrency') {
+      const n = Number(msg.payload?.slots);
+      if (Number.isInteger(n) && n > 0) {
+        logger.info({ slots: n }, 'concurrency updated');
+        slots = n;
+        pump();
+      }
+    } else if (msg.type === 'cancel') {
+      cancelJob(String(msg.payload?.jobId || ''));
     }
   } catch {}
 });
 
+function track(jobId: string | undefined, child: ChildProcess) {
+  if (!jobId) return;
+  let set = children.get(jobId);
+  if (!set) { set = new Set(); children.set(jobId, set); }
+  set.add(child);
+  child.on('close', () => { set!.delete(child); });
+}
+
+function cancelJob(jobId: string) {
+  if (!jobId) return;
+  const i = queued.findIndex((q) => q.p.jobId === jobId);
+  if (i >= 0) {
+    //pas encore démarré: retiré de la file, le contrôleur libère le bail
+    queued.splice(i, 1);
+    try { ws.send(JSON.stringify({ type: 'complete', payload: { jobId, agentId, success: false } })); } catch {}
+    return;
+  }
+  cancelled.add(jobId);
+  for (const child of children.get(jobId) || []) { try { child.kill('SIGKILL'); } catch {} }
+  logger.info({ jobId }, 'job cancelled');
+}
+
 ws.on('close', () => { logger.info('websocket closed'); process.exit(0); });
 
+//utilisation CPU (0..1) depuis le heartbeat précédent, d'après les compteurs de os.cpus()
+let cpuTimes = os.cpus().map((c) => c.times);
+function cpuUtil(): number {
+  const now = os.cpus().map((c) => c.times);
+  let busy = 0; let total = 0;
+  now.forEach((t, i) => {
+    const p = cpuTimes[i] || t;
+    const idle = t.idle - p.idle;
+    const all = (t.user - p.user) + (t.nice - p.nice) + (t.sys - p.sys) + (t.irq - p.irq) + idle;
+    busy += all - idle; total += all;
+  });
+  cpuTimes = now;
+  return total > 0 ? busy / total : 0;
+}
+
 setInterval(() => {
   try {
     lastHeartbeatAt = Date.now();
@@ -82,26 +146,92 @@ setInterval(() => {
     const memFree = os.freemem();
     const memUsed = memTotal - memFree;
     const load = os.loadavg()[0] || 0;
-    ws.send(JSON.stringify({ type: 'heartbeat', payload: { id: agentId, activeJobs, cpu: load, memUsed, memTotal } }));
+    ws.send(JSON.stringify({ type: 'heartbeat', payload: { id: agentId, activeJobs, queued: queued.length, cpu: load, memUsed, memTotal,
+      cpuUtil: cpuUtil(), load1: load, cpus: os.cpus().length, memFree: memTotal ? memFree / memTotal : undefined } }));
   } catch {}
 }, 10000);
 
-async function handleLease(p: any) {
+function pump() {
+  while (activeJobs < slots && queued.length) {
+    const next = queued.shift()!;
+    handleLease(next.p, next.input).catch(() => {});
+  }
+}
+
+//téléchargement anticipé de l'entrée (null = lecture directe de inputUrl par ffmpeg)
+async function prefetchInput(p: any): Promise<string | null> {
+  const direct = p.inputPath || (Array.isArray(p.bundle) && p.bundle.length && p.bundle.every((m: any) => m.inputPath));
+  if (direct || activeJobs + queued.length < slots) return null;
+  const tmpDir = path.join(os.tmpdir(), 'ffmpegeasy');
+  const dest = path.join(tmpDir, `${p.jobId}.input`);
+  try {
+    await fs.promises.mkdir(tmpDir, { recursive: true });
+    const r = await axios.get(p.inputUrl, { responseType: 'stream', timeout: 120000 });
+    await new Promise<void>((resolve, reject) => {
+      const out = fs.createWriteStream(dest);
+      r.data.pipe(out);
+      out.on('finish', () => resolve());
+      out.on('error', reject);
+      r.data.on('error', reject);
+    });
+    logger.debug({ jobId: p.jobId }, 'input prefetched');
+    return dest;
+  } catch (e) {
+    logger.warn({ jobId: p.jobId, err: String(e) }, 'input prefetch failed');
+    try { await fs.promises.unlink(dest); } catch {}
+    return null;
+  }
+}
+
+async function handleLease(p: any, prefetched: Promise<string | null>) {
   activeJobs += 1;
+  let slotHeld = true;
+  const releaseSlot = () => { if (slotHeld) { slotHeld = false; activeJobs -= 1; pump(); } };
+  const tmpFiles: string[] = [];
   try {
     const jobId: string = p.jobId;
     const inputUrl: string = p.inputUrl;
-    const outputUrl: string = p.outputUrl;
+    try { ws.send(JSON.stringify({ type: 'lease-accepted', payload: { jobId } })); } catch {}
+    if (Array.isArray(p.bundle)) {
+      const ok = await runBundle(p, await prefetched, tmpFiles);
+      releaseSlot();
+      try { ws.send(JSON.stringify({ type: 'complete', payload: { jobId, agentId, success: ok } })); } catch {}
+      return;
+    }
     const ffmpegArgs: string[] = Array.isArray(p.ffmpegArgs) ? p.ffmpegArgs : [];
-    const outputExt: string = p.outputExt || '.out';
+    //plusieurs rendus: une sortie ffmpeg (args + URL d'upload) par élément de p.outputs
+    const outputs: { outputUrl: string; outputExt: string; ffmpegArgs: string[]; partPath?: string }[] = Array.isArray(p.outputs)
+      ? p.outputs.map((o: any) => ({ outputUrl: o.outputUrl, outputExt: o.outputExt || '.out', ffmpegArgs: Array.isArray(o.ffmpegArgs) ? o.ffmpegArgs : [], partPath: o.partPath }))
+      : [{ outputUrl: p.outputUrl, outputExt: p.outputExt || '.out', ffmpegArgs: [], partPath: p.partPath }];
+
+    //bail par chemins (stockage partagé): lecture et écriture directes sur le montage, repli HTTP s'il est inaccessible
+    let direct = false;
+    if (p.inputPath && outputs.every((o) => o.partPath)) {
+      try {
+        await fs.promises.access(p.inputPath, fs.constants.R_OK);
+        for (const o of outputs) await fs.promises.mkdir(path.dirname(o.partPath!), { recursive: true });
+        direct = true;
+      } catch (e) {
+        logger.warn({ jobId, err: String(e) }, 'shared mount unavailable, using http');
+      }
+    }
 
     const tmpDir = path.join(os.tmpdir(), 'ffmpegeasy');
     await fs.promises.mkdir(tmpDir, { recursive: true });
-    const tmpOut = path.join(tmpDir, `${jobId}${outputExt}`);
+    const tmpOuts = direct ? outputs.map((o) => o.partPath!) : outputs.map((o, i) => path.join(tmpDir, `${jobId}.${i}${o.outputExt}`));
+    //en direct, le contrôleur renomme les sorties: elles ne sont supprimées ici qu'en cas d'échec
+    if (!direct) tmpFiles.push(...tmpOuts);
+    const localInput = await prefetched;
+    if (localInput) tmpFiles.push(localInput);
+    if (cancelled.has(jobId)) {
+      try { ws.send(JSON.stringify({ type: 'complete', payload: { jobId, agentId, success: false } })); } catch {}
+      return;
+    }
 
-  const args = ['-i', inputUrl, ...ffmpegArgs, tmpOut];
+  const args = ['-i', localInput || (direct ? p.inputPath : inputUrl), ...ffmpegArgs, ...outputs.flatMap((o, i) => [...o.ffmpegArgs, tmpOuts[i]])];
     logger.info({ jobId, args }, 'ffmpeg start');
   const child = spawn(FFMPEG_PATH, args, { stdio: ['ignore', 'pipe', 'pipe'] });
+  track(jobId, child);
 
     child.stdout.on('data', (d) => {
       const text = d.toString();
@@ -117,38 +247,139 @@ async function handleLease(p: any) {
     const timer = setTimeout(() => { if (!done) { try { child.kill('SIGKILL'); } catch {} resolve(124); } }, 30 * 60 * 1000);
     child.on('close', (code) => { done = true; clearTimeout(timer); resolve(code ?? 1); });
   });
+    if (rc !== 0 && direct) tmpFiles.push(...tmpOuts);
     if (rc !== 0) { logger.warn({ jobId, rc }, 'ffmpeg failed'); try { ws.send(JSON.stringify({ type: 'complete', payload: { jobId, agentId, success: false } })); } catch {} throw new Error(`ffmpeg failed rc=${rc}`); }
 
-    const stat = await fs.promises.stat(tmpOut);
-    logger.debug({ jobId, size: stat.size }, 'upload begin');
-  //upload avec retries
-  {
-    const maxRetries = 3;
-    let attempt = 0; let uploaded = false;
-    while (attempt < maxRetries && !uploaded) {
-      attempt += 1;
-      try {
-        const stream = fs.createReadStream(tmpOut);
-        const r = await axios.put(outputUrl, stream, { headers: { 'Content-Length': String(stat.size) }, maxContentLength: Infinity, maxBodyLength: Infinity, timeout: 120000, validateStatus: () => true });
-        if (r.status >= 200 && r.status < 300) { uploaded = true; break; }
-        logger.warn({ attempt, status: r.status }, 'upload failed');
-      } catch (e) {
-        logger.warn({ attempt, err: String(e) }, 'upload error');
+    //l'encodeur est libre: le job suivant démarre pendant l'upload
+    releaseSlot();
+    if (cancelled.has(jobId)) {
+      //l'autre copie a déjà gagné: pas d'upload
+      tmpFiles.push(...tmpOuts);
+      try { ws.send(JSON.stringify({ type: 'complete', payload: { jobId, agentId, success: false } })); } catch {}
+      return;
+    }
+    if (direct) {
+      //sorties déjà à côté de leur destination: le contrôleur les met en place, pas d'upload
+      for (let i = 0; i < outputs.length; i++) {
+        try { ws.send(JSON.stringify({ type: 'output-ready', payload: { jobId, rendition: Array.isArray(p.outputs) ? i : null, spec: !!p.spec } })); } catch {}
       }
-      await new Promise(res => setTimeout(res, 2000));
     }
+  for (let i = 0; i < outputs.length && !direct; i++) {
+    const tmpOut = tmpOuts[i];
+    const outputUrl = outputs[i].outputUrl;
+    const uploaded = await uploadFile(outputUrl, tmpOut);
     if (!uploaded) throw new Error('upload failed after retries');
   }
 
     logger.info({ jobId }, 'upload done');
     try { ws.send(JSON.stringify({ type: 'complete', payload: { jobId, agentId, success: true } })); } catch {}
   } catch {} finally {
-    try {
-      const p = path.join(os.tmpdir(), 'ffmpegeasy');
-      const files = await fs.promises.readdir(p);
-      for (const f of files) { try { await fs.promises.unlink(path.join(p, f)); } catch {} }
-    } catch {}
+    //seulement les fichiers de ce job: les entrées préchargées des suivants restent
+    for (const f of tmpFiles) { try { await fs.promises.rm(f, { recursive: true, force: true }); } catch {} }
     logger.debug('cleanup tmp done');
-    activeJobs -= 1;
+    children.delete(p.jobId);
+    cancelled.delete(p.jobId);
+    releaseSlot();
+  }
+}
+
+//upload d'un fichier avec retries
+async function uploadFile(outputUrl: string, file: string): Promise<boolean> {
+  const stat = await fs.promises.stat(file);
+  logger.debug({ file, size: stat.size }, 'upload begin');
+  const maxRetries = 3;
+  for (let attempt = 1; attempt <= maxRetries; attempt++) {
+    try {
+      const stream = fs.createReadStream(file);
+      const r = await axios.put(outputUrl, stream, { headers: { 'Content-Length': String(stat.size) }, maxContentLength: Infinity, maxBodyLength: Infinity, timeout: 120000, validateStatus: () => true });
+      if (r.status >= 200 && r.status < 300) return true;
+      logger.warn({ attempt, status: r.status }, 'upload failed');
+    } catch (e) {
+      logger.warn({ attempt, err: String(e) }, 'upload error');
+    }
+    await new Promise(res => setTimeout(res, 2000));
+  }
+  return false;
+}
+
+function runProcess(cmd: string, args: string[], input?: NodeJS.ReadableStream, jobId?: string): Promise<number> {
+  return new Promise((resolve) => {
+    if (jobId && cancelled.has(jobId)) { resolve(130); return; }
+    const child = spawn(cmd, args, { stdio: [input ? 'pipe' : 'ignore', 'ignore', 'pipe'] });
+    track(jobId, child);
+    child.stderr!.on('data', () => {});
+    if (input) input.pipe(child.stdin!);
+    const timer = setTimeout(() => { try { child.kill('SIGKILL'); } catch {} }, 30 * 60 * 1000);
+    child.on('error', () => { clearTimeout(timer); resolve(127); });
+    child.on('close', (code) => { clearTimeout(timer); resolve(code ?? 1); });
+  });
+}
+
+//lot d'images: archive tar en entrée et en sortie (ou chemins directs sur le montage partagé), une invocation ffmpeg pour tout le lot
+async function runBundle(p: any, localInput: string | null, tmpFiles: string[]): Promise<boolean> {
+  const jobId: string = p.jobId;
+  const members: { index: number; name: string; output: string; inputPath?: string; partPath?: string }[] = p.bundle;
+  const head: string[] = Array.isArray(p.ffmpegArgs) ? p.ffmpegArgs : [];
+  const tail: string[] = Array.isArray(p.outputArgs) ? p.outputArgs : [];
+  if (localInput) tmpFiles.push(localInput);
+  let direct = members.length > 0 && members.every((m) => m.inputPath && m.partPath);
+  if (direct) {
+    try {
+      for (const m of members) {
+        await fs.promises.access(m.inputPath!, fs.constants.R_OK);
+        await fs.promises.mkdir(path.dirname(m.partPath!), { recursive: true });
+      }
+    } catch (e) {
+      logger.warn({ jobId, err: String(e) }, 'shared mount unavailable, using http');
+      direct = false;
+    }
+  }
+  const dir = path.join(os.tmpdir(), 'ffmpegeasy', `${jobId}.bundle`);
+  const inDir = path.join(dir, 'in');
+  const outDir = path.join(dir, 'out');
+  let inputs: string[];
+  let outputs: string[];
+  if (direct) {
+    inputs = members.map((m) => m.inputPath!);
+    outputs = members.map((m) => m.partPath!);
+  } else {
+    tmpFiles.push(dir);
+    await fs.promises.mkdir(inDir, { recursive: true });
+    await fs.promises.mkdir(outDir, { recursive: true });
+    let rc: number;
+    if (localInput) {
+      rc = await runProcess('tar', ['-xf', localInput, '-C', inDir], undefined, jobId);
+    } else {
+      const r = await axios.get(p.inputUrl, { responseType: 'stream', timeout: 120000 });
+      rc = await runProcess('tar', ['-xf', '-', '-C', inDir], r.data, jobId);
+    }
+    if (rc !== 0) { logger.warn({ jobId, rc }, 'bundle extract failed'); return false; }
+    inputs = members.map((m) => path.join(inDir, m.name));
+    outputs = members.map((m) => path.join(outDir, m.output));
+  }
+  logger.info({ jobId, files: members.length }, 'bundle start');
+  const all = [...head, ...inputs.flatMap((f) => ['-i', f]), ...outputs.flatMap((o, i) => ['-map', `${i}:v:0`, ...tail, o])];
+  let ready = members.map(() => false);
+  if (members.length && (await runProcess(FFMPEG_PATH, all, undefined, jobId)) === 0) {
+    ready = ready.map(() => true);
+  } else if (members.length > 1) {
+    //un fichier illisible fait échouer l'invocation groupée: reprise fichier par fichier pour isoler le fautif
+    for (let i = 0; i < members.length; i++) {
+      ready[i] = (await runProcess(FFMPEG_PATH, [...head, '-i', inputs[i], '-map', '0:v:0', ...tail, outputs[i]], undefined, jobId)) === 0;
+    }
+  }
+  if (direct) {
+    for (let i = 0; i < members.length; i++) {
+      if (ready[i]) { try { ws.send(JSON.stringify({ type: 'output-ready', payload: { jobId, rendition: members[i].index, spec: !!p.spec } })); } catch {} }
+      else { try { await fs.promises.rm(outputs[i], { force: true }); } catch {} }
+    }
+    return ready.some(Boolean) || !members.length;
   }
+  const names = members.filter((_, i) => ready[i]).map((m) => m.output);
+  if (!names.length) return !members.length;
+  const tarPath = path.join(dir, 'out.tar');
+  if ((await runProcess('tar', ['-cf', tarPath, '-C', outDir, ...names])) !== 0) return false;
+  const uploaded = await uploadFile(p.outputUrl, tarPath);
+  logger.info({ jobId, files: names.length, uploaded }, 'bundle done');
+  return uploaded;
 }